@@ -0,0 +1,58 @@
+"""
+Benchmark memory and aggregation speed of plain expense dicts against the
+slotted Expense records.
+Run from the repository root:  python benchmarks/bench_expense.py [rows ...]
+"""
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_expenses
+from utils import stats
+from utils.expense import to_expense
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def bytes_per_row(build, n):
+    """Memory held by the rows build() returns, per row."""
+    gc.collect()
+    tracemalloc.start()
+    rows = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del rows
+    return size / n
+
+def run(n):
+    # Round-trip through JSON so the dicts look like a freshly loaded ledger
+    text = json.dumps(make_expenses(n))
+    dicts = json.loads(text)
+    convert = timed(lambda: [to_expense(e) for e in dicts])
+    records = [to_expense(e) for e in dicts]
+
+    dict_bytes = bytes_per_row(lambda: json.loads(text), n)
+    record_bytes = bytes_per_row(lambda: [to_expense(e) for e in json.loads(text)], n)
+    print(f"\n{n:,} rows (conversion: {convert * 1000:.1f} ms)")
+    print(f"{'bytes/row':<32}{dict_bytes:>12.0f}{record_bytes:>12.0f}")
+    print(f"{'function':<32}{'dict ms':>12}{'Expense ms':>12}{'speedup':>10}")
+    for name in ("get_total_spending", "get_category_breakdown",
+                 "get_monthly_spending", "summarize"):
+        old = timed(getattr(stats, name), dicts)
+        new = timed(getattr(stats, name), records)
+        print(f"{name:<32}{old * 1000:>12.1f}{new * 1000:>12.1f}{old / new:>9.1f}x")
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 500000]
+    for n in sizes:
+        run(n)
+
+if __name__ == "__main__":
+    main()
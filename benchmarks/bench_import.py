@@ -0,0 +1,48 @@
+"""
+Measure bulk CSV import throughput into a fresh journal ledger.
+Run from the repository root:  python benchmarks/bench_import.py [rows]
+"""
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import file_handler
+from utils.importer import CATEGORIES, import_csv
+from utils.store import ExpenseStore
+
+def write_statement(path, n, seed=7):
+    """Bank-style CSV: day-first dates, negative debits, a few bad rows."""
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Date", "Description", "Amount", "Category"])
+        for i in range(n):
+            date = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2015, 2026)}"
+            amount = f"-{rng.uniform(1, 500):.2f}" if i % 1000 else "n/a"
+            writer.writerow([date, f"Merchant {rng.randint(1, 5000)}", amount, rng.choice(CATEGORIES)])
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as tmp:
+        statement = os.path.join(tmp, "statement.csv")
+        write_statement(statement, n)
+        file_handler.DATA_FILE = os.path.join(tmp, "expenses.json")
+
+        store = ExpenseStore()
+        start = time.perf_counter()
+        result = import_csv(statement, store)
+        elapsed = time.perf_counter() - start
+        print(f"{n:,} rows in {elapsed:.2f} s ({n / elapsed:,.0f} rows/s): {result.summary()}")
+
+        start = time.perf_counter()
+        again = import_csv(statement, store)
+        elapsed = time.perf_counter() - start
+        print(f"re-import in {elapsed:.2f} s: {again.summary()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Measure Transactions search latency (trigram index) against a linear scan.
+Run from the repository root:  python benchmarks/bench_search.py [rows]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_expenses
+from utils import file_handler
+from utils.store import ExpenseStore
+
+WORDS = ["uber", "airport", "dentist", "coffee", "lunch", "team", "rent", "netflix", "train",
+         "ticket", "pharmacy", "groceries", "book", "gift", "taxi", "hotel", "flight", "gym"]
+
+# (text, category, start_date, end_date)
+QUERIES = [
+    ("uber", None, None, None),
+    ("uber air", "Transport", None, None),
+    ("dentist", "Health", "2020-01-01", "2020-12-31"),
+    ("#1234", None, None, None),
+    ("hotel gym", None, "2024-01-01", None),
+    ("zzz", None, None, None),
+]
+
+def with_varied_descriptions(expenses, seed=3):
+    """Mix a few words with reference numbers so most descriptions are distinct."""
+    rng = random.Random(seed)
+    for expense in expenses:
+        words = " ".join(rng.sample(WORDS, rng.randint(0, 3)))
+        if rng.random() < 0.5:
+            words += f" #{rng.randint(1, 200000)}"
+        expense["description"] = words
+    return expenses
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    expenses = with_varied_descriptions(make_expenses(n))
+    with tempfile.TemporaryDirectory() as tmp:
+        file_handler.DATA_FILE = os.path.join(tmp, "expenses.json")
+        file_handler.save_expenses(expenses)
+        store = ExpenseStore()
+        store.expenses()
+
+        start = time.perf_counter()
+        store.prepare_search()
+        print(f"{n:,} rows, indexes built in {time.perf_counter() - start:.2f} s")
+        print(f"{'query':<40}{'hits':>8}{'index ms':>10}{'scan ms':>10}")
+        for text, category, start_date, end_date in QUERIES:
+            start = time.perf_counter()
+            hits = store.query(category, start_date, end_date, text)
+            indexed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            file_handler.filter_expenses(expenses, category, start_date, end_date, text)
+            scan = time.perf_counter() - start
+
+            label = " ".join(str(part) for part in (text, category, start_date, end_date) if part)
+            print(f"{label:<40}{len(hits):>8}{indexed * 1000:>10.1f}{scan * 1000:>10.1f}")
+
+if __name__ == "__main__":
+    main()
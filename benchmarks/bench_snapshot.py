@@ -0,0 +1,76 @@
+"""
+Cold-load benchmark: JSON snapshot against the binary columnar snapshot.
+
+Writes a synthetic ledger, then times each case in a fresh Python process
+(so nothing is cached in memory; the OS page cache stays warm):
+
+    json     load_expenses() parsing expenses.json
+    binary   load_expenses() decoding expenses.bin
+    row      opening expenses.bin and reading one row from the middle
+    summary  stats.summarize() straight over the mapped columns
+
+Run from the repository root:  python benchmarks/bench_snapshot.py [rows]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CASES = ["json", "binary", "row", "summary"]
+
+def child(case, workdir):
+    """Runs in a fresh process: time one case once the modules are imported."""
+    os.chdir(workdir)
+    os.environ["EXPENSE_TRACKER_SNAPSHOT"] = "json" if case == "json" else "binary"
+    from utils import binary_snapshot, file_handler, stats
+
+    start = time.perf_counter()
+    if case in ("json", "binary"):
+        rows = len(file_handler.load_expenses())
+    else:
+        with binary_snapshot.open_snapshot(file_handler.binary_path()) as snapshot:
+            if case == "row":
+                snapshot[len(snapshot) // 2]
+                rows = 1
+            else:
+                rows = stats.summarize(snapshot)["count"]
+    print(f"{time.perf_counter() - start:.4f} {rows}")
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        return child(sys.argv[2], sys.argv[3])
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    from benchmarks.synthetic import make_expenses
+    from utils import file_handler
+    from utils.expense import to_expense
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        expenses = [to_expense(e) for e in make_expenses(n)]
+        file_handler.save_expenses(expenses)
+        start = time.perf_counter()
+        file_handler._write_binary(file_handler.DATA_FILE, expenses)
+        written = time.perf_counter() - start
+        del expenses
+        json_mb = os.path.getsize(file_handler.DATA_FILE) / 1e6
+        binary_mb = os.path.getsize(file_handler.binary_path()) / 1e6
+        print(f"{n:,} rows: expenses.json {json_mb:.0f} MB, expenses.bin {binary_mb:.0f} MB "
+              f"(written in {written:.2f} s)")
+
+        results = {}
+        for case in CASES:
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", case, tmp],
+                                 capture_output=True, text=True, check=True, cwd=ROOT).stdout
+            seconds, rows = out.split()
+            results[case] = float(seconds)
+            print(f"{case:<9}{float(seconds) * 1000:>10.1f} ms  ({int(rows):,} rows)")
+        print(f"binary load is {results['json'] / results['binary']:.1f}x faster than JSON")
+        os.chdir(ROOT)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Benchmark the pure-Python stats functions against the NumPy columnar engine.
+Run from the repository root:  python benchmarks/bench_stats.py [rows ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_expenses
+from utils import stats
+from utils.columnar import ColumnarLedger
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def run(n):
+    expenses = make_expenses(n)
+    build = timed(ColumnarLedger.from_expenses, expenses)
+    ledger = ColumnarLedger.from_expenses(expenses)
+
+    print(f"\n{n:,} rows (columnar build: {build * 1000:.1f} ms)")
+    print(f"{'function':<32}{'python ms':>12}{'numpy ms':>12}{'speedup':>10}")
+    for name in ("get_total_spending", "get_category_breakdown",
+                 "get_highest_spending_category", "get_monthly_spending"):
+        py = timed(getattr(stats, name), expenses)
+        vec = timed(getattr(ledger, name))
+        print(f"{name:<32}{py * 1000:>12.1f}{vec * 1000:>12.1f}{py / vec:>9.1f}x")
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 500000]
+    for n in sizes:
+        run(n)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Stress test for concurrent writers sharing one ledger.
+
+Several processes add expenses to the same ledger at once, each through
+the file lock, either one add_expense() (one commit) per row or through
+a WriteBehindQueue that groups rows into shared commits. Afterwards the
+ledger must hold exactly every row written, once, and the rollup must
+agree with it. Prints rows per second for each backend and mode.
+
+    python benchmarks/bench_writes.py
+    python benchmarks/bench_writes.py --processes 8 --rows 500 --backends journal sqlite
+
+Exits with status 1 if any row was lost or duplicated.
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import make_expenses
+from utils import file_handler, stats
+from utils.write_behind import WriteBehindQueue
+
+BACKENDS = ["journal", "partitioned", "sqlite"]
+MODES = ["direct", "queued"]
+
+def writer(workdir, backend, mode, worker, rows, start):
+    """Runs in a child process: add `rows` tagged expenses as fast as possible."""
+    os.chdir(workdir)
+    file_handler.STORAGE_BACKEND = backend
+    expenses = make_expenses(rows, seed=worker)
+    for i, expense in enumerate(expenses):
+        expense["description"] = f"w{worker}-{i}"
+    start.wait()
+    if mode == "direct":
+        for expense in expenses:
+            if not file_handler.add_expense(expense):
+                raise IOError("add_expense failed")
+    else:
+        queue = WriteBehindQueue()
+        futures = [queue.submit([expense]) for expense in expenses]
+        queue.close()
+        for future in futures:
+            future.result()
+
+def run(backend, mode, processes, rows):
+    workdir = tempfile.mkdtemp(prefix="bench_writes_")
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Event()
+    try:
+        os.chdir(workdir)
+        file_handler.STORAGE_BACKEND = backend
+        file_handler.save_expenses([]) # Create the empty ledger (and database) up front
+        workers = [ctx.Process(target=writer, args=(workdir, backend, mode, w, rows, start))
+                   for w in range(processes)]
+        for p in workers:
+            p.start()
+        time.sleep(1.0) # Let every child finish importing before the clock starts
+        began = time.perf_counter()
+        start.set()
+        for p in workers:
+            p.join()
+        elapsed = time.perf_counter() - began
+
+        expenses = file_handler.load_expenses()
+        descriptions = [e['description'] for e in expenses]
+        expected = {f"w{w}-{i}" for w in range(processes) for i in range(rows)}
+        lost = len(expected - set(descriptions))
+        duplicated = len(descriptions) - len(set(descriptions))
+        consistent = file_handler.get_summary() == stats.summarize(expenses)
+        failed = sum(p.exitcode != 0 for p in workers)
+        return elapsed, lost, duplicated, consistent, failed
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent writer stress test.")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=250, help="rows added by each process")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    args = parser.parse_args()
+
+    total = args.processes * args.rows
+    print(f"{args.processes} processes x {args.rows} rows")
+    print(f"{'backend':<13}{'mode':<8}{'seconds':>9}{'rows/s':>10}  result")
+    ok = True
+    for backend in args.backends:
+        for mode in args.modes:
+            elapsed, lost, duplicated, consistent, failed = run(backend, mode, args.processes, args.rows)
+            good = not (lost or duplicated or failed) and consistent
+            ok = ok and good
+            verdict = "ok" if good else (f"LOST {lost}, DUPLICATED {duplicated}, FAILED WRITERS {failed}, "
+                                         f"rollup {'ok' if consistent else 'STALE'}")
+            print(f"{backend:<13}{mode:<8}{elapsed:>9.2f}{total / elapsed:>10.0f}  {verdict}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Headless benchmark suite over synthetic ledgers.
+
+Times storage (load/add/export), every function in utils/stats.py and the
+dashboard chart figures (Agg backend), records peak traced memory per
+operation, writes the results as JSON and compares them to a baseline.
+
+    python benchmarks/run_benchmarks.py                      # 1k, 10k, 100k, 1M
+    python benchmarks/run_benchmarks.py --sizes 1000 10000   # a quick run
+    python benchmarks/run_benchmarks.py --update-baseline    # accept current numbers
+    python benchmarks/run_benchmarks.py --time-threshold 0.5 --memory-threshold 0.2
+
+Exits with status 1 when any operation is slower (or uses more memory)
+than the baseline by more than the given fraction. Baselines are per
+machine and not committed: when there is none yet, this run's results are
+written as the baseline and the run exits with status 2, since nothing was
+compared.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from benchmarks.synthetic import make_expenses
+from utils import file_handler, stats
+from utils.chart_utils import ChartRenderer
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+DEFAULT_OUTPUT = os.path.join(ROOT, "benchmarks", "results.json")
+
+# Timings below this are too noisy to flag as regressions
+MIN_COMPARABLE_SECONDS = 0.005
+
+def measure(func, repeat, trace_memory):
+    """Best-of-`repeat` wall time, plus peak traced memory of one extra run."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    result = {"seconds": best}
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        func()
+        result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+def draw_charts(renderer, summary):
+    for figure in (renderer.update_pie(summary["categories"]),
+                   renderer.update_trend(summary["monthly"])):
+        FigureCanvasAgg(figure).draw()
+
+def bench_size(n, workdir, repeat, trace_memory):
+    expenses = make_expenses(n)
+    file_handler.STORAGE_BACKEND = "journal"
+    file_handler.DATA_FILE = os.path.join(workdir, "expenses.json")
+    file_handler.save_expenses(expenses)
+
+    def add_100():
+        for expense in expenses[:100]:
+            file_handler.add_expense(dict(expense))
+        # Drop the journal so every run starts from the same ledger
+        os.remove(file_handler.journal_path())
+
+    summary = stats.summarize(expenses)
+    operations = {
+        "load_expenses": file_handler.load_expenses,
+        "add_expense_x100": add_100,
+        "export_to_csv": lambda: file_handler.export_to_csv(os.path.join(workdir, "out.csv")),
+        "stats.get_total_spending": lambda: stats.get_total_spending(expenses),
+        "stats.get_expense_count": lambda: stats.get_expense_count(expenses),
+        "stats.get_category_breakdown": lambda: stats.get_category_breakdown(expenses),
+        "stats.get_highest_spending_category": lambda: stats.get_highest_spending_category(expenses),
+        "stats.get_monthly_spending": lambda: stats.get_monthly_spending(expenses),
+        "stats.summarize": lambda: stats.summarize(expenses),
+        "charts.dashboard": lambda: draw_charts(ChartRenderer(), summary),
+    }
+
+    results = {}
+    for name, func in operations.items():
+        results[name] = measure(func, repeat, trace_memory)
+        line = f"  {name:<38}{results[name]['seconds'] * 1000:>10.1f} ms"
+        if trace_memory:
+            line += f"{results[name]['peak_bytes'] / 1024 / 1024:>10.1f} MiB"
+        print(line)
+    return results
+
+def compare(results, baseline, time_threshold, memory_threshold):
+    """Return a list of human-readable regressions."""
+    regressions = []
+    for size, operations in results["results"].items():
+        for name, current in operations.items():
+            previous = baseline.get("results", {}).get(size, {}).get(name)
+            if previous is None:
+                continue
+            if (current["seconds"] >= MIN_COMPARABLE_SECONDS
+                    and current["seconds"] > previous["seconds"] * (1 + time_threshold)):
+                regressions.append(f"{name} @ {size}: {previous['seconds'] * 1000:.1f} -> "
+                                   f"{current['seconds'] * 1000:.1f} ms")
+            if ("peak_bytes" in current and "peak_bytes" in previous
+                    and current["peak_bytes"] > previous["peak_bytes"] * (1 + memory_threshold)):
+                regressions.append(f"{name} @ {size}: peak {previous['peak_bytes']:,} -> "
+                                   f"{current['peak_bytes']:,} bytes")
+    return regressions
+
+def uncovered(results, baseline):
+    """Sizes measured in this run that the baseline has no numbers for."""
+    return [size for size in results["results"] if size not in baseline.get("results", {})]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip peak-memory tracing")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--time-threshold", type=float, default=0.25,
+                        help="allowed slowdown as a fraction (default 0.25)")
+    parser.add_argument("--memory-threshold", type=float, default=0.25,
+                        help="allowed peak-memory growth as a fraction (default 0.25)")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": {},
+    }
+    workdir = tempfile.mkdtemp(prefix="expense-bench-")
+    try:
+        for n in args.sizes:
+            print(f"{n:,} rows")
+            results["results"][str(n)] = bench_size(n, workdir, args.repeat, not args.no_memory)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        shutil.copy(args.output, args.baseline)
+        print(f"Baseline updated: {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        shutil.copy(args.output, args.baseline)
+        print(f"No baseline at {args.baseline}: this run was saved as the baseline; "
+              f"run again to compare against it", file=sys.stderr)
+        sys.exit(2)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.time_threshold, args.memory_threshold)
+    missing = uncovered(results, baseline)
+    if missing:
+        print(f"Not in baseline, not compared: {', '.join(missing)} rows (run with --update-baseline)")
+    if regressions:
+        print("Regressions:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
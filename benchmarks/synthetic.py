@@ -0,0 +1,25 @@
+"""
+Seeded synthetic ledgers with the same schema as ExpenseTrackerApp.submit_expense.
+"""
+import random
+from datetime import datetime, timedelta
+
+CATEGORIES = ["Food", "Transport", "Bills", "Entertainment", "Shopping", "Health", "Misc"]
+DESCRIPTIONS = ["", "coffee", "uber airport", "dentist", "groceries", "rent", "netflix",
+                "electricity bill", "cinema", "train ticket", "pharmacy", "lunch with team"]
+
+def make_expenses(n, seed=42, first_year=2015, last_year=2026):
+    """Return n random expenses; the same seed always gives the same ledger."""
+    rng = random.Random(seed)
+    epoch = datetime(2020, 1, 1)
+    expenses = []
+    for _ in range(n):
+        date = f"{rng.randint(first_year, last_year)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        expenses.append({
+            "amount": round(rng.uniform(1, 500), 2),
+            "category": rng.choice(CATEGORIES),
+            "date": date,
+            "description": rng.choice(DESCRIPTIONS),
+            "timestamp": (epoch + timedelta(seconds=rng.randint(0, 10 ** 8))).isoformat(),
+        })
+    return expenses
@@ -1,22 +1,26 @@
-import customtkinter as ctk
-from tkinter import messagebox, filedialog
-from tkcalendar import DateEntry
-from datetime import datetime
 import sys
 import os
 
 # Add utils to path
 sys.path.append(os.path.dirname(__file__))
 
-from utils.file_handler import load_expenses, add_expense, export_to_csv
-from utils.stats import (
-    get_total_spending, 
-    get_expense_count, 
-    get_category_breakdown,
-    get_highest_spending_category,
-    get_monthly_spending
-)
-from utils.chart_utils import create_category_pie_chart, create_monthly_trend_chart
+from utils import startup # First, so it can time the imports below
+
+import customtkinter as ctk
+from tkinter import messagebox, filedialog
+from datetime import datetime
+import csv
+
+from utils import metrics
+from utils.background import TaskRunner
+from utils.importer import CATEGORIES, guess_mapping, import_csv
+from utils.expense import to_cents
+from utils.file_handler import MANIFEST_FILE
+from utils.recurring import RecurringRule, rule_of
+from utils.workspace import Workspace
+from utils.virtual_list import VirtualList
+from utils.stats import get_top_category
+# matplotlib (utils.chart_utils) and tkcalendar are imported on first use
 
 # --- Theme Configuration ---
 ctk.set_appearance_mode("Dark")
@@ -29,7 +33,17 @@ COLOR_CARD = "#2b2b2b"
 COLOR_PRIMARY = "#1f6aa5"
 COLOR_TEXT_MAIN = "#ffffff"
 COLOR_TEXT_SUB = "#aaaaaa"
+COLOR_ALERT = "#ff6b6b" # Expenses and anything over budget
 FONT_FAMILY = "Segoe UI" # Windows standard, falls back gracefully
+EXPENSE_ROW_HEIGHT = 80 # Row card plus the gap below it
+SEARCH_DELAY_MS = 250 # Wait for a pause in typing before searching
+
+REPEAT_OPTIONS = ["Never", "Weekly", "Monthly"]
+
+# Ledger menu entries besides the ledgers themselves
+ALL_LEDGERS = "All ledgers"
+OPEN_LEDGER = "Open ledger…"
+NEW_LEDGER = "New ledger…"
 
 class ExpenseTrackerApp(ctk.CTk):
     def __init__(self):
@@ -52,9 +66,10 @@ class ExpenseTrackerApp(ctk.CTk):
         # Create Sidebar
         self.sidebar_frame = ctk.CTkFrame(self, width=240, corner_radius=0, fg_color=COLOR_SIDEBAR)
         self.sidebar_frame.grid(row=0, column=0, rowspan=4, sticky="nsew")
-        self.sidebar_frame.grid_rowconfigure(8, weight=1)
+        self.sidebar_frame.grid_rowconfigure(9, weight=1)
 
         self.buttons = {}
+        self.workspace = Workspace.load()
         self._create_sidebar()
 
         # Create Main Content Area
@@ -65,9 +80,39 @@ class ExpenseTrackerApp(ctk.CTk):
 
         # Initialize
         self.current_view = None
+        self.view_task = None # Background work feeding the current view
+        self.dashboard_render = None # Render timing of the dashboard, closed when its data is in
+        self.dashboard_summary = None
+        self.list_render = None # Render timing of the Transactions list, closed when its rows are in
+        self.trend_granularity = "month"
+        self.export_task = None
+        self.import_task = None
+        self._search_after = None
+        self.date_defaults = None # What the date pickers show for the whole ledger
+        self._charts = None
+        self.tasks = TaskRunner(self)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
+        self.bind("<Map>", self._on_first_map, add="+")
         self.show_dashboard()
 
+    @property
+    def store(self):
+        """Store of the ledger picked in the sidebar (the last single one, while combined)."""
+        return self.workspace.store()
+
+    @property
+    def charts(self):
+        """Chart renderer, created (and matplotlib imported) on first use."""
+        if self._charts is None:
+            from utils.chart_utils import ChartRenderer
+            self._charts = ChartRenderer()
+        return self._charts
+
+    def _on_first_map(self, event):
+        if event.widget is self:
+            startup.mark("first frame")
+
     def _create_sidebar(self):
         # Logo
         self.logo_label = ctk.CTkLabel(
@@ -82,6 +127,36 @@ class ExpenseTrackerApp(ctk.CTk):
         self._add_nav_button("New Expense", "➕", self.show_add_expense, 2)
         self._add_nav_button("Transactions", "📝", self.show_view_expenses, 3)
         self._add_nav_button("Export Data", "📤", self.export_data, 4)
+        self._add_nav_button("Import CSV", "📥", self.import_data, 5)
+        self._add_nav_button("Budgets", "🎯", self.show_budgets, 6)
+
+        # Shown only while an export is running
+        self.export_progress = ctk.CTkProgressBar(self.sidebar_frame, height=8, progress_color=COLOR_PRIMARY)
+
+        # Render timings (only with EXPENSE_TRACKER_METRICS set)
+        self.metrics_overlay = ctk.CTkLabel(
+            self.sidebar_frame, text="", anchor="nw", justify="left",
+            font=ctk.CTkFont(family="Consolas", size=11), text_color=COLOR_TEXT_SUB
+        )
+        if metrics.ENABLED:
+            self.metrics_switch = ctk.CTkSwitch(
+                self.sidebar_frame, text="Render metrics", font=self.font_small,
+                command=self._toggle_metrics_overlay
+            )
+            self.metrics_switch.grid(row=8, column=0, padx=20, pady=(20, 0), sticky="w")
+
+        # Ledger switcher
+        ctk.CTkLabel(
+            self.sidebar_frame, text="Ledger:", anchor="w", font=self.font_small, text_color=COLOR_TEXT_SUB
+        ).grid(row=10, column=0, padx=20, pady=(10, 0), sticky="w")
+        self.ledger_menu = ctk.CTkOptionMenu(
+            self.sidebar_frame,
+            command=self._switch_ledger,
+            font=self.font_small,
+            fg_color=COLOR_CARD
+        )
+        self.ledger_menu.grid(row=11, column=0, padx=20, pady=(5, 10), sticky="ew")
+        self._update_ledger_menu()
 
         # Appearance Mode
         self.appearance_mode_label = ctk.CTkLabel(
@@ -91,7 +166,7 @@ class ExpenseTrackerApp(ctk.CTk):
             font=self.font_small,
             text_color=COLOR_TEXT_SUB
         )
-        self.appearance_mode_label.grid(row=9, column=0, padx=20, pady=(10, 0), sticky="w")
+        self.appearance_mode_label.grid(row=12, column=0, padx=20, pady=(10, 0), sticky="w")
         
         self.appearance_mode_menu = ctk.CTkOptionMenu(
             self.sidebar_frame, 
@@ -100,7 +175,7 @@ class ExpenseTrackerApp(ctk.CTk):
             font=self.font_small,
             fg_color=COLOR_CARD
         )
-        self.appearance_mode_menu.grid(row=10, column=0, padx=20, pady=(5, 30), sticky="ew")
+        self.appearance_mode_menu.grid(row=13, column=0, padx=20, pady=(5, 30), sticky="ew")
         self.appearance_mode_menu.set("Dark")
 
     def _add_nav_button(self, text, icon, command, row):
@@ -120,7 +195,50 @@ class ExpenseTrackerApp(ctk.CTk):
         btn.grid(row=row, column=0, sticky="ew", padx=15, pady=5)
         self.buttons[text] = btn
 
+    def _update_ledger_menu(self):
+        labels = self.workspace.labels()
+        self.ledger_labels = dict(zip(labels, self.workspace.ledgers))
+        values = labels + ([ALL_LEDGERS] if len(labels) > 1 else []) + [OPEN_LEDGER, NEW_LEDGER]
+        self.ledger_menu.configure(values=values)
+        if self.workspace.combined:
+            self.ledger_menu.set(ALL_LEDGERS)
+        else:
+            self.ledger_menu.set(labels[self.workspace.ledgers.index(self.workspace.active)])
+
+    def _switch_ledger(self, choice):
+        """Show another ledger (or all of them); ledgers still in the cache come up at once."""
+        if choice == OPEN_LEDGER:
+            path = filedialog.askopenfilename(filetypes=[
+                ("Ledgers", "*.json *.db"), ("Partitioned ledger", MANIFEST_FILE)
+            ])
+            if path and os.path.basename(path) == MANIFEST_FILE:
+                path = os.path.dirname(path) # The directory of a partitioned ledger
+        elif choice == NEW_LEDGER:
+            path = filedialog.asksaveasfilename(defaultextension=".json",
+                                                filetypes=[("JSON ledger", "*.json"), ("SQLite ledger", "*.db")])
+        elif choice == ALL_LEDGERS:
+            path = None
+            self.workspace.select_combined()
+        else:
+            path = None
+            self.workspace.select(self.ledger_labels[choice])
+        if path and os.path.splitext(path)[1] not in (".json", ".db") and not os.path.isdir(path):
+            messagebox.showerror("Error", f"{path} is not a ledger (.json, .db or a partition directory).")
+        elif path:
+            self.workspace.open(path)
+        self._update_ledger_menu()
+
+        if self.workspace.combined and self.current_view != "dashboard":
+            self._handle_nav(self.show_dashboard, "Dashboard")
+        else:
+            self._refresh_current_view()
+        # Unload the least recently used ledgers if the cache is over its budget
+        self.tasks.submit(self.workspace.trim, lambda _: None, lambda error: None)
+
     def _handle_nav(self, command, name):
+        if self.workspace.combined and name != "Dashboard":
+            messagebox.showinfo("All Ledgers", "Choose a single ledger in the sidebar to work on it.")
+            return
         # Reset all buttons
         for btn_name, btn in self.buttons.items():
             btn.configure(fg_color="transparent", text_color=COLOR_TEXT_SUB)
@@ -129,19 +247,58 @@ class ExpenseTrackerApp(ctk.CTk):
         self.buttons[name].configure(fg_color=COLOR_PRIMARY, text_color="white")
         command()
 
+    def _toggle_metrics_overlay(self):
+        if self.metrics_switch.get():
+            self.metrics_overlay.grid(row=9, column=0, padx=20, pady=(5, 0), sticky="new")
+            self._update_metrics_overlay()
+        else:
+            self.metrics_overlay.grid_remove()
+
+    def _update_metrics_overlay(self):
+        if self.metrics_overlay.winfo_ismapped():
+            self.metrics_overlay.configure(text=metrics.breakdown_text())
+
+    def _finish_render(self, render):
+        """Close a render when Tk is next idle, after the spans of the view methods have ended."""
+        if render is not None:
+            self.after_idle(self._close_render, render)
+
+    def _close_render(self, render):
+        if metrics.finish_render(render):
+            self._update_metrics_overlay()
+
+    @metrics.timed("view.clear")
     def clear_main_frame(self):
+        # Results for the old view are no longer wanted. A cancelled task
+        # may still be running and holding the store until its next check,
+        # which is why the Tk thread never calls the store itself: every view
+        # goes through self.tasks and just fills in whenever the store is free.
+        if self.view_task is not None:
+            self.view_task.cancel()
+            self.view_task = None
+        if self._search_after is not None:
+            self.after_cancel(self._search_after)
+            self._search_after = None
         for widget in self.main_frame.winfo_children():
             widget.destroy()
 
+    def on_close(self):
+        self.tasks.shutdown()
+        self.workspace.close() # Flush queued writes before exiting
+        self.destroy()
+
     def change_appearance_mode_event(self, new_appearance_mode: str):
         ctk.set_appearance_mode(new_appearance_mode)
 
     # --- VIEWS ---
 
+    @metrics.timed("view.dashboard")
     def show_dashboard(self):
         if self.current_view == "dashboard": return
         self.current_view = "dashboard"
+        self.dashboard_render = metrics.start_render("dashboard")
         self.clear_main_frame()
+        self.dashboard_summary = None
         self.buttons["Dashboard"].configure(fg_color=COLOR_PRIMARY, text_color="white") # Ensure highlight on init
 
         # Container
@@ -151,16 +308,17 @@ class ExpenseTrackerApp(ctk.CTk):
         # Header
         ctk.CTkLabel(content, text="Dashboard Overview", font=self.font_header).pack(anchor="w", pady=(0, 20))
 
-        expenses = load_expenses()
-
-        # Stats Row
+        # Stats Row (placeholders until the background load finishes)
         stats_container = ctk.CTkFrame(content, fg_color="transparent")
         stats_container.pack(fill="x", pady=(0, 30))
-        stats_container.grid_columnconfigure((0, 1, 2), weight=1)
+        stats_container.grid_columnconfigure((0, 1, 2, 3), weight=1)
 
-        self._create_stat_card(stats_container, 0, "Total Spending", f"${get_total_spending(expenses):.2f}", "💵")
-        self._create_stat_card(stats_container, 1, "Total Transactions", str(get_expense_count(expenses)), "🧾")
-        self._create_stat_card(stats_container, 2, "Top Category", get_highest_spending_category(expenses), "🔥")
+        self.stat_labels = [
+            self._create_stat_card(stats_container, 0, "Total Spending", "…", "💵"),
+            self._create_stat_card(stats_container, 1, "Total Transactions", "…", "🧾"),
+            self._create_stat_card(stats_container, 2, "Top Category", "…", "🔥"),
+            self._create_stat_card(stats_container, 3, "Budgets This Month", "…", "🎯"),
+        ]
 
         # Charts Section
         charts_container = ctk.CTkFrame(content, fg_color="transparent")
@@ -169,45 +327,136 @@ class ExpenseTrackerApp(ctk.CTk):
         charts_container.grid_rowconfigure(0, weight=1)
 
         # Pie Chart
-        pie_card = ctk.CTkFrame(charts_container, fg_color=COLOR_CARD, corner_radius=15)
-        pie_card.grid(row=0, column=0, sticky="nsew", padx=(0, 15), pady=10)
-        ctk.CTkLabel(pie_card, text="Distribution by Category", font=self.font_subheader).pack(pady=15)
-        
-        category_data = get_category_breakdown(expenses)
+        self.pie_card = ctk.CTkFrame(charts_container, fg_color=COLOR_CARD, corner_radius=15)
+        self.pie_card.grid(row=0, column=0, sticky="nsew", padx=(0, 15), pady=10)
+        ctk.CTkLabel(self.pie_card, text="Distribution by Category", font=self.font_subheader).pack(pady=15)
+        self.pie_placeholder = ctk.CTkLabel(self.pie_card, text="Loading…", font=self.font_normal, text_color="gray")
+        self.pie_placeholder.pack(expand=True)
+
+        # Line Chart
+        self.line_card = ctk.CTkFrame(charts_container, fg_color=COLOR_CARD, corner_radius=15)
+        self.line_card.grid(row=0, column=1, sticky="nsew", padx=(15, 0), pady=10)
+        ctk.CTkLabel(self.line_card, text="Spending Trend", font=self.font_subheader).pack(pady=(15, 5))
+        self.trend_switch = ctk.CTkSegmentedButton(self.line_card, values=["Day", "Week", "Month"],
+                                                   command=self._switch_trend)
+        self.trend_switch.set(self.trend_granularity.title())
+        self.trend_switch.pack()
+        self.line_placeholder = ctk.CTkLabel(self.line_card, text="Loading…", font=self.font_normal, text_color="gray")
+        self.line_placeholder.pack(expand=True)
+
+        # Reading the ledger and aggregating happens off the Tk thread
+        self.view_task = self.tasks.submit(self._load_dashboard_data, self._populate_dashboard, self._show_load_error,
+                                           cancellable=True)
+
+    @metrics.timed("view.dashboard.load")
+    def _load_dashboard_data(self, check):
+        """
+        Runs on a worker thread: warm up matplotlib, compute the summary, the
+        trend and the budgets, giving up between steps once the user has left
+        the dashboard.
+        """
+        import utils.chart_utils
+        check()
+        summary = self.workspace.summary()
+        check()
+        points = self._load_trend(self.trend_granularity)
+        check()
+        return summary, points, self.workspace.over_budget()
+
+    def _load_trend(self, granularity):
+        """Trend points for a granularity; monthly ones come with the summary, so None."""
+        if granularity == "month":
+            return None
+        return self.workspace.trend_points(granularity)
+
+    @metrics.timed("view.dashboard.populate")
+    def _populate_dashboard(self, data):
+        self.view_task = None
+        summary, points, over_budget = data
+        self.dashboard_summary = summary
+        top_category = get_top_category(summary['categories'])
+        for label, value in zip(self.stat_labels, (
+            f"${summary['total']:.2f}",
+            str(summary['count']),
+            top_category,
+            "—" if over_budget is None else f"{len(over_budget)} over" if over_budget else "On track",
+        )):
+            label.configure(text=value)
+        over_budget = over_budget or {}
+        # Over-budget categories stand out in red
+        if top_category in over_budget:
+            self.stat_labels[2].configure(text=f"⚠ {top_category}", text_color=COLOR_ALERT)
+        if over_budget:
+            self.stat_labels[3].configure(text_color=COLOR_ALERT)
+
+        category_data = summary['categories']
         if category_data:
-            chart = create_category_pie_chart(pie_card, category_data)
+            self.pie_placeholder.destroy()
+            chart = self.charts.category_pie_chart(self.pie_card, category_data, over_budget)
             chart.pack(fill="both", expand=True, padx=10, pady=10)
         else:
-            ctk.CTkLabel(pie_card, text="No data available", font=self.font_normal, text_color="gray").pack(expand=True)
-
-        # Line Chart
-        line_card = ctk.CTkFrame(charts_container, fg_color=COLOR_CARD, corner_radius=15)
-        line_card.grid(row=0, column=1, sticky="nsew", padx=(15, 0), pady=10)
-        ctk.CTkLabel(line_card, text="Spending Trend", font=self.font_subheader).pack(pady=15)
+            self.pie_placeholder.configure(text="No data available")
 
-        monthly_data = get_monthly_spending(expenses)
+        monthly_data = summary['monthly']
         if monthly_data:
-            chart = create_monthly_trend_chart(line_card, monthly_data)
+            self.line_placeholder.destroy()
+            if points is None:
+                chart = self.charts.monthly_trend_chart(self.line_card, monthly_data)
+            else:
+                chart = self.charts.trend_chart(self.line_card, *points, self.trend_granularity)
             chart.pack(fill="both", expand=True, padx=10, pady=10)
         else:
-            ctk.CTkLabel(line_card, text="No data available", font=self.font_normal, text_color="gray").pack(expand=True)
+            self.line_placeholder.configure(text="No data available")
+
+        startup.mark("dashboard ready")
+        startup.report()
+        self._finish_render(self.dashboard_render)
+
+    def _switch_trend(self, value):
+        """Redraw the trend at another granularity in the chart already on screen."""
+        self.trend_granularity = value.lower()
+        if self.dashboard_summary is None or not self.dashboard_summary['monthly']:
+            return # Not loaded yet (the load picks the new granularity up) or nothing to show
+        if self.view_task is not None:
+            self.view_task.cancel()
+        granularity = self.trend_granularity
+        if granularity == "month":
+            self.view_task = None
+            self.charts.show_monthly_trend(self.dashboard_summary['monthly'])
+        else:
+            self.view_task = self.tasks.submit(lambda: self._load_trend(granularity),
+                                               lambda points: self._show_trend(points, granularity),
+                                               self._show_load_error)
+
+    def _show_trend(self, points, granularity):
+        self.view_task = None
+        self.charts.show_trend(*points, granularity)
+
+    def _show_load_error(self, error):
+        self.view_task = None
+        self._finish_render(self.dashboard_render)
+        messagebox.showerror("Error", f"Could not load expenses: {error}")
 
     def _create_stat_card(self, parent, col, title, value, icon):
         card = ctk.CTkFrame(parent, fg_color=COLOR_CARD, corner_radius=15, height=140)
-        card.grid(row=0, column=col, sticky="ew", padx=10 if col==1 else 0)
+        card.grid(row=0, column=col, sticky="ew", padx=(10 if col else 0, 0))
         
         # Prevent shrinking
         card.grid_propagate(False) 
         
         ctk.CTkLabel(card, text=title, font=self.font_stat_label, text_color=COLOR_TEXT_SUB).pack(pady=(20, 5), padx=20, anchor="w")
-        ctk.CTkLabel(card, text=value, font=self.font_stat_val, text_color=COLOR_TEXT_MAIN).pack(pady=(0, 5), padx=20, anchor="w")
+        value_lbl = ctk.CTkLabel(card, text=value, font=self.font_stat_val, text_color=COLOR_TEXT_MAIN)
+        value_lbl.pack(pady=(0, 5), padx=20, anchor="w")
         # Icon watermark (optional)
         icon_lbl = ctk.CTkLabel(card, text=icon, font=ctk.CTkFont(size=40))
         icon_lbl.place(relx=0.9, rely=0.5, anchor="e")
+        return value_lbl
 
+    @metrics.timed("view.add_expense")
     def show_add_expense(self):
         if self.current_view == "add_expense": return
         self.current_view = "add_expense"
+        self._finish_render(metrics.start_render("add_expense"))
         self.clear_main_frame()
         self.buttons["New Expense"].configure(fg_color=COLOR_PRIMARY, text_color="white")
 
@@ -226,10 +475,11 @@ class ExpenseTrackerApp(ctk.CTk):
 
         # Fields
         self._create_form_entry(form_scroll, "Amount ($)", "amount_entry", "0.00")
-        self._create_form_dropdown(form_scroll, "Category", "category_var", ["Food", "Transport", "Bills", "Entertainment", "Shopping", "Health", "Misc"])
+        self._create_form_dropdown(form_scroll, "Category", "category_var", CATEGORIES)
         
         # Date (Special case)
         ctk.CTkLabel(form_scroll, text="Date", font=self.font_normal, text_color=COLOR_TEXT_SUB).pack(pady=(10, 5), anchor="w")
+        from tkcalendar import DateEntry
         self.date_entry = DateEntry(
             form_scroll, width=12, background='#2b2b2b', foreground='white', 
             borderwidth=0, date_pattern='yyyy-mm-dd', font=('Arial', 12)
@@ -237,6 +487,8 @@ class ExpenseTrackerApp(ctk.CTk):
         self.date_entry.pack(fill="x", pady=(0, 20), ipady=5)
 
         self._create_form_entry(form_scroll, "Description", "description_entry", "What was this for?")
+        self._create_form_dropdown(form_scroll, "Repeat", "repeat_var", REPEAT_OPTIONS)
+        self._create_form_entry(form_scroll, "Repeat Until (optional)", "until_entry", "YYYY-MM-DD")
 
         # Buttons
         btn_frame = ctk.CTkFrame(form_scroll, fg_color="transparent")
@@ -288,17 +540,74 @@ class ExpenseTrackerApp(ctk.CTk):
             "description": self.description_entry.get(),
             "timestamp": datetime.now().isoformat()
         }
+        if self.repeat_var.get() != REPEAT_OPTIONS[0]:
+            self._submit_recurring(expense)
+            return
+
+        # Saved in the background; the form is cleared once it is on disk
+        store = self.store
 
-        if add_expense(expense):
-            messagebox.showinfo("Success", "Expense saved successfully!")
+        def save():
+            future = store.add(expense)
+            return future, store.budget_alerts([expense])
+        self.tasks.submit(save, self._expense_queued, self._expense_not_saved)
+
+    def _expense_queued(self, result):
+        future, alerts = result
+        self.tasks.watch(future, self._expense_saved, self._expense_not_saved)
+        self._warn_over_budget(alerts)
+
+    def _submit_recurring(self, expense):
+        """Save the form as a rule; its expenses are worked out whenever they are shown."""
+        try:
+            rule = RecurringRule(to_cents(expense["amount"]), expense["category"], expense["date"],
+                                 self.repeat_var.get().lower(), self.until_entry.get().strip() or None,
+                                 expense["description"])
+        except ValueError as e:
+            messagebox.showerror("Invalid Input", str(e))
+            return
+        store, today = self.store, datetime.now().strftime("%Y-%m-%d")
+
+        def save():
+            store.add_recurring(rule)
+            return store.budget_alerts(list(rule.occurrences(today[:8] + "01", today)))
+        self._in_background(save, lambda alerts: self._recurring_saved(rule, alerts),
+                            "Could not save the recurring expense.")
+
+    def _recurring_saved(self, rule, alerts):
+        messagebox.showinfo("Success", f"Recurring expense saved: {rule.frequency} from {rule.start}.")
+        if self.current_view == "add_expense":
             self.amount_entry.delete(0, 'end')
             self.description_entry.delete(0, 'end')
-        else:
-            messagebox.showerror("Error", "Could not save expense.")
+            self.until_entry.delete(0, 'end')
+        self._warn_over_budget(alerts)
+
+    def _in_background(self, func, on_done, error_message):
+        """Run a store call on a worker (the store may be busy with a slow load) and report failure with error_message."""
+        self.tasks.submit(func, on_done, lambda error: messagebox.showerror("Error", error_message))
+
+    def _warn_over_budget(self, alerts):
+        """Tell the user about any monthly budget new expenses pushed over (alerts from store.budget_alerts)."""
+        if alerts:
+            messagebox.showwarning("Over Budget", "\n".join(
+                f"{category} is over its {month} budget: ${spent / 100:.2f} of ${limit / 100:.2f}"
+                for category, month, spent, limit in alerts
+            ))
+
+    def _expense_saved(self, _):
+        messagebox.showinfo("Success", "Expense saved successfully!")
+        if self.current_view == "add_expense":
+            self.amount_entry.delete(0, 'end')
+            self.description_entry.delete(0, 'end')
+
+    def _expense_not_saved(self, error):
+        messagebox.showerror("Error", "Could not save expense.")
 
+    @metrics.timed("view.transactions")
     def show_view_expenses(self):
         if self.current_view == "view_expenses": return
         self.current_view = "view_expenses"
+        self.list_render = metrics.start_render("transactions")
         self.clear_main_frame()
         self.buttons["Transactions"].configure(fg_color=COLOR_PRIMARY, text_color="white")
 
@@ -314,7 +623,7 @@ class ExpenseTrackerApp(ctk.CTk):
         self.filter_var = ctk.StringVar(value="All")
         filter_menu = ctk.CTkOptionMenu(
             header_frame,
-            values=["All", "Food", "Transport", "Bills", "Entertainment", "Shopping", "Health", "Misc"],
+            values=["All"] + CATEGORIES,
             variable=self.filter_var,
             width=150,
             command=lambda x: self.refresh_expense_list()
@@ -322,55 +631,478 @@ class ExpenseTrackerApp(ctk.CTk):
         filter_menu.pack(side="right")
         ctk.CTkLabel(header_frame, text="Filter:", font=self.font_normal, text_color=COLOR_TEXT_SUB).pack(side="right", padx=10)
 
-        # List Area
-        self.expenses_scroll_frame = ctk.CTkScrollableFrame(container, fg_color="transparent")
-        self.expenses_scroll_frame.pack(fill="both", expand=True)
+        # Date range (defaults to the whole ledger)
+        from tkcalendar import DateEntry
+        ctk.CTkButton(
+            header_frame, text="All dates", width=90, fg_color="transparent", border_width=1,
+            command=self._reset_date_range
+        ).pack(side="right", padx=(10, 0))
+        self.to_date_entry = DateEntry(
+            header_frame, width=11, background='#2b2b2b', foreground='white',
+            borderwidth=0, date_pattern='yyyy-mm-dd', font=('Arial', 12)
+        )
+        self.to_date_entry.pack(side="right", ipady=3)
+        ctk.CTkLabel(header_frame, text="to", font=self.font_normal, text_color=COLOR_TEXT_SUB).pack(side="right", padx=8)
+        self.from_date_entry = DateEntry(
+            header_frame, width=11, background='#2b2b2b', foreground='white',
+            borderwidth=0, date_pattern='yyyy-mm-dd', font=('Arial', 12)
+        )
+        self.from_date_entry.pack(side="right", ipady=3)
+        ctk.CTkLabel(header_frame, text="From:", font=self.font_normal, text_color=COLOR_TEXT_SUB).pack(side="right", padx=(20, 8))
+        for entry in (self.from_date_entry, self.to_date_entry):
+            entry.bind("<<DateEntrySelected>>", lambda e: self.refresh_expense_list())
+            entry.bind("<Return>", lambda e: self.refresh_expense_list())
+        self.date_defaults = self._picked_dates() # Until the ledger's own range is in
+
+        # Search (debounced; the index is built in the background once the list is in)
+        self.search_entry = ctk.CTkEntry(
+            container, placeholder_text="🔍 Search descriptions and categories...",
+            height=36, font=self.font_normal
+        )
+        self.search_entry.pack(fill="x", pady=(0, 15))
+        self.search_entry.bind("<KeyRelease>", self._schedule_search)
+
+        # List Area (only the visible rows are ever built)
+        self.expense_list = VirtualList(
+            container,
+            create_row=self._create_expense_row,
+            bind_row=self._bind_expense_row,
+            row_height=EXPENSE_ROW_HEIGHT
+        )
+        self.expense_list.pack(fill="both", expand=True)
+        self.empty_label = ctk.CTkLabel(self.expense_list.viewport, text="No transactions found.", font=self.font_normal, text_color="gray")
+
+        # The ledger is read (and indexed) off the Tk thread
+        self._reset_date_range()
+
+    def _reset_date_range(self):
+        """List every date, pointing the date pickers at the first and last valid one."""
+        store, category, text = self.store, self._category_filter(), self.search_entry.get()
+
+        def load():
+            first, last = store.date_range()
+            return first, last, store.query(category, None, None, text)
+        self._load_list(load, lambda result: self._show_date_range(store, *result))
+
+    def _show_date_range(self, store, first, last, expenses):
+        today = datetime.now().strftime("%Y-%m-%d")
+        for entry, value in ((self.from_date_entry, first), (self.to_date_entry, last)):
+            try:
+                entry.set_date(value or today)
+            except ValueError:
+                entry.set_date(today) # e.g. a span recorded by an older partition manifest
+        self.date_defaults = self._picked_dates()
+        self._show_expenses(expenses)
+        # Have the search index ready before the first search
+        self.tasks.submit(store.prepare_search, lambda _: None, lambda error: None)
+
+    def _schedule_search(self, event=None):
+        """Restart the debounce timer on every keystroke."""
+        if self._search_after is not None:
+            self.after_cancel(self._search_after)
+        self._search_after = self.after(SEARCH_DELAY_MS, self.refresh_expense_list)
 
-        self.refresh_expense_list()
+    @metrics.timed("view.transactions.refresh")
+    def refresh_expense_list(self, keep_offset=False):
+        if self._search_after is not None:
+            self.after_cancel(self._search_after)
+            self._search_after = None
+        start_date, end_date = self._picked_dates()
+        if (start_date, end_date) == self.date_defaults:
+            # Still the whole ledger: keep listing expenses whose dates don't parse
+            start_date = end_date = None
+        store, filters = self.store, {
+            "category": self._category_filter(),
+            "start_date": start_date,
+            "end_date": end_date,
+            "text": self.search_entry.get(),
+        }
+        self._load_list(lambda: store.query(**filters), lambda expenses: self._show_expenses(expenses, keep_offset))
 
-    def refresh_expense_list(self):
-        for widget in self.expenses_scroll_frame.winfo_children(): widget.destroy()
+    def _picked_dates(self):
+        return (self.from_date_entry.get_date().strftime("%Y-%m-%d"),
+                self.to_date_entry.get_date().strftime("%Y-%m-%d"))
 
-        expenses = load_expenses()
+    def _category_filter(self):
         filter_cat = self.filter_var.get()
-        if filter_cat != "All":
-            expenses = [e for e in expenses if e['category'] == filter_cat]
-        expenses.sort(key=lambda x: x['date'], reverse=True)
+        return None if filter_cat == "All" else filter_cat
 
-        if not expenses:
-            ctk.CTkLabel(self.expenses_scroll_frame, text="No transactions found.", font=self.font_normal, text_color="gray").pack(pady=40)
-            return
+    def _load_list(self, load, on_done):
+        """Run a list query on a worker, replacing one still running, so a cold ledger or index never blocks Tk."""
+        if not metrics.rendering():
+            # A filter or search change is a render of its own
+            self.list_render = metrics.start_render("transactions.refresh")
+        if self.view_task is not None:
+            self.view_task.cancel()
+        self.view_task = self.tasks.submit(load, on_done, self._show_list_error)
+
+    def _show_expenses(self, expenses, keep_offset=False):
+        self.view_task = None
+        self.expense_list.set_items(expenses, keep_offset)
+
+        if expenses:
+            self.empty_label.place_forget()
+        else:
+            self.empty_label.place(relx=0.5, y=40, anchor="n")
+        self._finish_render(self.list_render)
 
-        for exp in expenses:
-            self._create_expense_row(exp)
+    def _show_list_error(self, error):
+        self.view_task = None
+        self._finish_render(self.list_render)
+        messagebox.showerror("Error", f"Could not load expenses: {error}")
 
-    def _create_expense_row(self, expense):
-        row = ctk.CTkFrame(self.expenses_scroll_frame, fg_color=COLOR_CARD, corner_radius=10)
-        row.pack(fill="x", pady=5)
+    def _create_expense_row(self, parent):
+        row = ctk.CTkFrame(parent, fg_color=COLOR_CARD, corner_radius=10, height=EXPENSE_ROW_HEIGHT - 10)
+        row.pack_propagate(False)
         
         # Icon/Category
-        ctk.CTkLabel(row, text="🏷️", font=ctk.CTkFont(size=20)).pack(side="left", padx=(15, 5), pady=15)
+        ctk.CTkLabel(row, text="🏷️", font=ctk.CTkFont(size=20)).pack(side="left", padx=(15, 5))
         
         info_frame = ctk.CTkFrame(row, fg_color="transparent")
         info_frame.pack(side="left", padx=10)
         
-        ctk.CTkLabel(info_frame, text=expense['category'], font=ctk.CTkFont(size=14, weight="bold")).pack(anchor="w")
-        ctk.CTkLabel(info_frame, text=expense['date'], font=ctk.CTkFont(size=11), text_color=COLOR_TEXT_SUB).pack(anchor="w")
+        row.category_label = ctk.CTkLabel(info_frame, text="", font=ctk.CTkFont(size=14, weight="bold"))
+        row.category_label.pack(anchor="w")
+        row.date_label = ctk.CTkLabel(info_frame, text="", font=ctk.CTkFont(size=11), text_color=COLOR_TEXT_SUB)
+        row.date_label.pack(anchor="w")
         
+        # Edit/Delete (act on whichever expense the pooled row shows)
+        actions = ctk.CTkFrame(row, fg_color="transparent")
+        actions.pack(side="right", padx=(0, 10))
+        ctk.CTkButton(
+            actions, text="✏️", width=32, height=28, fg_color="transparent", hover_color="#3a3a3a",
+            command=lambda: self._edit_expense(row.expense)
+        ).pack(side="left")
+        ctk.CTkButton(
+            actions, text="🗑", width=32, height=28, fg_color="transparent", hover_color="#5a2a2a",
+            command=lambda: self._delete_expense(row.expense)
+        ).pack(side="left")
+
         # Amount/Desc
         amt_frame = ctk.CTkFrame(row, fg_color="transparent")
         amt_frame.pack(side="right", padx=15)
         
-        ctk.CTkLabel(amt_frame, text=f"-${expense['amount']:.2f}", font=ctk.CTkFont(size=16, weight="bold"), text_color="#ff6b6b").pack(anchor="e") # Red for expense
-        if expense.get('description'):
-             ctk.CTkLabel(amt_frame, text=expense['description'], font=ctk.CTkFont(size=12), text_color=COLOR_TEXT_SUB).pack(anchor="e")
+        row.amount_label = ctk.CTkLabel(amt_frame, text="", font=ctk.CTkFont(size=16, weight="bold"), text_color=COLOR_ALERT) # Red for expense
+        row.amount_label.pack(anchor="e")
+        row.description_label = ctk.CTkLabel(amt_frame, text="", font=ctk.CTkFont(size=12), text_color=COLOR_TEXT_SUB)
+        row.description_label.pack(anchor="e")
+        return row
+
+    def _bind_expense_row(self, row, expense):
+        """Point a pooled row at a different expense."""
+        row.expense = expense
+        row.category_label.configure(text=expense['category'])
+        row.date_label.configure(text=f"{expense['date']}  🔁 recurring" if rule_of(expense) else expense['date'])
+        row.amount_label.configure(text=f"-${expense['amount']:.2f}")
+        row.description_label.configure(text=expense.get('description') or "")
+
+    def _edit_expense(self, expense):
+        if rule_of(expense):
+            messagebox.showinfo("Recurring Expense", "This expense repeats automatically; stop or delete it on the Budgets page.")
+            return
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("Edit Expense")
+        dialog.geometry("420x480")
+        dialog.transient(self)
+
+        ctk.CTkLabel(dialog, text="Edit Expense", font=self.font_subheader).pack(padx=30, pady=(25, 10), anchor="w")
+
+        ctk.CTkLabel(dialog, text="Amount ($)", font=self.font_normal, text_color=COLOR_TEXT_SUB).pack(padx=30, pady=(10, 2), anchor="w")
+        amount = ctk.CTkEntry(dialog, fg_color="#3a3a3a", border_width=0)
+        amount.insert(0, f"{expense['amount']:.2f}")
+        amount.pack(padx=30, fill="x")
+
+        ctk.CTkLabel(dialog, text="Category", font=self.font_normal, text_color=COLOR_TEXT_SUB).pack(padx=30, pady=(10, 2), anchor="w")
+        category = ctk.StringVar(value=expense['category'])
+        ctk.CTkOptionMenu(dialog, variable=category, values=CATEGORIES, fg_color="#3a3a3a", button_color=COLOR_PRIMARY).pack(padx=30, fill="x")
+
+        ctk.CTkLabel(dialog, text="Date", font=self.font_normal, text_color=COLOR_TEXT_SUB).pack(padx=30, pady=(10, 2), anchor="w")
+        from tkcalendar import DateEntry
+        date = DateEntry(dialog, width=12, background='#2b2b2b', foreground='white', borderwidth=0, date_pattern='yyyy-mm-dd', font=('Arial', 12))
+        try:
+            date.set_date(expense['date'])
+        except ValueError:
+            pass # Not a YYYY-MM-DD date; keep today's
+        date.pack(padx=30, fill="x", ipady=3)
+
+        ctk.CTkLabel(dialog, text="Description", font=self.font_normal, text_color=COLOR_TEXT_SUB).pack(padx=30, pady=(10, 2), anchor="w")
+        description = ctk.CTkEntry(dialog, fg_color="#3a3a3a", border_width=0)
+        description.insert(0, expense.get('description') or "")
+        description.pack(padx=30, fill="x")
+
+        def save():
+            try:
+                value = float(amount.get())
+                if value <= 0: raise ValueError
+            except ValueError:
+                messagebox.showerror("Invalid Input", "Please enter a valid positive amount.", parent=dialog)
+                return
+            store, changes = self.store, {
+                "amount": value,
+                "category": category.get(),
+                "date": date.get_date().strftime("%Y-%m-%d"),
+                "description": description.get(),
+            }
+            dialog.destroy()
+            self.tasks.submit(lambda: store.update(expense['id'], changes), self._expense_changed, self._expense_not_saved)
+
+        ctk.CTkButton(dialog, text="Save Changes", height=40, fg_color=COLOR_PRIMARY, hover_color="#144870", command=save).pack(padx=30, pady=25, fill="x")
+
+    def _delete_expense(self, expense):
+        if rule_of(expense):
+            self._stop_recurring(rule_of(expense), expense['category'])
+            return
+        text = f"Delete {expense['category']} -${expense['amount']:.2f} on {expense['date']}?"
+        if messagebox.askyesno("Delete Expense", text):
+            store = self.store
+            self.tasks.submit(lambda: store.delete(expense['id']), self._expense_changed, self._expense_not_saved)
+
+    def _expense_changed(self, future):
+        """Show an edit or delete as soon as the store has it; it is saved in the background."""
+        if future is None:
+            messagebox.showerror("Error", "This expense no longer exists.")
+        else:
+            self.tasks.watch(future, lambda _: None, self._expense_not_saved)
+        if self.current_view == "view_expenses":
+            self.refresh_expense_list(keep_offset=True)
+
+    @metrics.timed("view.budgets")
+    def show_budgets(self):
+        if self.current_view == "budgets": return
+        self.current_view = "budgets"
+        self._finish_render(metrics.start_render("budgets"))
+        self.clear_main_frame()
+        self.buttons["Budgets"].configure(fg_color=COLOR_PRIMARY, text_color="white")
+
+        content = ctk.CTkScrollableFrame(self.main_frame, fg_color="transparent")
+        content.pack(fill="both", expand=True, padx=30, pady=30)
+        ctk.CTkLabel(content, text="Budgets & Recurring", font=self.font_header).pack(anchor="w", pady=(0, 20))
+        placeholder = ctk.CTkLabel(content, text="Loading…", font=self.font_normal, text_color="gray")
+        placeholder.pack(pady=20)
+
+        store = self.store
+        self.view_task = self.tasks.submit(
+            lambda: (store.budget_status(), store.recurring_rules()),
+            lambda result: self._populate_budgets(content, placeholder, *result),
+            lambda error: self._show_budgets_error(placeholder, error)
+        )
+
+    def _populate_budgets(self, content, placeholder, status, rules):
+        self.view_task = None
+        placeholder.destroy()
+
+        # Monthly budgets, with this month's spending next to each
+        card = ctk.CTkFrame(content, fg_color=COLOR_CARD, corner_radius=15)
+        card.pack(fill="x", pady=(0, 20))
+        ctk.CTkLabel(card, text="Monthly Budgets", font=self.font_subheader).pack(anchor="w", padx=20, pady=15)
+        self.budget_entries = {}
+        for category in CATEGORIES + sorted(set(status) - set(CATEGORIES)):
+            spent, limit = status.get(category, (None, None))
+            row = ctk.CTkFrame(card, fg_color="transparent")
+            row.pack(fill="x", padx=20, pady=4)
+            ctk.CTkLabel(row, text=category, font=self.font_normal, width=140, anchor="w").pack(side="left")
+            entry = ctk.CTkEntry(row, placeholder_text="No limit", width=120, font=self.font_normal)
+            if limit is not None:
+                entry.insert(0, f"{limit / 100:.2f}")
+            entry.pack(side="left", padx=10)
+            if limit is not None:
+                ctk.CTkLabel(
+                    row, text=f"${spent / 100:.2f} spent this month", font=self.font_small,
+                    text_color=COLOR_ALERT if spent > limit else COLOR_TEXT_SUB
+                ).pack(side="left", padx=10)
+            self.budget_entries[category] = entry
+        ctk.CTkButton(
+            card, text="Save Budgets", height=40, fg_color=COLOR_PRIMARY, hover_color="#144870",
+            command=self._save_budgets
+        ).pack(anchor="w", padx=20, pady=15)
+
+        # Recurring rules
+        card = ctk.CTkFrame(content, fg_color=COLOR_CARD, corner_radius=15)
+        card.pack(fill="x")
+        ctk.CTkLabel(card, text="Recurring Expenses", font=self.font_subheader).pack(anchor="w", padx=20, pady=15)
+        if not rules:
+            ctk.CTkLabel(
+                card, text="None yet: set Repeat when adding a new expense.", font=self.font_normal, text_color="gray"
+            ).pack(anchor="w", padx=20, pady=(0, 15))
+        for rule in rules:
+            row = ctk.CTkFrame(card, fg_color="transparent")
+            row.pack(fill="x", padx=20, pady=4)
+            until = f" until {rule.end}" if rule.end else ""
+            text = f"{rule.category}  ${rule.cents / 100:.2f} {rule.frequency} from {rule.start}{until}"
+            if rule.description:
+                text += f"  ·  {rule.description}"
+            ctk.CTkLabel(row, text=text, font=self.font_normal, anchor="w").pack(side="left")
+            ctk.CTkButton(
+                row, text="🗑", width=32, height=28, fg_color="transparent", hover_color="#5a2a2a",
+                command=lambda rule=rule: self._remove_recurring(rule)
+            ).pack(side="right")
+            ctk.CTkButton(
+                row, text="Stop", width=60, height=28, fg_color="transparent", hover_color="#3a3a3a",
+                command=lambda rule=rule: self._stop_recurring(rule.id, rule.category)
+            ).pack(side="right", padx=5)
+
+    def _show_budgets_error(self, placeholder, error):
+        self.view_task = None
+        placeholder.configure(text=f"Could not load budgets: {error}")
+
+    def _save_budgets(self):
+        limits = {}
+        for category, entry in self.budget_entries.items():
+            value = entry.get().strip()
+            if not value:
+                continue
+            try:
+                limits[category] = to_cents(value)
+                if limits[category] <= 0: raise ValueError
+            except ValueError:
+                messagebox.showerror("Invalid Input", f"The budget for {category} must be a positive amount.")
+                return
+        store = self.store
+        self._in_background(lambda: store.set_budgets(limits), self._budgets_saved, "Could not save budgets.")
+
+    def _budgets_saved(self, _):
+        messagebox.showinfo("Success", "Budgets saved.")
+        if self.current_view == "budgets":
+            self._refresh_current_view()
+
+    def _stop_recurring(self, rule_id, category):
+        """End a rule today, keeping the expenses it already produced."""
+        if not messagebox.askyesno("Stop Recurring Expense", f"Stop this {category} expense repeating after today? Earlier ones are kept."):
+            return
+        store, today = self.store, datetime.now().strftime("%Y-%m-%d")
+        self._in_background(lambda: store.end_recurring(rule_id, today), self._recurring_changed,
+                            "Could not save the recurring expense.")
+
+    def _recurring_changed(self, _=None):
+        if self.current_view == "view_expenses":
+            self.refresh_expense_list(keep_offset=True)
+        else:
+            self._refresh_current_view()
+
+    def _remove_recurring(self, rule):
+        if not messagebox.askyesno("Delete Recurring Expense", f"Delete this {rule.category} rule and every expense it produced?"):
+            return
+        store = self.store
+        self._in_background(lambda: store.remove_recurring(rule.id), self._recurring_changed,
+                            "Could not save the recurring expense.")
 
     def export_data(self):
-        filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")])
-        if filename:
-            if export_to_csv(filename): messagebox.showinfo("Success", f"Data exported to {filename}")
-            else: messagebox.showerror("Error", "Failed to export data")
+        if self.export_task is not None:
+            messagebox.showinfo("Export", "An export is already running.")
+            return
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("Compressed CSV", "*.csv.gz")]
+        )
+        if not filename:
+            return
+
+        # Runs in the background; progress is shown under the navigation
+        self.export_progress.set(0)
+        self.export_progress.grid(row=7, column=0, padx=20, pady=(5, 0), sticky="ew")
+        self.export_task = self.tasks.submit(
+            self.store.export_csv,
+            lambda ok: self._finish_export(ok, filename),
+            lambda error: self._finish_export(False, filename),
+            filename,
+            on_progress=self._update_export_progress
+        )
+
+    def _update_export_progress(self, written, total):
+        if total:
+            self.export_progress.set(written / total)
+
+    def _finish_export(self, ok, filename):
+        self.export_task = None
+        self.export_progress.grid_remove()
+        if ok: messagebox.showinfo("Success", f"Data exported to {filename}")
+        else: messagebox.showerror("Error", "Failed to export data")
+
+    def import_data(self):
+        if self.import_task is not None:
+            messagebox.showinfo("Import", "An import is already running.")
+            return
+        path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as f:
+                header = next(csv.reader(f), [])
+        except (IOError, UnicodeDecodeError) as e:
+            messagebox.showerror("Error", f"Could not read {path}: {e}")
+            return
+        if not header:
+            messagebox.showerror("Error", "The file has no header row.")
+            return
+        self._show_import_dialog(path, header)
+
+    def _show_import_dialog(self, path, header):
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("Import Bank Statement")
+        dialog.geometry("460x520")
+        dialog.transient(self)
+
+        ctk.CTkLabel(dialog, text="Map CSV Columns", font=self.font_subheader).pack(padx=30, pady=(25, 5), anchor="w")
+        ctk.CTkLabel(dialog, text=os.path.basename(path), font=self.font_small, text_color=COLOR_TEXT_SUB).pack(padx=30, anchor="w")
+
+        guessed = guess_mapping(header)
+        choices = {}
+        for field in ("amount", "date", "description", "category"):
+            ctk.CTkLabel(dialog, text=field.capitalize(), font=self.font_normal, text_color=COLOR_TEXT_SUB).pack(padx=30, pady=(10, 2), anchor="w")
+            var = ctk.StringVar(value=guessed.get(field, "(none)"))
+            ctk.CTkOptionMenu(dialog, variable=var, values=["(none)"] + header, fg_color="#3a3a3a", button_color=COLOR_PRIMARY).pack(padx=30, fill="x")
+            choices[field] = var
+
+        ctk.CTkLabel(dialog, text="Date format (blank = detect)", font=self.font_normal, text_color=COLOR_TEXT_SUB).pack(padx=30, pady=(10, 2), anchor="w")
+        date_format = ctk.CTkEntry(dialog, placeholder_text="%d/%m/%Y", fg_color="#3a3a3a", border_width=0)
+        date_format.pack(padx=30, fill="x")
+
+        status = ctk.CTkLabel(dialog, text="", font=self.font_small, text_color=COLOR_TEXT_SUB)
+        status.pack(padx=30, pady=(15, 0), anchor="w")
+
+        def start():
+            mapping = {field: var.get() for field, var in choices.items() if var.get() != "(none)"}
+            if "amount" not in mapping or "date" not in mapping:
+                messagebox.showerror("Invalid Mapping", "Amount and Date columns are required.", parent=dialog)
+                return
+            button.configure(state="disabled")
+            self.import_task = self.tasks.submit(
+                lambda progress: import_csv(path, self.store, mapping, date_format.get().strip() or None, progress=progress),
+                lambda result: self._finish_import(dialog, result),
+                lambda error: self._finish_import(dialog, None, error),
+                on_progress=lambda rows, total: status.configure(text=f"Validated {rows:,} rows…")
+            )
+
+        button = ctk.CTkButton(dialog, text="Import", height=40, fg_color=COLOR_PRIMARY, hover_color="#144870", command=start)
+        button.pack(padx=30, pady=20, fill="x")
+
+    def _finish_import(self, dialog, result, error=None):
+        self.import_task = None
+        if dialog.winfo_exists():
+            dialog.destroy()
+        if result is None:
+            messagebox.showerror("Import Failed", str(error))
+            return
+        if not result.committed:
+            messagebox.showerror("Import Failed", "Could not save the imported expenses.")
+            return
+
+        message = result.summary()
+        if result.rejected:
+            message += "\n\nFirst rejected rows:\n" + "\n".join(f"line {line}: {reason}" for line, reason in result.rejected[:5])
+        messagebox.showinfo("Import Complete", message)
+        self._refresh_current_view()
+
+    def _refresh_current_view(self):
+        """Rebuild the visible view so it reflects new data."""
+        views = {"dashboard": self.show_dashboard, "view_expenses": self.show_view_expenses, "budgets": self.show_budgets}
+        view = views.get(self.current_view)
+        if view is not None:
+            self.current_view = None
+            view()
 
 if __name__ == "__main__":
+    startup.mark("imports done")
     app = ExpenseTrackerApp()
+    startup.mark("window created")
     app.mainloop()
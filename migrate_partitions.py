@@ -0,0 +1,49 @@
+"""
+Split a single-file JSON ledger into per-month partitions.
+
+    python migrate_partitions.py                       # expenses.json -> expenses/
+    python migrate_partitions.py old.json --dir ledger
+
+Writes <dir>/<YYYY-MM>.json for every month plus <dir>/manifest.json. The
+source file is left untouched. Afterwards run the app with
+EXPENSE_TRACKER_BACKEND=partitioned (it also migrates automatically on
+first start if no manifest exists yet).
+"""
+import argparse
+import os
+import sys
+
+from utils import file_handler
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Split a JSON ledger into per-month partitions.")
+    parser.add_argument("source", nargs="?", default=file_handler.DATA_FILE,
+                        help=f"ledger to split (default: {file_handler.DATA_FILE})")
+    parser.add_argument("--dir", default=file_handler.PARTITION_DIR,
+                        help=f"partition directory (default: {file_handler.PARTITION_DIR})")
+    parser.add_argument("--force", action="store_true", help="replace existing partitions")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.source):
+        parser.error(f"No such ledger: {args.source}")
+    source = file_handler.Ledger("journal", args.source, None, None)
+    target = file_handler.Ledger("partitioned", args.source, None, args.dir)
+
+    # Hold both ledgers' locks, so no running app appends to the source or
+    # writes partitions while they are split
+    with file_handler.use_ledger(source), file_handler.ledger_lock():
+        with file_handler.use_ledger(target), file_handler.ledger_lock():
+            if os.path.exists(os.path.join(args.dir, file_handler.MANIFEST_FILE)) and not args.force:
+                parser.error(f"{args.dir} already holds partitions (use --force to replace them)")
+            try:
+                counts = file_handler.split_into_partitions(args.source)
+            except IOError as e:
+                print(e, file=sys.stderr)
+                return 1
+    for key, count in counts.items():
+        print(f"{key:<10}{count:>8}")
+    print(f"{sum(counts.values())} expenses in {len(counts)} partitions under {args.dir}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
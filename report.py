@@ -0,0 +1,44 @@
+"""
+Command-line reports for one or more ledgers, without the GUI.
+
+    python report.py expenses.json archive/2024.json office.db
+    python report.py ledgers/*.json --out reports --format csv --charts svg --workers 8
+
+For each ledger, writes <name>_summary.json (or .csv) with the total,
+count, per-category and per-month spending, plus <name>_categories.png and
+<name>_monthly.png. A .db path is read as a SQLite ledger, a .json path as
+a JSON snapshot (plus its .jsonl journal, if present) and a directory as a
+partitioned ledger.
+"""
+import argparse
+import os
+import sys
+
+from utils.reporting import CHART_FORMATS, SUMMARY_FORMATS, report_ledgers
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write summary reports and charts for expense ledgers.")
+    parser.add_argument("ledgers", nargs="+", help="ledgers (.json, .db or partition directories)")
+    parser.add_argument("--out", default="reports", help="output directory (default: reports)")
+    parser.add_argument("--format", choices=SUMMARY_FORMATS, default="json", help="summary format")
+    parser.add_argument("--charts", choices=CHART_FORMATS + ["none"], default="png", help="chart format")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (default: one per CPU; 1 runs in-process)")
+    args = parser.parse_args(argv)
+
+    chart_format = None if args.charts == "none" else args.charts
+    workers = max(1, min(args.workers, len(args.ledgers)))
+    failed = 0
+    try:
+        for path, files, error in report_ledgers(args.ledgers, args.out, args.format, chart_format, workers):
+            if error is not None:
+                failed += 1
+                print(f"{path}: failed: {error}", file=sys.stderr)
+            else:
+                print(f"{path}: {', '.join(files)}")
+    except ValueError as e:
+        parser.error(str(e))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
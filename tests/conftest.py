@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Import the app's packages when pytest is started from anywhere, as the benchmarks do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,87 @@
+"""Aggregates must give exactly the dashboard figures of the utils.stats functions."""
+import random
+from collections import defaultdict
+from datetime import datetime
+
+import pytest
+
+from benchmarks.synthetic import make_expenses
+from utils.aggregates import Aggregates
+from utils.expense import to_expense
+from utils.stats import (get_category_breakdown, get_expense_count, get_highest_spending_category,
+                         get_monthly_spending, get_total_spending)
+
+BAD_DATES = ["", "not a date", "2024-13-01", "2024-02-30", "01/02/2024", "2024-01-05T10:00"]
+
+def make_ledger(n=5000, seed=7):
+    """A seeded ledger with invalid dates, amounts stored as strings and a few odd categories mixed in."""
+    rng = random.Random(seed)
+    expenses = make_expenses(n, seed=seed)
+    for expense in expenses:
+        roll = rng.random()
+        if roll < 0.05:
+            expense["date"] = rng.choice(BAD_DATES)
+        elif roll < 0.15:
+            expense["amount"] = str(expense["amount"])
+        elif roll < 0.17:
+            expense["amount"] = f"{rng.randint(1, 99999) / 100:.2f}"
+            expense["category"] = "Other"
+    return expenses
+
+@pytest.fixture(params=["dicts", "records"])
+def ledger(request):
+    expenses = make_ledger()
+    return expenses if request.param == "dicts" else [to_expense(e) for e in expenses]
+
+def assert_matches_stats(agg, expenses):
+    summary = agg.summary()
+    assert summary["total"] == get_total_spending(expenses)
+    assert summary["count"] == get_expense_count(expenses)
+    assert summary["categories"] == get_category_breakdown(expenses)
+    assert summary["monthly"] == get_monthly_spending(expenses)
+    assert agg.total == get_total_spending(expenses)
+    assert agg.top_category() == get_highest_spending_category(expenses)
+
+def test_build_matches_stats(ledger):
+    assert_matches_stats(Aggregates.from_expenses(ledger), ledger)
+
+def test_incremental_add_matches_stats(ledger):
+    half = len(ledger) // 2
+    agg = Aggregates.from_expenses(ledger[:half])
+    for i, expense in enumerate(ledger[half:], half + 1):
+        agg.add(expense)
+        if i % 500 == 0:
+            assert_matches_stats(agg, ledger[:i])
+    assert_matches_stats(agg, ledger)
+
+def test_add_to_empty_matches_build(ledger):
+    agg = Aggregates()
+    for expense in ledger:
+        agg.add(expense)
+    assert agg.summary() == Aggregates.from_expenses(ledger).summary()
+
+def test_empty_ledger():
+    assert_matches_stats(Aggregates(), [])
+    assert Aggregates().top_category() == "N/A"
+
+def test_invalid_dates_only_leave_monthly_totals():
+    expenses = [{"amount": "12.30", "category": "Food", "date": date} for date in BAD_DATES]
+    agg = Aggregates.from_expenses(expenses)
+    assert agg.summary() == {"total": 73.8, "count": len(BAD_DATES), "categories": {"Food": 73.8}, "monthly": {}}
+    assert_matches_stats(agg, expenses)
+
+def test_same_figures_as_the_original_float_sums():
+    """The stats functions used to sum floats; the cent sums may only differ from those by rounding."""
+    expenses = make_ledger()
+    categories, monthly = defaultdict(float), defaultdict(float)
+    for item in expenses:
+        categories[item["category"]] += float(item["amount"])
+        try:
+            monthly[datetime.strptime(item["date"], "%Y-%m-%d").strftime("%Y-%m")] += float(item["amount"])
+        except ValueError:
+            continue
+    summary = Aggregates.from_expenses(expenses).summary()
+    assert summary["total"] == pytest.approx(sum(float(item["amount"]) for item in expenses))
+    assert summary["categories"] == pytest.approx(dict(categories))
+    assert summary["monthly"] == pytest.approx(dict(monthly))
+    assert Aggregates.from_expenses(expenses).top_category() == max(categories, key=categories.get)
@@ -0,0 +1,68 @@
+"""TaskRunner: cancelled work stops at its next check and never calls back."""
+import threading
+
+from utils.background import Cancelled, TaskRunner
+
+class FakeWidget:
+    """Stands in for Tk: after() callbacks run when pump() is called."""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, func, *args):
+        self.pending.append((func, args))
+
+    def pump(self):
+        pending, self.pending = self.pending, []
+        for func, args in pending:
+            func(*args)
+
+def run_until_done(widget, task):
+    task.future.exception(timeout=5)
+    while widget.pending:
+        widget.pump()
+
+def test_cancel_stops_worker_at_next_check():
+    widget = FakeWidget()
+    runner = TaskRunner(widget)
+    started, release = threading.Event(), threading.Event()
+    steps, delivered = [], []
+
+    def load(check):
+        for step in range(3):
+            check()
+            steps.append(step)
+            started.set()
+            release.wait(5)
+        return steps
+
+    try:
+        task = runner.submit(load, delivered.append, delivered.append, cancellable=True)
+        assert started.wait(5)
+        task.cancel()
+        release.set()
+        run_until_done(widget, task)
+    finally:
+        runner.shutdown()
+    assert steps == [0]
+    assert isinstance(task.future.exception(), Cancelled)
+    assert delivered == []
+
+def test_uncancelled_task_delivers():
+    widget = FakeWidget()
+    runner = TaskRunner(widget)
+    delivered = []
+
+    def load(check):
+        check()
+        return "done"
+
+    try:
+        task = runner.submit(load, delivered.append, cancellable=True)
+        run_until_done(widget, task)
+        # Functions that take no check are called as before
+        plain = runner.submit(lambda x: x * 2, delivered.append, None, 21)
+        run_until_done(widget, plain)
+    finally:
+        runner.shutdown()
+    assert delivered == ["done", 42]
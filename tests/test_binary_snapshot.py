@@ -0,0 +1,99 @@
+"""The binary snapshot must give back exactly the records written, and only while it is current."""
+import json
+
+import pytest
+
+from benchmarks.synthetic import make_expenses
+from utils import binary_snapshot, file_handler
+from utils.expense import to_expense
+from utils.stats import summarize
+
+ODD_ROWS = [
+    {"amount": 1.5, "category": "Food", "date": "", "description": "no date"},
+    {"amount": "2.25", "category": "Food", "date": "not a date", "description": None},
+    {"amount": 3, "category": "Bills", "date": "2024-02-30", "description": "café crème"},
+    {"amount": 4, "category": "Bills", "date": "2024-1-5", "description": "日本 🍣"},
+    {"amount": 5, "category": "Travel", "description": "missing date"},
+    {"amount": 6, "category": "Travel", "date": "2024-03-01", "description": "nul\0inside", "timestamp": None},
+    {"amount": 7, "category": "Ünïcode", "date": "2024-03-02", "description": "", "receipt": {"no": 12, "tags": ["a"]}},
+    {"amount": 8, "category": "Food", "date": "2024-03-03", "description": "extra null", "note": None},
+]
+
+def make_ledger():
+    records = make_expenses(300, seed=8) + ODD_ROWS
+    return [to_expense(dict(record, id=f"id-{i}")) for i, record in enumerate(records)]
+
+def test_round_trip(tmp_path):
+    expenses = make_ledger()
+    path = str(tmp_path / "ledger.bin")
+    assert binary_snapshot.write(path, expenses, {"journal": 7})
+    with binary_snapshot.open_snapshot(path) as snapshot:
+        assert len(snapshot) == len(expenses)
+        assert snapshot.source == {"journal": 7}
+        assert [e.to_dict() for e in snapshot.expenses()] == [e.to_dict() for e in expenses]
+        # Row by row, decoding only that row
+        for i in (0, 150, len(expenses) - 1, -1):
+            assert snapshot[i].to_dict() == expenses[i].to_dict()
+        for i, expense in enumerate(expenses[-len(ODD_ROWS):], len(expenses) - len(ODD_ROWS)):
+            assert snapshot[i].to_dict() == expense.to_dict()
+            assert (snapshot[i].day, snapshot[i].month) == (expense.day, expense.month)
+        with pytest.raises(IndexError):
+            snapshot[len(expenses)]
+
+def test_columns_match_the_records(tmp_path):
+    pytest.importorskip("numpy")
+    expenses = make_ledger()
+    path = str(tmp_path / "ledger.bin")
+    assert binary_snapshot.write(path, expenses, {})
+    with binary_snapshot.open_snapshot(path) as snapshot:
+        assert snapshot.columns().summary() == summarize(expenses)
+
+def test_empty_and_unstorable(tmp_path):
+    path = str(tmp_path / "ledger.bin")
+    assert binary_snapshot.write(path, [], {})
+    with binary_snapshot.open_snapshot(path) as snapshot:
+        assert len(snapshot) == 0 and snapshot.expenses() == []
+    # Plain dicts (records whose amount did not parse) are left to the JSON snapshot
+    assert not binary_snapshot.write(path, [{"amount": "n/a", "category": "Food", "date": "2024-01-01"}], {})
+
+def test_damaged_files_are_ignored(tmp_path):
+    path = tmp_path / "ledger.bin"
+    assert binary_snapshot.open_snapshot(str(path)) is None
+    assert binary_snapshot.write(str(path), make_ledger(), {})
+    data = path.read_bytes()
+    for damaged in (b"", data[:len(data) // 2], b"NOTASNAP" + data[8:]):
+        path.write_bytes(damaged)
+        assert binary_snapshot.open_snapshot(str(path)) is None
+
+def test_only_served_while_current(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_handler, "SNAPSHOT_FORMAT", "binary")
+    ledger = file_handler.Ledger.at(str(tmp_path / "ledger.json"))
+    with file_handler.use_ledger(ledger):
+        assert file_handler.save_expenses(make_ledger())
+        data_file = ledger.data_file
+        snapshot = file_handler._open_binary(data_file)
+        assert snapshot is not None and snapshot.source["journal"] == 0
+        snapshot.close()
+
+        # Appended rows are read from the journal on top of the snapshot
+        new = to_expense(dict(make_expenses(1, seed=99)[0], id="late"))
+        assert file_handler.add_expense(new)
+        edited = to_expense(dict(make_ledger()[0].to_dict(), amount=123))
+        assert file_handler.update_expense(make_ledger()[0], edited)
+        loaded = {e.id: e.to_dict() for e in file_handler.load_expenses()}
+        assert loaded["late"] == new.to_dict() and loaded["id-0"]["amount"] == 123
+        assert len(loaded) == len(make_ledger()) + 1
+
+        # A journal shorter than the bytes the snapshot already covers: it was rewritten
+        assert binary_snapshot.write(file_handler.binary_path(data_file), make_ledger(),
+                                     {"snapshot": file_handler._file_stamp(data_file), "journal": 10 ** 9})
+        assert file_handler._open_binary(data_file) is None
+
+        # A JSON snapshot other than the one it was made from
+        assert file_handler._write_binary(data_file, make_ledger())
+        with open(data_file) as f:
+            records = json.load(f)
+        with open(data_file, "w") as f:
+            json.dump(records[:5], f)
+        assert file_handler._open_binary(data_file) is None
+        assert len(file_handler.load_expenses()) < len(make_ledger())
@@ -0,0 +1,118 @@
+"""Dashboard visits must not pile up figures, canvases, their handlers or memory."""
+import gc
+import tracemalloc
+
+import pytest
+
+matplotlib = pytest.importorskip("matplotlib")
+import matplotlib.text
+
+from matplotlib.backends import backend_tkagg
+from matplotlib.backend_bases import FigureCanvasBase
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from benchmarks.synthetic import make_expenses
+from utils import trend
+from utils.chart_utils import ChartRenderer
+from utils.stats import summarize
+
+VISITS = 20
+
+# Allowed growth over the measured visits; the warm-up lets matplotlib's
+# other bounded caches (tick pools, font lookups) settle first
+MAX_GROWTH_BYTES = 256 * 1024
+
+class _AggCanvas(FigureCanvasAgg):
+    """FigureCanvasTkAgg's interface over Agg, for machines without a display."""
+
+    def __init__(self, figure, master=None):
+        super().__init__(figure)
+
+    def get_tk_widget(self):
+        return None
+
+@pytest.fixture
+def parent(monkeypatch):
+    """A Tk parent for the dashboard charts, or Agg canvases where Tk cannot open a window."""
+    import tkinter
+    try:
+        root = tkinter.Tk()
+    except tkinter.TclError:
+        monkeypatch.setattr(backend_tkagg, "FigureCanvasTkAgg", _AggCanvas)
+        yield None
+        return
+    root.withdraw()
+    yield root
+    root.destroy()
+
+def callbacks(figure):
+    return sum(len(handlers) for handlers in figure._canvas_callbacks.callbacks.values())
+
+def test_trend_handlers_connected_once(parent):
+    renderer = ChartRenderer()
+    points = trend.DailySeries.from_expenses(make_expenses(500, seed=3)).points("day")
+    renderer.trend_chart(parent, *points, "day")
+    connected = callbacks(renderer.trend_figure)
+    for _ in range(VISITS):
+        renderer.trend_chart(parent, *points, "day")
+    assert callbacks(renderer.trend_figure) == connected
+    assert len(renderer._trend_cids) == 5
+
+def visit(renderer, parent, summary, points, i):
+    """What show_dashboard does with the charts: a fresh frame, and a new canvas per chart, every visit."""
+    frame = None
+    if parent is not None:
+        import tkinter
+        frame = parent = tkinter.Frame(parent)
+    renderer.category_pie_chart(parent, summary["categories"], {"Food"} if i % 2 else ())
+    if i % 3:
+        renderer.trend_chart(parent, *points, "day")
+        renderer.show_trend(*points, "week")
+    else:
+        renderer.monthly_trend_chart(parent, summary["monthly"])
+    if frame is not None:
+        frame.destroy() # As clear_main_frame does when leaving the dashboard
+
+def settle():
+    """Collect garbage and empty matplotlib's text metrics cache, which is bounded but keyed per canvas."""
+    cache = getattr(matplotlib.text, "_get_text_metrics_with_cache_impl", None)
+    if cache is not None:
+        cache.cache_clear()
+    gc.collect()
+
+def live(kind):
+    gc.collect()
+    return sum(isinstance(o, kind) for o in gc.get_objects())
+
+def test_dashboard_visits_stay_flat(parent):
+    expenses = make_expenses(3000, first_year=2025, seed=6)
+    summaries = [summarize(expenses[:n]) for n in (5, 1000, 3000)]
+    points = trend.DailySeries.from_expenses(expenses).points("day")
+    renderer = ChartRenderer()
+    for i in range(len(summaries)):
+        visit(renderer, parent, summaries[i % len(summaries)], points, i)
+    figures = renderer.pie_figure, renderer.trend_figure
+    handlers = [callbacks(figure) for figure in figures]
+    live_figures, live_canvases = live(Figure), live(FigureCanvasBase)
+    assert live_canvases <= len(figures)
+
+    tracemalloc.start()
+    try:
+        # A round of visits first, so only what later visits keep is measured
+        for i in range(len(summaries)):
+            visit(renderer, parent, summaries[i % len(summaries)], points, i)
+        settle()
+        before, _ = tracemalloc.get_traced_memory()
+        for i in range(len(summaries) * 2):
+            visit(renderer, parent, summaries[i % len(summaries)], points, i)
+        settle()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert (renderer.pie_figure, renderer.trend_figure) == figures
+    assert [callbacks(figure) for figure in figures] == handlers
+    assert live(Figure) == live_figures
+    assert live(FigureCanvasBase) == live_canvases
+    assert after - before < MAX_GROWTH_BYTES
@@ -0,0 +1,35 @@
+"""The Transactions date pickers default to the range of valid dates only."""
+import pytest
+
+from utils import file_handler
+from utils.date_index import DateIndex
+from utils.expense import to_expense
+from utils.store import ExpenseStore
+
+EXPENSES = [
+    {"amount": 1, "category": "Food", "date": "2023-03-04"},
+    {"amount": 2, "category": "Food", "date": ""},
+    {"amount": 3, "category": "Bills", "date": "not a date"},
+    {"amount": 4, "category": "Bills", "date": "2024-02-30"},
+    {"amount": 5, "category": "Misc", "date": "2024-11-20"},
+    {"amount": 6, "category": "Misc", "date": "2021-07-01"},
+]
+
+def test_index_skips_invalid_dates():
+    assert DateIndex([to_expense(e) for e in EXPENSES]).date_range() == ("2021-07-01", "2024-11-20")
+    assert DateIndex([to_expense(EXPENSES[1])]).date_range() == (None, None)
+    assert DateIndex().date_range() == (None, None)
+
+@pytest.mark.parametrize("name", ["ledger.json", "ledger", "ledger.db"])
+def test_store_date_range(tmp_path, name):
+    ledger = file_handler.Ledger.at(str(tmp_path / name))
+    with file_handler.use_ledger(ledger):
+        assert file_handler.save_expenses(EXPENSES)
+        assert file_handler.get_date_range() == ("2021-07-01", "2024-11-20")
+    store = ExpenseStore(ledger)
+    try:
+        assert store.date_range() == ("2021-07-01", "2024-11-20")
+        # Without date bounds every expense is listed, undated ones included
+        assert len(store.query()) == len(EXPENSES)
+    finally:
+        store.close()
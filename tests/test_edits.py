@@ -0,0 +1,160 @@
+"""Edits and deletes, replayed from the journal or applied to the store's caches, must match a recompute."""
+import json
+import random
+
+import pytest
+
+from benchmarks.synthetic import make_expenses
+from utils import file_handler
+from utils.date_index import DateIndex
+from utils.expense import id_of
+from utils.stats import summarize
+from utils.store import ExpenseStore
+from utils.trend import DailySeries
+
+@pytest.fixture(params=["ledger.json", "ledger", "ledger.db"])
+def ledger(request, tmp_path):
+    ledger = file_handler.Ledger.at(str(tmp_path / request.param))
+    with file_handler.use_ledger(ledger):
+        assert file_handler.save_expenses(make_expenses(800, seed=21))
+    return ledger
+
+def records(expenses):
+    return sorted((dict(e) for e in expenses), key=lambda e: e['id'])
+
+def edit_and_delete(store, seed=2):
+    """Edit and delete a random mix of rows (amounts, dates, categories and descriptions)."""
+    rng = random.Random(seed)
+    for step in range(200):
+        expense = rng.choice(store.expenses())
+        if step % 4 == 0:
+            assert store.delete(expense['id']) is not None
+            continue
+        changes = rng.choice([
+            {"amount": round(rng.uniform(1, 500), 2)},
+            {"date": f"2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"},
+            {"category": rng.choice(["Food", "Rent", "Travel"]), "description": "uber"},
+            {"date": "not a date"},
+        ])
+        assert store.update(expense['id'], changes) is not None
+    assert store.delete("no such id") is None
+    assert store.update("no such id", {"amount": 1}) is None
+
+def test_store_edits_match_a_reload(ledger):
+    store = ExpenseStore(ledger)
+    try:
+        # Every cache the writes adjust in place
+        store.aggregates(), store.trend_points(), store.prepare_search(), store.query()
+        edit_and_delete(store)
+        store.flush()
+        cached = list(store.expenses())
+    finally:
+        store.close()
+
+    with file_handler.use_ledger(ledger):
+        reloaded = file_handler.load_expenses()
+        assert records(cached) == records(reloaded)
+        # The rollup sidecar was carried along with every write
+        assert file_handler.get_summary() == summarize(reloaded)
+
+    fresh = ExpenseStore(ledger)
+    try:
+        assert fresh.summary() == summarize(reloaded)
+    finally:
+        fresh.close()
+
+def test_store_caches_match_a_recompute(ledger):
+    store = ExpenseStore(ledger)
+    try:
+        store.aggregates(), store.trend_points(), store.prepare_search(), store.query()
+        edit_and_delete(store)
+        expenses = list(store.expenses())
+        assert store.summary() == summarize(expenses)
+        for granularity in ("day", "week", "month"):
+            assert store.trend_points(granularity) == DailySeries.from_expenses(expenses).points(granularity)
+        for expense in expenses:
+            assert store.get(expense['id']) is expense
+        index = DateIndex(expenses)
+        for category, start_date, end_date in [(None, None, None), ("Food", "2023-01-01", None), (None, "2023-03-01", "2023-06-30")]:
+            result = store.query(category, start_date, end_date)
+            assert [e['date'] for e in result] == [e['date'] for e in index.query(category, start_date, end_date)]
+            assert records(result) == records(file_handler.filter_expenses(expenses, category, start_date, end_date))
+        for text in ("uber", "food", "zzz"):
+            assert records(store.query(text=text)) == records(file_handler.filter_expenses(expenses, text=text))
+    finally:
+        store.close()
+
+def test_replay_updates_and_deletes():
+    snapshot = [{"id": "a", "amount": 1}, {"id": "b", "amount": 2}, {"id": "c", "amount": 3}]
+    journal = [
+        {"id": "d", "amount": 4},
+        {file_handler.CHANGE_KEY: "update", "id": "b", "expense": {"id": "b", "amount": 20}},
+        {file_handler.CHANGE_KEY: "delete", "id": "a"},
+        {file_handler.CHANGE_KEY: "update", "id": "d", "expense": {"id": "d", "amount": 40}},
+        {file_handler.CHANGE_KEY: "delete", "id": "d"},
+        # Changes to rows that are gone (or never existed) are ignored
+        {file_handler.CHANGE_KEY: "update", "id": "a", "expense": {"id": "a", "amount": 10}},
+        {file_handler.CHANGE_KEY: "delete", "id": "zz"},
+    ]
+    records, legacy = file_handler._replay(snapshot, journal)
+    assert records == [{"id": "b", "amount": 20}, {"id": "c", "amount": 3}]
+    assert legacy == 0
+
+def test_legacy_ids_are_stable_and_distinct(tmp_path):
+    legacy = [{"amount": 5, "category": "Food", "date": "2024-01-02", "description": "lunch"} for _ in range(3)]
+    legacy.append({"amount": 7, "category": "Rent", "date": "2024-01-03", "description": ""})
+    data_file = tmp_path / "old.json"
+    data_file.write_text(json.dumps(legacy))
+
+    # Identical records get distinct ids, and every process derives the same ones
+    copies = [dict(r) for r in legacy]
+    assert file_handler._assign_legacy_ids(copies) == len(legacy)
+    again = [dict(r) for r in legacy]
+    file_handler._assign_legacy_ids(again)
+    assert [id_of(r) for r in copies] == [id_of(r) for r in again]
+    assert len({id_of(r) for r in copies}) == len(legacy)
+    assert file_handler._assign_legacy_ids(copies) == 0
+
+    ledger = file_handler.Ledger.at(str(data_file))
+    store = ExpenseStore(ledger)
+    try:
+        loaded = list(store.expenses())
+        assert sorted(id_of(e) for e in loaded) == sorted(id_of(r) for r in copies)
+        store.update(loaded[1]['id'], {"amount": 50})
+        store.delete(loaded[3]['id'])
+        store.flush()
+    finally:
+        store.close()
+    # The derived ids were written back, so the edits still find their rows
+    saved = json.loads(data_file.read_text())
+    assert all(id_of(r) for r in saved)
+    with file_handler.use_ledger(ledger):
+        reloaded = records(file_handler.load_expenses())
+    assert [r['amount'] for r in reloaded if r['id'] == loaded[1]['id']] == [50]
+    assert len(reloaded) == len(legacy) - 1
+
+def test_compaction_drops_tombstones(tmp_path):
+    ledger = file_handler.Ledger.at(str(tmp_path / "ledger.json"))
+    store = ExpenseStore(ledger)
+    try:
+        store.add_many(make_expenses(50, seed=4))
+        store.flush()
+        expenses = list(store.expenses())
+        for expense in expenses[:10]:
+            store.delete(expense['id'])
+        store.update(expenses[10]['id'], {"amount": 99})
+        store.flush()
+        expected = records(store.expenses())
+    finally:
+        store.close()
+
+    with file_handler.use_ledger(ledger):
+        assert file_handler._has_changes(file_handler.journal_path())
+        assert file_handler.compact_journal()
+        assert not file_handler._has_changes(file_handler.journal_path())
+        with open(ledger.data_file) as f:
+            snapshot = json.load(f)
+        assert records(snapshot) == expected
+        assert not any(file_handler.CHANGE_KEY in r for r in snapshot)
+        assert records(file_handler.load_expenses()) == expected
+        assert file_handler.get_summary() == summarize(expected)
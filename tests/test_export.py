@@ -0,0 +1,95 @@
+"""CSV export: union of columns, filters and gzip, streamed from disk or from the store."""
+import csv
+import gzip
+
+from benchmarks.synthetic import make_expenses
+from utils import file_handler
+from utils.store import ExpenseStore
+
+def read_csv(path, opener=open):
+    with opener(path, "rt", newline="") as f:
+        reader = csv.DictReader(f)
+        return reader.fieldnames, list(reader)
+
+def ledger_with_extras(tmp_path, n=50):
+    expenses = make_expenses(n, seed=3)
+    # Fields that only a few records carry, one of them past the first chunk
+    expenses[0]["note"] = "first"
+    expenses[-1]["receipt"] = "receipt.png"
+    ledger = file_handler.Ledger.at(str(tmp_path / "ledger.json"))
+    with file_handler.use_ledger(ledger):
+        assert file_handler.save_expenses(expenses)
+        expenses = file_handler.load_expenses()
+    return ledger, expenses
+
+def test_union_schema(tmp_path):
+    ledger, expenses = ledger_with_extras(tmp_path, 2 * file_handler.CHUNK_SIZE + 10)
+    out = str(tmp_path / "out.csv")
+    calls = []
+    with file_handler.use_ledger(ledger):
+        assert file_handler.export_to_csv(out, progress=lambda written, total: calls.append((written, total)))
+    fields, rows = read_csv(out)
+    assert {"amount", "category", "date", "description", "note", "receipt"} <= set(fields)
+    assert len(rows) == len(expenses)
+    assert rows[0]["note"] == "first" and rows[1]["note"] == ""
+    assert rows[-1]["receipt"] == "receipt.png" and rows[0]["receipt"] == ""
+    assert [float(row["amount"]) for row in rows] == [float(e["amount"]) for e in expenses]
+    assert calls[-1] == (len(expenses), len(expenses))
+    assert [written for written, _ in calls] == [file_handler.CHUNK_SIZE, 2 * file_handler.CHUNK_SIZE, len(expenses)]
+
+def test_declared_fields(tmp_path):
+    ledger, expenses = ledger_with_extras(tmp_path)
+    out = str(tmp_path / "out.csv")
+    calls = []
+    with file_handler.use_ledger(ledger):
+        assert file_handler.export_to_csv(out, fields=["date", "amount"],
+                                          progress=lambda written, total: calls.append(total))
+    fields, rows = read_csv(out)
+    assert fields == ["date", "amount"]
+    assert len(rows) == len(expenses)
+    assert set(calls) == {None}
+
+def test_filtered(tmp_path):
+    ledger, expenses = ledger_with_extras(tmp_path)
+    category = expenses[0]["category"]
+    dates = sorted(e["date"] for e in expenses)
+    start, end = dates[10], dates[40]
+    wanted = [e for e in expenses if e["category"] == category and start <= e["date"] <= end]
+    assert wanted
+    out = str(tmp_path / "out.csv")
+    with file_handler.use_ledger(ledger):
+        assert file_handler.export_to_csv(out, category=category, start_date=start, end_date=end)
+        # Nothing selected: no file worth keeping, and False to say so
+        assert not file_handler.export_to_csv(str(tmp_path / "none.csv"), category="No such category")
+    _, rows = read_csv(out)
+    assert [row["description"] for row in rows] == [e["description"] for e in wanted]
+    assert all(row["category"] == category and start <= row["date"] <= end for row in rows)
+
+def test_gzip(tmp_path):
+    ledger, expenses = ledger_with_extras(tmp_path)
+    plain, packed = str(tmp_path / "out.csv"), str(tmp_path / "out.csv.gz")
+    with file_handler.use_ledger(ledger):
+        assert file_handler.export_to_csv(plain)
+        assert file_handler.export_to_csv(packed)
+        # Forced either way, whatever the name says
+        assert file_handler.export_to_csv(str(tmp_path / "forced.csv"), compress=True)
+        assert file_handler.export_to_csv(str(tmp_path / "raw.csv.gz"), compress=False)
+    with open(packed, "rb") as f:
+        assert f.read(2) == b"\x1f\x8b"
+    assert read_csv(packed, gzip.open) == read_csv(plain)
+    assert read_csv(str(tmp_path / "forced.csv"), gzip.open) == read_csv(plain)
+    assert read_csv(str(tmp_path / "raw.csv.gz")) == read_csv(plain)
+
+def test_store_export_matches_disk(tmp_path):
+    ledger, expenses = ledger_with_extras(tmp_path)
+    store = ExpenseStore(ledger)
+    try:
+        # Streamed from disk while nothing is cached, then from the loaded cache
+        cold, warm = str(tmp_path / "cold.csv"), str(tmp_path / "warm.csv")
+        assert store.export_csv(cold)
+        store.expenses()
+        assert store.export_csv(warm)
+    finally:
+        store.close()
+    assert read_csv(warm) == read_csv(cold)
+    assert len(read_csv(cold)[1]) == len(expenses)
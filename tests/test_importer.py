@@ -0,0 +1,98 @@
+"""Bank statement import: validation, rejections and duplicate detection."""
+import pytest
+
+from utils import file_handler, importer
+from utils.store import ExpenseStore
+
+STATEMENT = """Booking Date,Debit,Memo,Type
+2024-03-01,"$1,234.50",Rent,bills
+01/03/2024,-12.00,Coffee,food
+2024-03-02,(4.20),Bus,TRANSPORT
+2024-03-02,4.20,Bus,Transport
+2024-03-03,0,Refund,Misc
+2024-03-04,abc,Typo,Misc
+not a date,9.99,Lunch,Food
+2024-03-05,,Blank,Food
+2024-03-06,7.5,Cinema,Nightlife
+"""
+
+@pytest.fixture
+def store(tmp_path):
+    store = ExpenseStore(file_handler.Ledger.at(str(tmp_path / "ledger.json")))
+    yield store
+    store.close()
+
+def statement(tmp_path, text=STATEMENT, name="statement.csv"):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def test_rows_and_rejections(tmp_path, store):
+    result = importer.import_csv(statement(tmp_path), store)
+    assert result.committed
+    assert [(e["date"], e["amount"], e["category"]) for e in result.accepted] == [
+        ("2024-03-01", 1234.5, "Bills"),
+        ("2024-03-01", 12.0, "Food"),
+        ("2024-03-02", 4.2, "Transport"),
+        ("2024-03-02", 4.2, "Transport"), # A genuine repeat within the statement is kept
+        ("2024-03-06", 7.5, "Misc"), # Unknown categories fall back to the default
+    ]
+    # Line numbers count the header as line 1
+    assert [line for line, _ in result.rejected] == [6, 7, 8, 9]
+    assert result.duplicates == 0
+    assert result.summary() == "5 imported, 0 duplicates skipped, 4 rejected"
+    assert len(store.expenses()) == 5
+
+def test_reimport_adds_nothing(tmp_path, store):
+    path = statement(tmp_path)
+    first = importer.import_csv(path, store)
+    again = importer.import_csv(path, store)
+    assert again.committed
+    assert again.accepted == []
+    assert again.duplicates == len(first.accepted)
+    assert len(again.rejected) == len(first.rejected)
+    assert len(store.expenses()) == len(first.accepted)
+
+    # The store reloaded from disk agrees
+    with file_handler.use_ledger(store.ledger):
+        assert len(file_handler.load_expenses()) == len(first.accepted)
+
+def test_overlapping_statement(tmp_path, store):
+    importer.import_csv(statement(tmp_path), store)
+    # The next statement repeats one bus ride, has a third one and one new row
+    overlap = statement(tmp_path, "Date,Amount,Description,Category\n"
+                                  "2024-03-02,4.20,Bus,Transport\n"
+                                  "2024-03-02,4.20,Bus,Transport\n"
+                                  "2024-03-02,4.20,bus ,Transport\n"
+                                  "2024-03-07,3.00,Bakery,Food\n", "next.csv")
+    result = importer.import_csv(overlap, store)
+    assert result.duplicates == 2
+    assert [(e["description"], e["date"]) for e in result.accepted] == [("bus", "2024-03-02"), ("Bakery", "2024-03-07")]
+    assert len(store.expenses()) == 7
+
+def test_duplicates_kept_when_asked(tmp_path, store):
+    path = statement(tmp_path)
+    importer.import_csv(path, store)
+    result = importer.import_csv(path, store, skip_duplicates=False)
+    assert result.duplicates == 0
+    assert len(store.expenses()) == 2 * len(result.accepted)
+
+def test_batches(tmp_path, store, monkeypatch):
+    monkeypatch.setattr(importer, "BATCH_SIZE", 3)
+    reads = []
+    result = importer.import_csv(statement(tmp_path), store, progress=lambda read, total: reads.append(read))
+    assert reads == [3, 6, 9]
+    assert len(result.accepted) == 5 and len(result.rejected) == 4
+
+def test_explicit_mapping_and_date_format(tmp_path, store):
+    path = statement(tmp_path, "when,what,how much\n03.01.2024,Gym,30\n2024-01-03,Gym,30\n", "odd.csv")
+    result = importer.import_csv(path, store, mapping={"date": "when", "description": "what", "amount": "how much"},
+                                 date_format="%d.%m.%Y")
+    assert [(e["date"], e["category"]) for e in result.accepted] == [("2024-01-03", "Misc")]
+    assert [line for line, _ in result.rejected] == [3]
+
+def test_unmapped_columns(tmp_path, store):
+    path = statement(tmp_path, "Date,Memo\n2024-01-01,Gym\n", "bad.csv")
+    with pytest.raises(ValueError, match="amount"):
+        importer.import_csv(path, store)
+    assert store.expenses() == []
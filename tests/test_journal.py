@@ -0,0 +1,80 @@
+"""The JSON ledger's append-only journal: torn writes and compaction."""
+import json
+import os
+
+from benchmarks.synthetic import make_expenses
+from utils import file_handler
+from utils.expense import to_expense
+from utils.stats import summarize
+
+def descriptions(expenses):
+    return [e['description'] for e in expenses]
+
+def tagged(n, seed=0):
+    expenses = make_expenses(n, seed=seed)
+    for i, expense in enumerate(expenses):
+        expense["description"] = f"row {seed}-{i}"
+    # As the store hands them over: with ids, so loading never rewrites the snapshot
+    return [to_expense(expense) for expense in expenses]
+
+def test_torn_last_line_is_skipped(tmp_path):
+    ledger = file_handler.Ledger.at(str(tmp_path / "ledger.json"))
+    first, later = tagged(5), tagged(3, seed=1)
+    with file_handler.use_ledger(ledger):
+        assert file_handler.save_expenses([])
+        assert file_handler.add_expenses(first)
+        journal = file_handler.journal_path()
+        # A crash halfway through appending the next record
+        with open(journal, "ab") as f:
+            f.write(json.dumps(later[0].to_dict()).encode()[:25])
+        assert descriptions(file_handler.load_expenses()) == descriptions(first)
+
+        # The next append starts on a fresh line instead of merging into the torn one
+        assert file_handler.add_expenses(later)
+        assert descriptions(file_handler.load_expenses()) == descriptions(first + later)
+        with open(journal, "rb") as f:
+            lines = f.read().split(b"\n")
+        assert sum(1 for line in lines if line.strip()) == len(first) + len(later) + 1
+
+def test_blank_and_garbage_lines(tmp_path):
+    ledger = file_handler.Ledger.at(str(tmp_path / "ledger.json"))
+    rows = tagged(4)
+    with file_handler.use_ledger(ledger):
+        assert file_handler.save_expenses([])
+        with open(file_handler.journal_path(), "w") as f:
+            f.write(json.dumps(rows[0].to_dict()) + "\n\n" + json.dumps(rows[1].to_dict()) + "\n{not json\n" + json.dumps(rows[2].to_dict()) + "\n")
+        assert descriptions(file_handler.load_expenses()) == descriptions(rows[:3])
+
+def test_compaction_at_threshold(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_handler, "COMPACT_THRESHOLD", 4096)
+    ledger = file_handler.Ledger.at(str(tmp_path / "ledger.json"))
+    rows = tagged(60)
+    with file_handler.use_ledger(ledger):
+        assert file_handler.save_expenses(rows[:10])
+        journal = file_handler.journal_path()
+        compacted = False
+        for row in rows[10:]:
+            assert file_handler.add_expense(row)
+            size = os.path.getsize(journal) if os.path.exists(journal) else 0
+            assert size <= file_handler.COMPACT_THRESHOLD
+            compacted = compacted or size == 0
+        assert compacted
+        loaded = file_handler.load_expenses()
+        assert descriptions(loaded) == descriptions(rows)
+        assert file_handler.get_summary() == summarize(loaded)
+        # Everything folded so far is in the snapshot itself
+        with open(ledger.data_file) as f:
+            snapshot = json.load(f)
+        assert descriptions(snapshot) == descriptions(rows)[:len(snapshot)]
+
+def test_large_batch_goes_straight_to_the_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_handler, "COMPACT_THRESHOLD", 4096)
+    ledger = file_handler.Ledger.at(str(tmp_path / "ledger.json"))
+    rows = tagged(100)
+    with file_handler.use_ledger(ledger):
+        assert file_handler.save_expenses(rows[:5])
+        assert file_handler.add_expenses(rows[5:])
+        assert not os.path.exists(file_handler.journal_path()) or os.path.getsize(file_handler.journal_path()) == 0
+        with open(ledger.data_file) as f:
+            assert descriptions(json.load(f)) == descriptions(rows)
+        assert descriptions(file_handler.load_expenses()) == descriptions(rows)
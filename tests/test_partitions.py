@@ -0,0 +1,99 @@
+"""Partitioned ledgers: routing by month and the manifest's counts and spans."""
+import json
+import os
+from collections import Counter
+
+import pytest
+
+from benchmarks.synthetic import make_expenses
+from utils import file_handler
+from utils.expense import Expense, to_expense
+from utils.stats import summarize
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = file_handler.Ledger.at(str(tmp_path / "partitions"))
+    with file_handler.use_ledger(ledger):
+        yield ledger
+
+def entries():
+    return file_handler.read_manifest()["partitions"]
+
+def expense(date, amount=10, description="row"):
+    return to_expense({"amount": amount, "category": "Food", "date": date, "description": description})
+
+def stored_months():
+    """Month -> dates of the records actually stored in that month's partition."""
+    months = {}
+    for key in file_handler.partition_keys():
+        months[key] = [e['date'] for e in file_handler._load_json_ledger(file_handler.partition_path(key))]
+    return months
+
+def test_routing_by_month(ledger):
+    expenses = make_expenses(400, seed=5)
+    expenses += [{"amount": 3, "category": "Misc", "date": ""}, {"amount": 4, "category": "Misc", "date": "someday"}]
+    assert file_handler.save_expenses(expenses)
+
+    expected = Counter(e['date'][:7] for e in expenses[:-2])
+    expected[file_handler.UNDATED_PARTITION] = 2
+    assert {key: entry["count"] for key, entry in entries().items()} == expected
+    for key, dates in stored_months().items():
+        if key == file_handler.UNDATED_PARTITION:
+            assert sorted(dates) == ["", "someday"]
+        else:
+            assert all(date[:7] == key for date in dates)
+            assert entries()[key]["first"] == min(dates) and entries()[key]["last"] == max(dates)
+    assert "first" not in entries()[file_handler.UNDATED_PARTITION]
+    assert os.path.isfile(os.path.join(ledger.partition_dir, file_handler.MANIFEST_FILE))
+
+    # Date-range reads only open the partitions that can hold the range
+    assert file_handler.partition_keys("2023-02-10", "2023-04-01") == ["2023-02", "2023-03", "2023-04", "undated"]
+    assert file_handler.get_summary() == summarize(file_handler.load_expenses())
+
+def test_manifest_after_add_edit_and_delete(ledger):
+    assert file_handler.save_expenses([expense("2024-01-10"), expense("2024-01-20"), expense("2024-02-05")])
+    added = expense("2024-01-31")
+    assert file_handler.add_expense(added)
+    assert entries()["2024-01"] == {"count": 3, "first": "2024-01-10", "last": "2024-01-31"}
+    # The journal of the touched month only
+    assert os.path.exists(file_handler.journal_path(file_handler.partition_path("2024-01")))
+    assert not os.path.exists(file_handler.journal_path(file_handler.partition_path("2024-02")))
+
+    # An edit within its month keeps the count
+    edited = Expense.from_dict({**added.to_dict(), "amount": 99})
+    assert file_handler.update_expense(added, edited)
+    assert entries()["2024-01"]["count"] == 3
+
+    # An edit into another month moves the record, including into a new partition
+    moved = Expense.from_dict({**edited.to_dict(), "date": "2024-03-02"})
+    assert file_handler.update_expense(edited, moved)
+    assert entries()["2024-01"]["count"] == 2
+    assert entries()["2024-03"] == {"count": 1, "first": "2024-03-02", "last": "2024-03-02"}
+    assert stored_months()["2024-03"] == ["2024-03-02"]
+    assert file_handler.load_expenses()[-1].amount == 99
+
+    february = [e for e in file_handler.load_expenses() if e['date'] == "2024-02-05"][0]
+    assert file_handler.delete_expense(february)
+    assert entries()["2024-02"]["count"] == 0
+    assert len(file_handler.load_expenses()) == 3
+
+    # Spans only widen on writes; compaction makes them exact and drops the empty month
+    assert entries()["2024-01"]["last"] == "2024-01-31"
+    assert file_handler.compact_journal()
+    assert entries() == {
+        "2024-01": {"count": 2, "first": "2024-01-10", "last": "2024-01-20"},
+        "2024-03": {"count": 1, "first": "2024-03-02", "last": "2024-03-02"},
+    }
+    assert not os.path.exists(file_handler.partition_path("2024-02"))
+    assert sum(entry["count"] for entry in entries().values()) == len(file_handler.load_expenses())
+
+def test_json_ledger_split_on_first_use(tmp_path):
+    expenses = [expense("2024-01-10"), expense("2024-02-11"), expense("2024-02-12")]
+    with file_handler.use_ledger(file_handler.Ledger.at(str(tmp_path / "ledger.json"))):
+        assert file_handler.save_expenses(expenses)
+    # The directory next to a JSON ledger of the same name is split from it when first read
+    with file_handler.use_ledger(file_handler.Ledger.at(str(tmp_path / "ledger"))):
+        assert [e.id for e in file_handler.load_expenses()] == [e.id for e in expenses]
+        assert {key: entry["count"] for key, entry in entries().items()} == {"2024-01": 1, "2024-02": 2}
+    with open(tmp_path / "ledger.json") as f:
+        assert len(json.load(f)) == 3 # The source ledger is left as it was
@@ -0,0 +1,104 @@
+"""Recurring rules: their dates, their expansion over windows, and the budget checks they feed."""
+from datetime import date, timedelta
+
+import pytest
+
+from utils import file_handler, store as store_module
+from utils.expense import to_cents
+from utils.recurring import RecurringRule, expand, month_range
+from utils.store import ExpenseStore
+
+def dates(rule, first=None, last=None):
+    return [e['date'] for e in rule.occurrences(first, last)]
+
+def test_month_end_is_clamped():
+    rule = RecurringRule(1000, "Rent", "2024-01-31")
+    assert dates(rule, None, "2024-06-30") == ["2024-01-31", "2024-02-29", "2024-03-31", "2024-04-30",
+                                                "2024-05-31", "2024-06-30"]
+    assert dates(RecurringRule(1000, "Rent", "2023-01-30"), "2023-02-01", "2023-03-31") == ["2023-02-28", "2023-03-30"]
+    assert month_range("2023-02") == ("2023-02-01", "2023-02-28")
+    assert month_range("2024-02") == ("2024-02-01", "2024-02-29")
+
+def test_monthly_window_starts_mid_month():
+    rule = RecurringRule(1000, "Gym", "2024-01-15")
+    assert dates(rule, "2024-03-15", "2024-05-14") == ["2024-03-15", "2024-04-15"]
+    assert dates(rule, "2024-03-16", "2024-05-15") == ["2024-04-15", "2024-05-15"]
+    assert dates(rule, "2023-06-01", "2024-01-31") == ["2024-01-15"]
+    assert dates(RecurringRule(1000, "Gym", "2024-12-20"), "2024-12-21", "2025-01-31") == ["2025-01-20"]
+
+def test_weekly_alignment():
+    rule = RecurringRule(500, "Food", "2024-01-03", "weekly") # A Wednesday
+    assert dates(rule, None, "2024-01-17") == ["2024-01-03", "2024-01-10", "2024-01-17"]
+    assert dates(rule, "2024-01-10", "2024-01-24") == ["2024-01-10", "2024-01-17", "2024-01-24"]
+    assert dates(rule, "2024-01-11", "2024-01-24") == ["2024-01-17", "2024-01-24"]
+    assert dates(rule, "2023-12-01", "2024-01-02") == []
+
+def test_end_and_validation():
+    rule = RecurringRule(500, "Food", "2024-01-01", "weekly", end="2024-01-15")
+    assert dates(rule) == ["2024-01-01", "2024-01-08", "2024-01-15"]
+    assert dates(rule, None, "2024-01-10") == ["2024-01-01", "2024-01-08"]
+    for args in [("2024-01-01", "daily"), ("2024-13-01", "weekly"), ("2024-01-01", "weekly", "2023-12-31")]:
+        with pytest.raises(ValueError):
+            RecurringRule(500, "Food", *args)
+    copy = RecurringRule.from_dict(rule.to_dict())
+    assert (copy.id, copy.cents, copy.start, copy.end, copy.frequency) == (rule.id, 500, "2024-01-01", "2024-01-15", "weekly")
+
+def test_expand_over_adjacent_windows():
+    rules = [
+        RecurringRule(1000, "Rent", "2023-11-30"),
+        RecurringRule(250, "Food", "2024-01-05", "weekly"),
+        RecurringRule(999, "Phone", "2024-02-29", end="2024-08-31"),
+    ]
+    whole = list(expand(rules, "2024-01-01", "2024-12-31"))
+    assert [e.day for e in whole] == sorted(e.day for e in whole)
+    # Split at a few boundaries, the windows give back the same expenses, none twice
+    for cut in ("2024-01-31", "2024-02-28", "2024-02-29", "2024-06-14"):
+        before = list(expand(rules, "2024-01-01", cut))
+        after = list(expand(rules, (date.fromisoformat(cut) + timedelta(days=1)).isoformat(), "2024-12-31"))
+        assert [e.id for e in before + after] == [e.id for e in whole]
+    # Expanded again, every expense keeps its id
+    assert [e.id for e in expand(rules, "2024-01-01", "2024-12-31")] == [e.id for e in whole]
+
+def expense(amount, category, day):
+    return {"amount": amount, "category": category, "date": day, "description": ""}
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(store_module, "_today", lambda: "2024-03-15")
+    ledger = file_handler.Ledger.at(str(tmp_path / "ledger.json"))
+    with file_handler.use_ledger(ledger):
+        assert file_handler.save_expenses([
+            {"amount": 40, "category": "Food", "date": "2024-03-01"},
+            {"amount": "20.50", "category": "Food", "date": "2024-03-10"},
+            {"amount": 99, "category": "Food", "date": "2024-02-10"},
+            {"amount": 30, "category": "Fun", "date": "2024-03-02"},
+            {"amount": 500, "category": "Food", "date": "not a date"},
+        ])
+    store = ExpenseStore(ledger)
+    yield store
+    store.close()
+
+def test_spent_from_rollup_and_rules(store):
+    assert store._spent("2024-03", "Food") == 6050
+    assert store._spent("2024-02", "Food") == 9900
+    assert store._spent("2024-03", "Travel") == 0
+    # Weekly from 2024-03-04: the 4th and 11th are due by the 15th, the 18th is not yet
+    store.add_recurring(RecurringRule(1000, "Food", "2024-03-04", "weekly"))
+    assert store._spent("2024-03", "Food") == 6050 + 2000
+    store.add(expense(15, "Food", "2024-03-14")).result()
+    assert store._spent("2024-03", "Food") == 6050 + 2000 + 1500
+
+def test_budget_alert_thresholds(store):
+    store.set_budgets({"Food": to_cents(60.50), "Fun": 5000})
+    # At the limit is no alert; one cent over is
+    assert store.budget_alerts([expense(1, "Food", "2024-03-01")]) == []
+    assert store.over_budget("2024-03") == {}
+    store.add(expense(0.01, "Food", "2024-03-12")).result()
+    expected = [("Food", "2024-03", 6051, 6050)]
+    assert store.budget_alerts([expense(0.01, "Food", "2024-03-12")]) == expected
+    assert store.over_budget("2024-03") == {"Food": (6051, 6050)}
+    # Categories without a budget, undated expenses and other months raise nothing
+    assert store.budget_alerts([expense(1, "Travel", "2024-03-01"),
+                                expense(1, "Food", "not a date"),
+                                expense(1, "Fun", "2024-03-02")]) == []
+    assert store.budget_status("2024-02") == {"Food": (9900, 6050), "Fun": (0, 5000)}
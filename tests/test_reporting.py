@@ -0,0 +1,43 @@
+"""report.py must summarize every ledger layout, and refuse paths that are no ledger."""
+import json
+import os
+
+import pytest
+
+from benchmarks.synthetic import make_expenses
+from utils import file_handler
+from utils.reporting import report_ledgers
+from utils.stats import summarize
+
+def make_ledger(path, expenses):
+    with file_handler.use_ledger(file_handler.Ledger.at(path)):
+        assert file_handler.save_expenses(expenses)
+
+@pytest.mark.parametrize("name", ["ledger.json", "ledger.db", "ledger", "ledger" + os.sep])
+def test_report_on_each_layout(tmp_path, name):
+    expenses = make_expenses(1500, seed=4)
+    path = str(tmp_path / name)
+    make_ledger(path, expenses)
+    if "." not in name:
+        assert os.path.isfile(os.path.join(path, file_handler.MANIFEST_FILE))
+
+    out = tmp_path / "reports"
+    [(_, files, error)] = report_ledgers([path], str(out), chart_format=None, workers=1)
+    assert error is None
+    assert files == [str(out / "ledger_summary.json")]
+    with open(files[0]) as f:
+        report = json.load(f)
+    expected = summarize(expenses)
+    assert report["count"] == expected["count"] == len(expenses)
+    assert report["total"] == round(expected["total"], 2)
+
+def test_unrecognised_path_fails(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("not a ledger")
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    for ledger in (path, empty):
+        with pytest.raises(ValueError):
+            file_handler.summarize_ledger(str(ledger))
+    results = list(report_ledgers([str(path)], str(tmp_path / "reports"), chart_format=None, workers=1))
+    assert isinstance(results[0][2], ValueError)
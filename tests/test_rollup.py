@@ -0,0 +1,30 @@
+"""The vectorized rollup must agree with the pure-Python one, odd records included."""
+import pytest
+
+from benchmarks.synthetic import make_expenses
+from utils import rollup
+from utils.expense import to_expense
+from utils.rollup import Rollup
+from utils.stats import summarize
+
+pytest.importorskip("numpy")
+
+def make_ledger():
+    expenses = make_expenses(2000, seed=5)
+    for i, expense in enumerate(expenses):
+        if i % 97 == 0:
+            del expense["date"]
+        elif i % 89 == 0:
+            expense["date"] = "not a date"
+    return expenses
+
+@pytest.mark.parametrize("records", [False, True])
+def test_vectorized_build_matches_python(monkeypatch, records):
+    expenses = make_ledger()
+    if records:
+        expenses = [to_expense(e) for e in expenses]
+    python = Rollup.from_expenses(expenses)
+    monkeypatch.setattr(rollup, "VECTORIZE_THRESHOLD", 1)
+    vectorized = Rollup.build(expenses)
+    assert vectorized.cells == python.cells
+    assert vectorized.summary() == python.summary() == summarize(expenses)
@@ -0,0 +1,91 @@
+"""The trigram index must find exactly what a linear scan finds, through edits and deletes."""
+import random
+
+import pytest
+
+from benchmarks.synthetic import make_expenses
+from utils import file_handler, store as store_module
+from utils.expense import to_expense
+from utils.search_index import SearchIndex, matches, search_terms
+from utils.store import ExpenseStore
+
+WORDS = ["uber", "Uber Eats", "groceries", "coffee", "rent", "café crème", "#1234", "", None]
+QUERIES = ["uber", "UBER eats", "ub", "e", "cré", "#12", "coffee rent", "food", "zzz", "r"]
+
+def make_ledger(n=600, seed=9):
+    rng = random.Random(seed)
+    expenses = make_expenses(n, seed=seed)
+    for expense in expenses:
+        expense["description"] = rng.choice(WORDS)
+    return [to_expense(e) for e in expenses]
+
+def scan(expenses, text):
+    terms = search_terms(text)
+    return sorted(i for i, e in enumerate(expenses) if matches(e, terms))
+
+def check(index, expenses):
+    assert len(index) == len(expenses)
+    for text in QUERIES:
+        assert sorted(index.search(text)) == scan(expenses, text), text
+        texts = index.matching(text)
+        assert index.count(texts) == len(scan(expenses, text))
+        assert sorted(index.positions(texts)) == scan(expenses, text)
+
+def test_build_and_add():
+    expenses = make_ledger()
+    index = SearchIndex(expenses[:200])
+    check(index, expenses[:200])
+    index.add_many(expenses[200:])
+    check(index, expenses)
+    assert sorted(index.search("")) == list(range(len(expenses)))
+
+def test_replace_remove_move():
+    rng = random.Random(1)
+    expenses = make_ledger()
+    index = SearchIndex(expenses)
+    for step in range(300):
+        i = rng.randrange(len(expenses))
+        if step % 3:
+            new = to_expense(dict(expenses[i].to_dict(), description=rng.choice(WORDS)))
+            index.replace(i, expenses[i], new)
+            expenses[i] = new
+        else:
+            # As ExpenseStore.delete does: the last row moves into the freed position
+            index.remove(i, expenses[i])
+            last = expenses.pop()
+            if i < len(expenses):
+                index.move(len(expenses), i, last)
+                expenses[i] = last
+    check(index, expenses)
+
+@pytest.mark.parametrize("lazy_hits", [0, 10 ** 9])
+def test_store_search_matches_scan(tmp_path, monkeypatch, lazy_hits):
+    monkeypatch.setattr(store_module, "LAZY_HITS", lazy_hits)
+    expenses = make_ledger()
+    ledger = file_handler.Ledger.at(str(tmp_path / "ledger.json"))
+    with file_handler.use_ledger(ledger):
+        assert file_handler.save_expenses([e.to_dict() for e in expenses])
+    store = ExpenseStore(ledger)
+    try:
+        store.prepare_search()
+        current = store.expenses()
+        for expense in list(current)[::7]:
+            store.update(expense['id'], {"description": "Uber to the airport"})
+        for expense in list(current)[::11]:
+            store.delete(expense['id'])
+        current = list(store.expenses())
+        # Broad unfiltered searches are ordered lazily once there are enough hits
+        assert isinstance(store.query(text="e"), store_module._Hits) == (lazy_hits == 0)
+        for text in QUERIES:
+            for category, start_date in [(None, None), ("Food", None), (None, "2023-01-01")]:
+                result = store.query(category, start_date, None, text)
+                expected = file_handler.filter_expenses(current, category, start_date, None, text)
+                assert len(result) == len(expected)
+                # Ties between equal dates may list in another order after a delete
+                assert [e['date'] for e in result] == [e['date'] for e in expected]
+                assert sorted(e['id'] for e in result) == sorted(e['id'] for e in expected)
+                if result:
+                    assert result[-1] is list(result)[-1]
+                    assert result[1:3] == list(result)[1:3]
+    finally:
+        store.close()
@@ -0,0 +1,19 @@
+"""SQLite summaries must agree with the cent sums used for every other ledger."""
+from benchmarks.synthetic import make_expenses
+from utils import file_handler, sqlite_backend
+from utils.stats import summarize
+
+def test_summary_matches_stats(tmp_path):
+    expenses = make_expenses(3000, seed=11)
+    # Amounts whose float sum drifts away from the exact total
+    expenses += [{"amount": 0.1, "category": "Food", "date": "2024-01-02"} for _ in range(1000)]
+    expenses += [{"amount": "19.99", "category": "Misc", "date": "not a date"}]
+    db_file = str(tmp_path / "expenses.db")
+    sqlite_backend.import_expenses(db_file, expenses)
+
+    assert sqlite_backend.get_summary(db_file) == summarize(expenses)
+    assert file_handler.summarize_ledger(db_file) == summarize(expenses)
+
+def test_empty_database(tmp_path):
+    db_file = str(tmp_path / "expenses.db")
+    assert sqlite_backend.get_summary(db_file) == summarize([])
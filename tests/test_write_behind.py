@@ -0,0 +1,128 @@
+"""The write-behind queue, the store's bookkeeping of its own writes and concurrent writers on one ledger."""
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from benchmarks.synthetic import make_expenses
+from utils import file_handler, store as store_module, write_behind
+from utils.stats import summarize
+from utils.store import ExpenseStore
+from utils.write_behind import WriteBehindQueue
+
+PROCESSES = 3
+ROWS = 40
+
+def test_queue_commits_in_order_and_batches(monkeypatch):
+    monkeypatch.setattr(write_behind, "MAX_BATCH", 10)
+    batches, committed = [], []
+    release = threading.Event()
+
+    def commit(changes):
+        release.wait()
+        batches.append([new for _, new in changes])
+        return "saved"
+
+    queue = WriteBehindQueue(commit, lambda changes, result: committed.append(result))
+    try:
+        futures = [queue.submit([i]) for i in range(35)]
+        assert not queue.idle()
+    finally:
+        release.set()
+    queue.flush()
+    assert queue.idle()
+    assert [row for batch in batches for row in batch] == list(range(35))
+    assert all(len(batch) <= 10 for batch in batches) and len(batches) > 1
+    assert committed == ["saved"] * len(batches)
+    assert all(future.result() is True for future in futures)
+    queue.close()
+    with pytest.raises(RuntimeError):
+        queue.submit([1])
+
+def test_failed_commit_fails_every_future():
+    errors = []
+    queue = WriteBehindQueue(lambda changes: False, on_error=lambda changes, error: errors.append(len(changes)))
+    futures = [queue.submit([i]) for i in range(3)]
+    queue.close()
+    for future in futures:
+        with pytest.raises(IOError):
+            future.result()
+    assert sum(errors) == 3
+
+def test_own_writes_do_not_reload(tmp_path, monkeypatch):
+    ledger = file_handler.Ledger.at(str(tmp_path / "ledger.json"))
+    with file_handler.use_ledger(ledger):
+        file_handler.save_expenses(make_expenses(300, seed=1)) # Legacy rows: ids are saved on first load
+    loads = []
+    real_load = file_handler.load_expenses
+    monkeypatch.setattr(file_handler, "load_expenses", lambda: loads.append(1) or real_load())
+    store = ExpenseStore(ledger)
+    other = ExpenseStore(ledger)
+    try:
+        expenses = store.expenses()
+        for expense in make_expenses(20, seed=2):
+            store.add(expense)
+        store.update(expenses[0]['id'], {"amount": 1})
+        store.delete(expenses[1]['id'])
+        store.flush()
+        store._last_check = 0 # Let the next read stat the files again
+        assert store.expenses() is expenses and len(loads) == 1
+
+        # A write by anyone else is still noticed
+        rows = len(expenses)
+        other.add(make_expenses(1, seed=3)[0]).result()
+        store._last_check = 0
+        assert len(store.expenses()) == rows + 1 and len(loads) == 2
+    finally:
+        store.close()
+        other.close()
+
+def writer(path, worker, start):
+    """Runs in a child process: add ROWS tagged expenses, one by one or through a store."""
+    ledger = file_handler.Ledger.at(path)
+    expenses = make_expenses(ROWS, seed=worker)
+    for i, expense in enumerate(expenses):
+        expense["description"] = f"w{worker}-{i}"
+    start.wait()
+    if worker == 0:
+        with file_handler.use_ledger(ledger):
+            for expense in expenses:
+                if not file_handler.add_expense(expense):
+                    raise IOError("add_expense failed")
+        return
+    store = ExpenseStore(ledger)
+    futures = [store.add(expense) for expense in expenses]
+    store.close()
+    for future in futures:
+        future.result()
+
+@pytest.mark.parametrize("name", ["ledger.json", "ledger", "ledger.db"])
+def test_concurrent_writers_lose_nothing(tmp_path, name):
+    path = str(tmp_path / name)
+    ledger = file_handler.Ledger.at(path)
+    with file_handler.use_ledger(ledger):
+        file_handler.save_expenses([])
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Event()
+    workers = [ctx.Process(target=writer, args=(path, w, start)) for w in range(PROCESSES)]
+    for p in workers:
+        p.start()
+    start.set()
+    for p in workers:
+        p.join(60)
+    assert [p.exitcode for p in workers] == [0] * PROCESSES
+
+    with file_handler.use_ledger(ledger):
+        expenses = file_handler.load_expenses()
+        assert file_handler.get_summary() == summarize(expenses)
+    written = {}
+    for w in range(PROCESSES):
+        for i, expense in enumerate(make_expenses(ROWS, seed=w)):
+            written[f"w{w}-{i}"] = expense
+    assert sorted(e['description'] for e in expenses) == sorted(written)
+    for expense in expenses:
+        # Every row whole: the fields as written, nothing torn or mixed up
+        original = written[expense['description']]
+        assert (expense['amount'], expense['category'], expense['date']) == \
+            (original['amount'], original['category'], original['date'])
@@ -0,0 +1,80 @@
+from collections import defaultdict
+
+from utils import metrics
+from utils.expense import category_of, cents_of, month_of, to_cents
+
+class Aggregates:
+    """
+    Running dashboard totals: overall sum and count plus per-category and
+    per-month (YYYY-MM) sums.
+
+    Built in a single pass over the ledger and then kept current with add(),
+    so the dashboard never has to rescan. Sums are kept in integer cents, so
+    they never drift and match the functions in utils.stats exactly.
+    """
+
+    def __init__(self):
+        self.cents = 0
+        self.count = 0
+        self.category_cents = defaultdict(int)
+        self.monthly_cents = defaultdict(int)
+
+    @classmethod
+    @metrics.timed("aggregates.build")
+    def from_expenses(cls, expenses):
+        agg = cls()
+        for item in expenses:
+            agg.add(item)
+        return agg
+
+    @classmethod
+    def from_summary(cls, summary):
+        """Seed the aggregates from an already computed summary (e.g. SQL)."""
+        agg = cls()
+        agg.cents = to_cents(summary["total"])
+        agg.count = summary["count"]
+        agg.category_cents.update((k, to_cents(v)) for k, v in summary["categories"].items())
+        agg.monthly_cents.update((k, to_cents(v)) for k, v in summary["monthly"].items())
+        return agg
+
+    @classmethod
+    def merged(cls, parts):
+        """Totals across several ledgers, adding up their aggregates rather than their rows."""
+        agg = cls()
+        for part in parts:
+            agg.cents += part.cents
+            agg.count += part.count
+            for k, v in part.category_cents.items():
+                agg.category_cents[k] += v
+            for k, v in part.monthly_cents.items():
+                agg.monthly_cents[k] += v
+        return agg
+
+    def add(self, expense):
+        """Fold one expense into the totals in O(1)."""
+        cents = cents_of(expense)
+        self.cents += cents
+        self.count += 1
+        self.category_cents[category_of(expense)] += cents
+        month = month_of(expense)
+        if month is not None: # Skip invalid dates, as get_monthly_spending does
+            self.monthly_cents[month] += cents
+
+    @property
+    def total(self):
+        return self.cents / 100
+
+    def top_category(self):
+        """Return the category with the highest spending."""
+        if not self.category_cents:
+            return "N/A"
+        return max(self.category_cents, key=self.category_cents.get)
+
+    def summary(self):
+        """Return the figures in the same shape as stats.summarize."""
+        return {
+            "total": self.cents / 100,
+            "count": self.count,
+            "categories": {k: v / 100 for k, v in self.category_cents.items()},
+            "monthly": {k: v / 100 for k, v in self.monthly_cents.items()},
+        }
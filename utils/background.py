@@ -0,0 +1,97 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# How often the Tk thread checks for finished work
+POLL_MS = 30
+
+class Cancelled(Exception):
+    """Raised by Task.check() in a worker whose task has been cancelled."""
+
+class Task:
+    """Handle for work submitted to a TaskRunner."""
+
+    def __init__(self):
+        self.future = None
+        self.progress = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def report(self, *progress):
+        """Record progress from the worker; the latest value is delivered on the Tk thread."""
+        self.progress = progress
+
+    def check(self):
+        """Called by the worker between steps: raises Cancelled once the task is cancelled."""
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    def cancel(self):
+        """
+        Drop the task: it won't start if still queued, a running worker stops
+        at its next check(), and its callbacks never run.
+        """
+        self._cancel.set()
+        self.future.cancel()
+
+class TaskRunner:
+    """
+    Runs slow functions on worker threads and hands the results back on the
+    Tk thread.
+
+    Tk is not thread-safe, so workers never touch widgets. Instead the Tk
+    thread polls the future with `after()` and calls `on_done` (or
+    `on_error`) itself once the result is ready.
+    """
+
+    def __init__(self, widget, max_workers=2):
+        self.widget = widget
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="expense-worker")
+
+    def submit(self, func, on_done, on_error=None, *args, on_progress=None, cancellable=False):
+        """
+        Run func(*args) in the background; returns a cancellable Task.
+
+        With `on_progress`, func also receives `progress=task.report` and
+        on_progress(*values) is called on the Tk thread as values come in.
+        With `cancellable`, func also receives `check=task.check` and should
+        call it between its steps, so a cancelled task stops early instead
+        of running to the end and holding the store for the next one.
+        """
+        task = Task()
+        kwargs = {"progress": task.report} if on_progress is not None else {}
+        if cancellable:
+            kwargs["check"] = task.check
+        task.future = self.executor.submit(func, *args, **kwargs)
+        self.widget.after(POLL_MS, self._poll, task, on_done, on_error, on_progress)
+        return task
+
+    def watch(self, future, on_done, on_error=None):
+        """Deliver the outcome of a Future started elsewhere on the Tk thread; returns a Task."""
+        task = Task()
+        task.future = future
+        self.widget.after(POLL_MS, self._poll, task, on_done, on_error, None)
+        return task
+
+    def _poll(self, task, on_done, on_error, on_progress):
+        if task.cancelled:
+            return
+        if on_progress is not None and task.progress is not None:
+            progress, task.progress = task.progress, None
+            on_progress(*progress)
+        if not task.future.done():
+            self.widget.after(POLL_MS, self._poll, task, on_done, on_error, on_progress)
+            return
+        error = task.future.exception()
+        if error is None:
+            on_done(task.future.result())
+        elif on_error is not None:
+            on_error(error)
+        else:
+            raise error # Reported through Tk's report_callback_exception
+
+    def shutdown(self):
+        """Stop accepting work and discard anything still queued."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
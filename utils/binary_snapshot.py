@@ -0,0 +1,276 @@
+"""
+Binary columnar snapshot of a JSON ledger, read through mmap.
+
+The file holds fixed-width columns (amount in cents, ordinal day and
+category code) and, for ids, descriptions, timestamps and extra fields,
+one string blob per column with an offset per row. Opening it parses a
+small JSON header and maps the rest, so only the pages that are actually
+read get loaded: one row through snapshot[i], the numeric columns alone
+(via NumPy) for statistics, or everything through expenses().
+
+It is a cache next to the JSON snapshot, never the ledger itself; its
+header records which snapshot (size and mtime) and how many bytes of the
+journal it was built from, and file_handler rebuilds it once that changes.
+"""
+import json
+import mmap
+import os
+import sys
+from array import array
+from collections.abc import Sequence
+from datetime import date
+
+from utils.expense import Expense, _intern, bulk_allocation, parse_date
+
+MAGIC = b"EXPSNAP1"
+VERSION = 1
+ALIGN = 8 # Every column starts on an 8-byte boundary
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def _string_column(values):
+    """(offsets, blob, nulls) for a column of str-or-None values."""
+    strings = ["" if v is None else v for v in values]
+    # Joined with NUL so a reader can decode and split the whole blob in one go;
+    # offsets[i] is where row i starts, offsets[n] one past the end
+    blob = "\0".join(strings).encode("utf-8")
+    offsets = array("q", [0] * (len(strings) + 1))
+    position = 0
+    for i, s in enumerate(strings):
+        offsets[i] = position
+        position += (len(s) if s.isascii() else len(s.encode("utf-8"))) + 1
+    offsets[len(strings)] = position
+    nulls = None
+    if any(v is None for v in values):
+        nulls = array("B", [v is None for v in values])
+    return offsets, blob, nulls
+
+def write(path, expenses, source):
+    """
+    Write expenses (Expense records with ids) as a snapshot tagged with
+    `source`; returns False, writing nothing, if some record cannot be stored.
+    """
+    if any(e.__class__ is not Expense or not e.id for e in expenses):
+        return False
+
+    categories = {}
+    canonical = {}
+    odd_dates = {} # row -> date string, where the ordinal day alone does not give it back
+    days = array("i", bytes(4 * len(expenses)))
+    for i, e in enumerate(expenses):
+        ok = canonical.get(e.date)
+        if ok is None:
+            ok = canonical[e.date] = e.day is not None and date.fromordinal(e.day).isoformat() == e.date
+        if ok:
+            days[i] = e.day
+        else:
+            odd_dates[str(i)] = e.date
+    columns = {
+        "cents": array("q", [e.cents for e in expenses]),
+        "day": days,
+        "category": array("i", [categories.setdefault(e.category, len(categories)) for e in expenses]),
+    }
+    strings = {
+        "id": [e.id for e in expenses],
+        "description": [e.description for e in expenses],
+        "timestamp": [e.timestamp for e in expenses],
+        "extra": [None if e.extra is None else json.dumps(e.extra) for e in expenses],
+    }
+    split = {}
+    for name, values in strings.items():
+        if all(v is None for v in values):
+            continue # Left out entirely; reads back as all None
+        offsets, blob, nulls = _string_column(values)
+        columns[name + ".offsets"] = offsets
+        columns[name] = blob
+        if nulls is not None:
+            columns[name + ".nulls"] = nulls
+        split[name] = blob.count(b"\0") == max(len(values) - 1, 0)
+
+    # Lay the columns out after the header, then write the header with their positions
+    layout, position = {}, 0
+    for name, data in columns.items():
+        size = len(data) * (data.itemsize if isinstance(data, array) else 1)
+        layout[name] = [position, size, data.typecode if isinstance(data, array) else "B"]
+        position += -(-size // ALIGN) * ALIGN
+    header = {
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "rows": len(expenses),
+        "source": source,
+        "categories": list(categories),
+        "odd_dates": odd_dates,
+        "splittable": split,
+        "columns": layout,
+    }
+    head = json.dumps(header).encode("utf-8")
+    head += b" " * (-(len(MAGIC) + 8 + len(head)) % ALIGN)
+    start = len(MAGIC) + 8 + len(head)
+
+    tmp_file = path + ".tmp"
+    try:
+        with open(tmp_file, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(head).to_bytes(8, "little"))
+            f.write(head)
+            for name, data in columns.items():
+                f.seek(start + layout[name][0])
+                f.write(data)
+            f.truncate(start + position)
+            f.flush()
+            os.fsync(f.fileno()) # A torn cache would be served as if it were the ledger
+        os.replace(tmp_file, path)
+        return True
+    except IOError:
+        return False
+
+def open_snapshot(path):
+    """Map the snapshot at path, or None if it is missing, damaged or from another format version."""
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError): # missing, or empty (which cannot be mapped)
+        return None
+    try:
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError
+        size = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 8], "little")
+        start = len(MAGIC) + 8 + size
+        header = json.loads(buffer[len(MAGIC) + 8:start])
+        if header["version"] != VERSION or header["byteorder"] != sys.byteorder:
+            raise ValueError
+        if any(start + offset + length > len(buffer) for offset, length, _ in header["columns"].values()):
+            raise ValueError # truncated
+        return BinarySnapshot(buffer, header, start)
+    except (ValueError, KeyError, TypeError):
+        buffer.close()
+        return None
+
+class BinarySnapshot(Sequence):
+    """
+    A mapped snapshot: a read-only sequence of Expense records decoded on
+    access, plus the raw columns. Close it (or use it as a context manager)
+    once done, unless arrays from columns() are still in use.
+    """
+
+    def __init__(self, buffer, header, start):
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._start = start
+        self._header = header
+        self._columns = None
+        self.source = header["source"]
+        self.categories = header["categories"]
+
+    def __len__(self):
+        return self._header["rows"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self._columns = None
+        self._view.release()
+        try:
+            self._buffer.close()
+        except BufferError:
+            pass # NumPy columns still point into it; the mapping goes when they do
+
+    def _column(self, name):
+        """A column as a memoryview over the mapped file (no copy), or None if absent."""
+        entry = self._header["columns"].get(name)
+        if entry is None:
+            return None
+        offset, length, typecode = entry
+        column = self._view[self._start + offset:self._start + offset + length]
+        return column if typecode == "B" else column.cast(typecode)
+
+    def _string(self, name, i):
+        nulls = self._column(name + ".nulls")
+        if name not in self._header["splittable"] or nulls is not None and nulls[i]:
+            return None
+        offsets = self._column(name + ".offsets")
+        return bytes(self._column(name)[offsets[i]:offsets[i + 1] - 1]).decode("utf-8")
+
+    def _strings(self, name):
+        """A whole string column as a list (None for missing values)."""
+        n = len(self)
+        blob = self._column(name)
+        if blob is None or not n:
+            return [None] * n
+        if self._header["splittable"][name]:
+            values = bytes(blob).decode("utf-8").split("\0")
+        else:
+            offsets = self._column(name + ".offsets").tolist()
+            values = [bytes(blob[offsets[i]:offsets[i + 1] - 1]).decode("utf-8") for i in range(n)]
+        nulls = self._column(name + ".nulls")
+        if nulls is not None:
+            values = [None if null else v for v, null in zip(values, nulls.tolist())]
+        return values
+
+    def _date(self, i, day):
+        odd = self._header["odd_dates"].get(str(i), ...)
+        if odd is not ...:
+            return parse_date(odd)
+        return parse_date(date.fromordinal(day).isoformat())
+
+    def __getitem__(self, i):
+        """Decode one row, touching only the pages that hold it."""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("snapshot index out of range")
+        extra = self._string("extra", i)
+        return Expense.from_columns(
+            [self._string("id", i)],
+            [self._column("cents")[i]],
+            [self.categories[self._column("category")[i]]],
+            [self._date(i, self._column("day")[i])],
+            [_intern(self._string("description", i))],
+            [self._string("timestamp", i)],
+            [None if extra is None else json.loads(extra)],
+        )[0]
+
+    def expenses(self):
+        """Decode every row into a list of Expense records."""
+        with bulk_allocation():
+            categories = [_intern(c) for c in self.categories]
+            days = self._column("day").tolist()
+            # Distinct values are converted once and then looked up per row
+            entries = {day: parse_date(date.fromordinal(day).isoformat()) for day in set(days) if day}
+            dates = list(map(entries.get, days))
+            for i, value in self._header["odd_dates"].items():
+                dates[int(i)] = parse_date(value)
+            descriptions = self._strings("description")
+            interned = {d: _intern(d) for d in set(descriptions)}
+            extras = self._strings("extra")
+            if any(extras):
+                extras = [None if extra is None else json.loads(extra) for extra in extras]
+            return Expense.from_columns(
+                self._strings("id"),
+                self._column("cents").tolist(),
+                list(map(categories.__getitem__, self._column("category").tolist())),
+                dates,
+                list(map(interned.__getitem__, descriptions)),
+                self._strings("timestamp"),
+                extras,
+            )
+
+    def columns(self):
+        """The amount, date and category columns as a ColumnarLedger over the mapped file (NumPy required)."""
+        if self._columns is None:
+            import numpy as np
+            from utils.columnar import ColumnarLedger
+            cents = np.frombuffer(self._column("cents"), dtype=np.int64)
+            days = np.frombuffer(self._column("day"), dtype=np.int32)
+            dates = (days.astype(np.int64) - EPOCH_ORDINAL).astype("datetime64[D]")
+            dates[days == 0] = np.datetime64("NaT")
+            for i, value in self._header["odd_dates"].items():
+                day = parse_date(value)[1]
+                dates[int(i)] = np.datetime64("NaT") if day is None else np.datetime64(day - EPOCH_ORDINAL, "D")
+            codes = np.frombuffer(self._column("category"), dtype=np.int32)
+            self._columns = ColumnarLedger(cents, dates, codes, list(self.categories))
+        return self._columns
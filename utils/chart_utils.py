@@ -1,16 +1,42 @@
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import math
+from datetime import date
+
+import matplotlib
+import matplotlib.style
+from matplotlib import dates as mdates
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+
+from utils import metrics, trend
 
 # consistent colors
 COLOR_PRIMARY = "#1f6aa5" # distinctive blue
 COLOR_BG = "#2b2b2b" # dark grey for card background
 COLOR_TEXT = "#ffffff"
 COLOR_ACCENT = ["#3B8ED0", "#1F6AA5", "#144870", "#E1E1E1", "#D1D5DB"] # Blue-ish palette
+COLOR_ALERT = "#ff6b6b" # over budget
+
+PIE_START_ANGLE = 90
+PIE_LABEL_DISTANCE = 1.1
+PIE_PCT_DISTANCE = 0.6
+
+TREND_TITLES = {"day": "Daily Spending Trend", "week": "Weekly Spending Trend", "month": "Monthly Spending Trend"}
+TREND_MARKER_LIMIT = 60 # Mark individual points only while this few are visible
+TREND_ZOOM_STEP = 1.25 # Range scale per scroll-wheel notch
+TREND_MIN_DAYS = 7 # Narrowest range zooming in can reach
+
+# Matplotlib dates count days from its epoch; add this to a date ordinal
+_DATE_OFFSET = mdates.date2num(date(1970, 1, 1)) - date(1970, 1, 1).toordinal()
+
+_theme_applied = False
 
 def setup_dark_theme():
-    """Configure matplotlib for dark theme"""
-    plt.style.use('dark_background')
-    plt.rcParams.update({
+    """Configure matplotlib for dark theme (only the first call does any work)"""
+    global _theme_applied
+    if _theme_applied:
+        return
+    matplotlib.style.use('dark_background')
+    matplotlib.rcParams.update({
         'axes.facecolor': COLOR_BG,
         'figure.facecolor': COLOR_BG,
         'text.color': COLOR_TEXT,
@@ -21,88 +47,298 @@ def setup_dark_theme():
         'font.family': 'sans-serif',
         'font.size': 10
     })
+    _theme_applied = True
+
+def _pie_colors(n):
+    if n > 5:
+        return matplotlib.colormaps["Paired"].colors
+    return COLOR_ACCENT[:n]
+
+def _pct(fraction):
+    return f"{fraction * 100:1.1f}%"
+
+class ChartRenderer:
+    """
+    Owns the dashboard figures for the lifetime of the app.
+
+    Figures are plain matplotlib Figures (not registered with pyplot), created
+    once and updated in place when the data changes, so visiting the
+    dashboard repeatedly does not accumulate figures.
+    """
+
+    def __init__(self):
+        setup_dark_theme()
+        self.pie_figure = None
+        self.trend_figure = None
+        self._pie_labels = None
+        self._pie_artists = None
+        self._trend_line = None
+        self._trend_fill = None
+        self._trend_points = ([], [])
+        self._trend_canvas = None
+        self._trend_cids = [] # Handlers on the trend figure, replaced with each new canvas
+        self._trend_drag = None # (pointer x, x range) while panning
+
+    # --- Category pie ---
+
+    def _build_pie(self, labels, sizes):
+        ax = self.pie_figure.axes[0]
+        ax.clear()
+        wedges, texts, autotexts = ax.pie(
+            sizes,
+            labels=labels,
+            autopct='%1.1f%%',
+            startangle=PIE_START_ANGLE,
+            colors=_pie_colors(len(labels)),
+            textprops=dict(color=COLOR_TEXT),
+            wedgeprops=dict(width=0.6, edgecolor=COLOR_BG)  # Donut style
+        )
+
+        # Style text
+        for text in texts:
+            text.set_size(9)
+        for text in autotexts:
+            text.set_size(9)
+            text.set_weight("bold")
+
+        ax.axis('equal')
+        self._pie_labels = labels
+        self._pie_artists = (wedges, texts, autotexts)
+
+    def _move_pie(self, sizes):
+        """Reposition existing wedges and labels for new values."""
+        wedges, texts, autotexts = self._pie_artists
+        total = float(sum(sizes))
+        theta1 = PIE_START_ANGLE
+        for wedge, text, autotext, size in zip(wedges, texts, autotexts, sizes):
+            fraction = size / total if total else 0
+            theta2 = theta1 + 360 * fraction
+            wedge.set_theta1(theta1)
+            wedge.set_theta2(theta2)
+
+            mid = math.radians((theta1 + theta2) / 2)
+            x, y = math.cos(mid), math.sin(mid)
+            text.set_position((PIE_LABEL_DISTANCE * x, PIE_LABEL_DISTANCE * y))
+            text.set_horizontalalignment('left' if x > 0 else 'right')
+            autotext.set_position((PIE_PCT_DISTANCE * x, PIE_PCT_DISTANCE * y))
+            autotext.set_text(_pct(fraction))
+            theta1 = theta2
+
+    def _mark_pie(self, over_budget):
+        """Outline the wedges (and colour the labels) of the categories in over_budget."""
+        wedges, texts, _ = self._pie_artists
+        for label, wedge, text in zip(self._pie_labels, wedges, texts):
+            over = label in over_budget
+            wedge.set_edgecolor(COLOR_ALERT if over else COLOR_BG)
+            wedge.set_linewidth(3 if over else 1)
+            text.set_color(COLOR_ALERT if over else COLOR_TEXT)
+            text.set_text(f"⚠ {label}" if over else label)
+
+    @metrics.timed("chart.pie")
+    def update_pie(self, category_data, over_budget=()):
+        """Bring the pie figure up to date and return it; categories in over_budget are highlighted."""
+        if self.pie_figure is None:
+            self.pie_figure = Figure(figsize=(5, 4), dpi=100)
+            self.pie_figure.patch.set_facecolor(COLOR_BG)
+            self.pie_figure.add_subplot()
+
+        labels = list(category_data.keys())
+        sizes = list(category_data.values())
+        if labels == self._pie_labels:
+            self._move_pie(sizes)
+        else:
+            self._build_pie(labels, sizes)
+        self._mark_pie(over_budget)
+        return self.pie_figure
+
+    # --- Spending trend ---
+
+    def _build_trend(self):
+        self.trend_figure = Figure(figsize=(5, 4), dpi=100)
+        self.trend_figure.patch.set_facecolor(COLOR_BG)
+        ax = self.trend_figure.add_subplot()
+        ax.set_facecolor(COLOR_BG)
+
+        # Plot with gradient-like effect or simple clean line
+        self._trend_line, = ax.plot(
+            [],
+            [],
+            marker='o',
+            linestyle='-',
+            color=COLOR_PRIMARY,
+            linewidth=2,
+            markersize=6
+        )
+        # Area under the line; its polygon is replaced in place on every update
+        self._trend_fill = PolyCollection([], alpha=0.3, color=COLOR_PRIMARY, linewidth=0)
+        ax.add_collection(self._trend_fill, autolim=False)
+
+        # Real dates on the x axis, labelled to suit whatever range is visible
+        locator = mdates.AutoDateLocator()
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        ax.set_ylabel("Amount ($)", color=COLOR_TEXT)
+
+        # Stylize grid
+        ax.grid(True, linestyle='--', alpha=0.3)
+
+        # Remove top and right spines for cleaner look
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+
+    @metrics.timed("chart.trend")
+    def update_trend(self, monthly_data):
+        """Bring the trend figure up to date with monthly totals and return it."""
+        return self.update_trend_points(*trend.monthly_points(monthly_data), "month")
+
+    def update_trend_points(self, days, cents, granularity):
+        """
+        Show (bucket days, cents) from utils.trend at the given granularity,
+        zoomed out to the whole history; returns the figure.
+        """
+        if self.trend_figure is None:
+            self._build_trend()
+        self._trend_points = (days, cents)
+        self.trend_figure.axes[0].set_title(TREND_TITLES[granularity], color=COLOR_TEXT, pad=20)
+        self._set_trend_range(*self._trend_bounds())
+        self.trend_figure.tight_layout()
+        return self.trend_figure
+
+    def _trend_bounds(self):
+        """The x range showing every point, with a little room at both ends."""
+        days = self._trend_points[0]
+        if not days:
+            today = date.today().toordinal() + _DATE_OFFSET
+            return today - 15, today + 15
+        pad = max((days[-1] - days[0]) * 0.02, 1)
+        return days[0] + _DATE_OFFSET - pad, days[-1] + _DATE_OFFSET + pad
+
+    def _set_trend_range(self, x0, x1):
+        """Show [x0, x1] (clamped to the data) and redraw only the points inside it."""
+        lo, hi = self._trend_bounds()
+        width = min(max(x1 - x0, TREND_MIN_DAYS), hi - lo)
+        x0 = min(max(x0, lo), hi - width)
+        x1 = x0 + width
+        ax = self.trend_figure.axes[0]
+        ax.set_xlim(x0, x1)
+
+        # Only the visible range is looked up, then thinned to one point per pixel
+        days, cents = trend.between(*self._trend_points, math.floor(x0 - _DATE_OFFSET), math.ceil(x1 - _DATE_OFFSET))
+        days, cents = trend.lttb(days, cents, max(int(ax.bbox.width), 3))
+        xs = [day + _DATE_OFFSET for day in days]
+        ys = [c / 100 for c in cents]
+        self._trend_line.set_data(xs, ys)
+        self._trend_line.set_marker('o' if len(xs) <= TREND_MARKER_LIMIT else '')
+        self._trend_fill.set_verts([[(xs[0], 0)] + list(zip(xs, ys)) + [(xs[-1], 0)]] if xs else [])
+        visible = [y for x, y in zip(xs, ys) if x0 <= x <= x1] or ys or [0]
+        ax.set_ylim(min(min(visible) * 1.1, 0), max(max(visible) * 1.1, 1))
+
+    def _connect_trend(self, canvas):
+        """Scroll to zoom around the pointer, drag to pan, double-click to see everything."""
+        # Handlers live on the figure, which outlives every canvas: drop the last visit's first
+        for cid in self._trend_cids:
+            canvas.mpl_disconnect(cid)
+        self._trend_cids = [
+            canvas.mpl_connect("scroll_event", self._on_trend_scroll),
+            canvas.mpl_connect("button_press_event", self._on_trend_press),
+            canvas.mpl_connect("motion_notify_event", self._on_trend_drag),
+            canvas.mpl_connect("button_release_event", self._on_trend_release),
+            canvas.mpl_connect("resize_event", self._on_trend_resize),
+        ]
+
+    def _on_trend_resize(self, event):
+        self._set_trend_range(*self.trend_figure.axes[0].get_xlim())
+
+    def _on_trend_scroll(self, event):
+        if event.inaxes is not self.trend_figure.axes[0]:
+            return
+        factor = 1 / TREND_ZOOM_STEP if event.button == "up" else TREND_ZOOM_STEP
+        x0, x1 = event.inaxes.get_xlim()
+        x = event.xdata
+        self._set_trend_range(x - (x - x0) * factor, x + (x1 - x) * factor)
+        event.canvas.draw_idle()
+
+    def _on_trend_press(self, event):
+        if event.inaxes is not self.trend_figure.axes[0] or event.button != 1:
+            return
+        if event.dblclick:
+            self._set_trend_range(*self._trend_bounds())
+            event.canvas.draw_idle()
+        else:
+            self._trend_drag = (event.x, event.inaxes.get_xlim())
+
+    def _on_trend_drag(self, event):
+        if self._trend_drag is None:
+            return
+        start, (x0, x1) = self._trend_drag
+        ax = self.trend_figure.axes[0]
+        # Pixels to days at the scale the drag started with
+        shift = (start - event.x) * (x1 - x0) / ax.bbox.width
+        self._set_trend_range(x0 + shift, x1 + shift)
+        event.canvas.draw_idle()
+
+    def _on_trend_release(self, event):
+        self._trend_drag = None
+
+    # --- Tk embedding ---
+
+    @staticmethod
+    def _embed(figure, parent):
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        canvas = FigureCanvasTkAgg(figure, master=parent)
+        with metrics.span("chart.draw"):
+            canvas.draw()
+        return canvas.get_tk_widget()
+
+    def category_pie_chart(self, parent, category_data, over_budget=()):
+        """Embed the category pie in `parent`; returns the Tk widget."""
+        if not category_data:
+            return None
+        return self._embed(self.update_pie(category_data, over_budget), parent)
+
+    def monthly_trend_chart(self, parent, monthly_data):
+        """Embed the monthly trend in `parent`; returns the Tk widget."""
+        if not monthly_data:
+            return None
+        return self.trend_chart(parent, *trend.monthly_points(monthly_data), "month")
+
+    def trend_chart(self, parent, days, cents, granularity):
+        """Embed a zoomable trend of (bucket days, cents) in `parent`; returns the Tk widget."""
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.update_trend_points(days, cents, granularity)
+        self._trend_canvas = FigureCanvasTkAgg(self.trend_figure, master=parent)
+        self._connect_trend(self._trend_canvas)
+        with metrics.span("chart.draw"):
+            self._trend_canvas.draw()
+        return self._trend_canvas.get_tk_widget()
+
+    def show_monthly_trend(self, monthly_data):
+        """Switch the embedded trend back to monthly totals in place."""
+        self.show_trend(*trend.monthly_points(monthly_data), "month")
+
+    @metrics.timed("chart.trend")
+    def show_trend(self, days, cents, granularity):
+        """Switch the embedded trend to other points in place, without a new canvas."""
+        self.update_trend_points(days, cents, granularity)
+        if self._trend_canvas is not None:
+            self._trend_canvas.draw_idle()
+
+_default_renderer = None
+
+def _renderer():
+    global _default_renderer
+    if _default_renderer is None:
+        _default_renderer = ChartRenderer()
+    return _default_renderer
 
 def create_category_pie_chart(parent, category_data):
     """
     Embed a pie chart of category distribution.
     """
-    setup_dark_theme()
-    
-    if not category_data:
-        return None
-
-    labels = list(category_data.keys())
-    sizes = list(category_data.values())
-
-    # Create figure with transparent background
-    fig, ax = plt.subplots(figsize=(5, 4), dpi=100)
-    fig.patch.set_facecolor(COLOR_BG)
-    
-    wedges, texts, autotexts = ax.pie(
-        sizes, 
-        labels=labels, 
-        autopct='%1.1f%%', 
-        startangle=90,
-        colors=plt.cm.Paired.colors if len(labels) > 5 else COLOR_ACCENT[:len(labels)],
-        textprops=dict(color=COLOR_TEXT),
-        wedgeprops=dict(width=0.6, edgecolor=COLOR_BG)  # Donut style
-    )
-    
-    # Style text
-    plt.setp(texts, size=9)
-    plt.setp(autotexts, size=9, weight="bold")
-    
-    ax.axis('equal')
-    
-    canvas = FigureCanvasTkAgg(fig, master=parent)
-    canvas.draw()
-    return canvas.get_tk_widget()
+    return _renderer().category_pie_chart(parent, category_data)
 
 def create_monthly_trend_chart(parent, monthly_data):
     """
     Embed a line chart of monthly spending.
     """
-    setup_dark_theme()
-
-    if not monthly_data:
-        return None
-
-    # Sort by date
-    sorted_months = sorted(monthly_data.keys())
-    amounts = [monthly_data[m] for m in sorted_months]
-
-    fig, ax = plt.subplots(figsize=(5, 4), dpi=100)
-    fig.patch.set_facecolor(COLOR_BG)
-    ax.set_facecolor(COLOR_BG)
-    
-    # Plot with gradient-like effect or simple clean line
-    ax.plot(
-        sorted_months, 
-        amounts, 
-        marker='o', 
-        linestyle='-', 
-        color=COLOR_PRIMARY,
-        linewidth=2,
-        markersize=6
-    )
-    
-    # Fill area under line for "modern" look
-    ax.fill_between(sorted_months, amounts, alpha=0.3, color=COLOR_PRIMARY)
-    
-    ax.set_title("Monthly Spending Trend", color=COLOR_TEXT, pad=20)
-    ax.set_xlabel("Month", color=COLOR_TEXT)
-    ax.set_ylabel("Amount ($)", color=COLOR_TEXT)
-    
-    # Stylize grid
-    ax.grid(True, linestyle='--', alpha=0.3)
-    
-    # Remove top and right spines for cleaner look
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-
-    canvas = FigureCanvasTkAgg(fig, master=parent)
-    canvas.draw()
-    return canvas.get_tk_widget()
+    return _renderer().monthly_trend_chart(parent, monthly_data)
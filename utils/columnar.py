@@ -0,0 +1,125 @@
+from datetime import datetime
+
+import numpy as np
+
+from utils import metrics
+from utils.expense import Expense, category_of, cents_of
+
+def _encode(values):
+    """Integer codes plus the distinct values in order of first appearance."""
+    index = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int64, count=len(values))
+    return codes, list(index)
+
+def _parse_dates(dates):
+    """
+    Convert date strings to datetime64[D], NaT where strptime would fail
+    (missing dates included, as for stats.get_monthly_spending).
+
+    Only the distinct strings are parsed, so the cost follows the number of
+    different days in the ledger rather than the number of rows.
+    """
+    codes, unique = _encode(dates)
+    parsed = np.empty(len(unique), dtype="datetime64[D]")
+    for i, value in enumerate(unique):
+        try:
+            parsed[i] = np.datetime64(datetime.strptime(value, "%Y-%m-%d").date(), "D")
+        except (TypeError, ValueError):
+            parsed[i] = np.datetime64("NaT")
+    return parsed[codes]
+
+def _first_seen_order(codes, n_labels):
+    """Label indices ordered by first appearance, matching dict insertion order."""
+    first = np.full(n_labels, len(codes), dtype=np.int64)
+    np.minimum.at(first, codes, np.arange(len(codes)))
+    return np.argsort(first, kind="stable")
+
+class ColumnarLedger:
+    """
+    Column-oriented copy of the ledger for vectorized statistics.
+
+    cents are int64, dates datetime64[D] (NaT for invalid dates) and
+    categories integer codes into `categories`, which lists the category
+    names in order of first appearance.
+    """
+
+    def __init__(self, cents, dates, category_codes, categories):
+        self.cents = cents
+        self.dates = dates
+        self.category_codes = category_codes
+        self.categories = categories
+
+    @classmethod
+    @metrics.timed("columnar.build")
+    def from_expenses(cls, expenses):
+        """Build the columns from a list of expense dictionaries."""
+        n = len(expenses)
+        cents = np.fromiter((cents_of(e) for e in expenses), dtype=np.int64, count=n)
+        dates = _parse_dates([e.date if e.__class__ is Expense else e.get('date') for e in expenses])
+        codes, labels = _encode([category_of(e) for e in expenses])
+        return cls(cents, dates, codes, labels)
+
+    def __len__(self):
+        return len(self.cents)
+
+    def get_total_spending(self):
+        """Vectorized stats.get_total_spending."""
+        return int(self.cents.sum()) / 100
+
+    def get_expense_count(self):
+        """Vectorized stats.get_expense_count."""
+        return len(self)
+
+    def get_category_breakdown(self):
+        """Vectorized stats.get_category_breakdown (grouped with bincount)."""
+        sums = np.bincount(self.category_codes, weights=self.cents, minlength=len(self.categories))
+        return {name: round(total) / 100 for name, total in zip(self.categories, sums)}
+
+    def get_highest_spending_category(self):
+        """Vectorized stats.get_highest_spending_category."""
+        breakdown = self.get_category_breakdown()
+        if not breakdown:
+            return "N/A"
+        return max(breakdown, key=breakdown.get)
+
+    def get_monthly_spending(self):
+        """Vectorized stats.get_monthly_spending; rows with invalid dates are skipped."""
+        valid = ~np.isnat(self.dates)
+        months = self.dates[valid].astype("datetime64[M]")
+        if not len(months):
+            return {}
+        unique, codes = np.unique(months, return_inverse=True)
+        sums = np.bincount(codes, weights=self.cents[valid], minlength=len(unique))
+        order = _first_seen_order(codes, len(unique))
+        return {str(unique[i]): round(sums[i]) / 100 for i in order}
+
+    def rollup_cells(self):
+        """
+        (month, category, cents, count) for every month x category seen, in
+        order of first appearance; month is "" for invalid dates.
+        """
+        n_categories = max(len(self.categories), 1)
+        valid = ~np.isnat(self.dates)
+        month_codes = np.zeros(len(self), dtype=np.int64) # 0 = invalid date
+        months = [""]
+        if valid.any():
+            unique, codes = np.unique(self.dates[valid].astype("datetime64[M]"), return_inverse=True)
+            month_codes[valid] = codes + 1
+            months += [str(m) for m in unique]
+
+        cells, codes = np.unique(month_codes * n_categories + self.category_codes, return_inverse=True)
+        sums = np.bincount(codes, weights=self.cents, minlength=len(cells))
+        counts = np.bincount(codes, minlength=len(cells))
+        return [
+            (months[cells[i] // n_categories], self.categories[cells[i] % n_categories], round(sums[i]), int(counts[i]))
+            for i in _first_seen_order(codes, len(cells))
+        ]
+
+    def summary(self):
+        """Return the figures in the same shape as stats.summarize."""
+        return {
+            "total": self.get_total_spending(),
+            "count": self.get_expense_count(),
+            "categories": self.get_category_breakdown(),
+            "monthly": self.get_monthly_spending(),
+        }
@@ -0,0 +1,132 @@
+from bisect import bisect_left, bisect_right
+from heapq import merge
+
+from utils.expense import category_of, date_of, parse_date
+
+# Batches larger than this are merged in one pass instead of inserted one by one
+MERGE_THRESHOLD = 64
+
+class _Postings:
+    """Expenses sorted by date, with a parallel list of the dates for bisecting."""
+
+    def __init__(self, expenses=()):
+        # Among equal dates the newest entry comes first, so reversing a
+        # slice gives the same order as filter_expenses (newest first, ties
+        # in insertion order)
+        self.expenses = sorted(reversed(list(expenses)), key=date_of)
+        self.dates = [date_of(e) for e in self.expenses]
+
+    def add(self, expense):
+        i = bisect_left(self.dates, expense['date'])
+        self.dates.insert(i, expense['date'])
+        self.expenses.insert(i, expense)
+
+    def add_many(self, expenses):
+        if len(expenses) <= MERGE_THRESHOLD:
+            for expense in expenses:
+                self.add(expense)
+            return
+        batch = sorted(reversed(expenses), key=date_of)
+        self.expenses = list(merge(batch, self.expenses, key=date_of))
+        self.dates = [date_of(e) for e in self.expenses]
+
+    def remove(self, expense):
+        """Take out this very expense (found by bisecting to its date); False if it is not here."""
+        date = date_of(expense)
+        lo, hi = bisect_left(self.dates, date), bisect_right(self.dates, date)
+        for i in range(lo, hi):
+            if self.expenses[i] is expense:
+                del self.expenses[i]
+                del self.dates[i]
+                return True
+        return False
+
+    def bounds(self, start_date, end_date):
+        lo = 0 if start_date is None else bisect_left(self.dates, start_date)
+        hi = len(self.dates) if end_date is None else bisect_right(self.dates, end_date)
+        return lo, max(lo, hi)
+
+    def between(self, start_date, end_date):
+        lo, hi = self.bounds(start_date, end_date)
+        if lo == hi:
+            return []
+        # One reversed copy, not a copy and then its reverse
+        return self.expenses[hi - 1:lo - 1 if lo else None:-1]
+
+class DateIndex:
+    """
+    Expenses kept sorted by date, plus one sorted posting list per category.
+
+    A date-range and/or category query is a bisect and a slice; the sorting
+    is done when the index is built and maintained on add(), replace() and
+    remove(), never per query.
+    Results match file_handler.filter_expenses.
+    """
+
+    def __init__(self, expenses=()):
+        expenses = list(expenses)
+        self._all = _Postings(expenses)
+        by_category = {}
+        for expense in expenses:
+            by_category.setdefault(category_of(expense), []).append(expense)
+        self._categories = {c: _Postings(items) for c, items in by_category.items()}
+
+    def __len__(self):
+        return len(self._all.dates)
+
+    def date_range(self):
+        """Return the (earliest, latest) valid date, or (None, None) when there is none."""
+        # Invalid dates ("", "n/a", ...) sort to either end; step over them
+        dates = self._all.dates
+        lo = next((i for i in range(len(dates)) if parse_date(dates[i])[1] is not None), None)
+        if lo is None:
+            return None, None
+        hi = next(i for i in range(len(dates) - 1, lo - 1, -1) if parse_date(dates[i])[1] is not None)
+        return dates[lo], dates[hi]
+
+    def add_many(self, expenses):
+        """Insert new expenses, keeping every posting list sorted."""
+        self._all.add_many(expenses)
+        by_category = {}
+        for expense in expenses:
+            by_category.setdefault(category_of(expense), []).append(expense)
+        for category, items in by_category.items():
+            if category in self._categories:
+                self._categories[category].add_many(items)
+            else:
+                self._categories[category] = _Postings(items)
+
+    def remove(self, expense):
+        """Take an expense (the same object that was added) out of the index."""
+        self._all.remove(expense)
+        category = category_of(expense)
+        postings = self._categories.get(category)
+        if postings is not None:
+            postings.remove(expense)
+            if not postings.dates:
+                del self._categories[category]
+
+    def replace(self, old, new):
+        """Swap an edited expense in for the one it replaces."""
+        self.remove(old)
+        self.add_many([new])
+
+    def _postings(self, category):
+        if category is None:
+            return self._all
+        return self._categories.get(category)
+
+    def count(self, category=None, start_date=None, end_date=None):
+        """How many expenses query() would return, without building the list."""
+        postings = self._postings(category)
+        if postings is None:
+            return 0
+        lo, hi = postings.bounds(start_date, end_date)
+        return hi - lo
+
+    def query(self, category=None, start_date=None, end_date=None):
+        """Expenses in the inclusive date range (YYYY-MM-DD), newest first."""
+        postings = self._postings(category)
+        if postings is None:
+            return []
+        return postings.between(start_date, end_date)
@@ -0,0 +1,205 @@
+import gc
+import secrets
+import sys
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import datetime
+
+# Keys with a slot of their own; anything else a record carries goes to `extra`
+FIELDS = ("id", "amount", "category", "date", "description", "timestamp")
+_OPTIONAL = ("category", "date", "description", "timestamp")
+_FIELD_SET = frozenset(FIELDS)
+
+# date string -> (the string, ordinal day, "YYYY-MM"); day and month are None for invalid dates
+_dates = {}
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD date once per distinct string."""
+    try:
+        return _dates[value]
+    except (KeyError, TypeError):
+        pass
+    try:
+        parsed = datetime.strptime(value, "%Y-%m-%d")
+        entry = (value, parsed.toordinal(), sys.intern(parsed.strftime("%Y-%m")))
+    except (TypeError, ValueError):
+        entry = (value, None, None)
+    try:
+        _dates[value] = entry
+    except TypeError: # unhashable junk in the date field
+        pass
+    return entry
+
+def to_cents(amount):
+    """Convert an amount in currency units to integer cents."""
+    return round(float(amount) * 100)
+
+def new_id():
+    """A fresh expense id: 16 hex digits, random so separate processes never clash."""
+    return secrets.token_hex(8)
+
+@contextmanager
+def bulk_allocation():
+    """
+    Pause the cyclic garbage collector while a whole ledger is built: the
+    records hold no cycles, yet the collector would otherwise rescan the
+    growing list over and over (more than half the load time at 1M rows).
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def _intern(value):
+    return sys.intern(value) if value.__class__ is str else value
+
+def cents_of(expense):
+    """Integer cents of an Expense or of a plain expense dict."""
+    if expense.__class__ is Expense:
+        return expense.cents
+    return to_cents(expense['amount'])
+
+def month_of(expense):
+    """YYYY-MM of an expense, or None when its date is missing or does not parse."""
+    if expense.__class__ is Expense:
+        return expense.month
+    return parse_date(expense.get('date'))[2]
+
+def day_of(expense):
+    """Ordinal day of an expense, or None when its date is missing or does not parse."""
+    if expense.__class__ is Expense:
+        return expense.day
+    return parse_date(expense.get('date'))[1]
+
+def date_of(expense):
+    """Date string of an Expense or of a plain expense dict."""
+    if expense.__class__ is Expense:
+        return expense.date
+    return expense['date']
+
+def category_of(expense):
+    """Category of an Expense or of a plain expense dict, without going through __getitem__."""
+    if expense.__class__ is Expense:
+        return expense.category
+    return expense['category']
+
+class Expense(Mapping):
+    """
+    Compact, read-only expense record.
+
+    Every expense has a stable id (assigned on creation if the record has
+    none) by which it is edited and deleted. Amounts are integer cents, the
+    date is parsed once into an ordinal day and month, and category names
+    are interned, in a few __slots__ instead of a dict of floats. It is a
+    Mapping with the same keys as the JSON records (e['amount'] is
+    cents / 100), so code written for the dicts keeps working and
+    dict(expense) gives back the stored record.
+    """
+
+    __slots__ = ("id", "cents", "category", "date", "day", "month", "description", "timestamp", "extra")
+
+    def __init__(self, cents, category=None, date=None, description=None, timestamp=None, extra=None, id=None):
+        self.id = id or new_id()
+        self.cents = cents
+        self.category = _intern(category)
+        self.date, self.day, self.month = parse_date(date)
+        self.description = _intern(description)
+        self.timestamp = timestamp
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, record):
+        """Build from a JSON/CSV style dict; raises KeyError/ValueError/TypeError on a bad amount."""
+        if isinstance(record, cls):
+            return record
+        # Filled in directly rather than through __init__: this runs once per row on every load
+        self = object.__new__(cls)
+        self.cents = to_cents(record['amount'])
+        get = record.get
+        self.id = get('id') or new_id()
+        self.category = _intern(get('category'))
+        self.date, self.day, self.month = parse_date(get('date'))
+        self.description = _intern(get('description'))
+        self.timestamp = get('timestamp')
+        self.extra = None
+        if not _FIELD_SET.issuperset(record):
+            self.extra = {k: v for k, v in record.items() if k not in _FIELD_SET}
+        return self
+
+    @classmethod
+    def from_columns(cls, ids, cents, categories, dates, descriptions, timestamps, extras):
+        """
+        Build a list of expenses from parallel columns (as read from a binary
+        snapshot); `dates` holds parse_date() entries.
+        """
+        new = object.__new__
+        expenses = []
+        append = expenses.append
+        for id, amount, category, date, description, timestamp, extra in zip(
+                ids, cents, categories, dates, descriptions, timestamps, extras):
+            self = new(cls)
+            self.id = id
+            self.cents = amount
+            self.category = category
+            self.date, self.day, self.month = date
+            self.description = description
+            self.timestamp = timestamp
+            self.extra = extra
+            append(self)
+        return expenses
+
+    @property
+    def amount(self):
+        return self.cents / 100
+
+    def to_dict(self):
+        """The plain record, as written to JSON."""
+        return dict(self)
+
+    def __getitem__(self, key):
+        if key == "amount":
+            return self.cents / 100
+        if key == "id":
+            return self.id
+        if key in _OPTIONAL:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        elif self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield "id"
+        yield "amount"
+        for key in _OPTIONAL:
+            if getattr(self, key) is not None:
+                yield key
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self):
+        return 2 + sum(getattr(self, key) is not None for key in _OPTIONAL) + len(self.extra or ())
+
+    def __repr__(self):
+        return f"Expense({self.to_dict()!r})"
+
+def to_expense(record):
+    """Convert a stored record, leaving records with an unusable amount as they are."""
+    try:
+        return Expense.from_dict(record)
+    except (KeyError, TypeError, ValueError):
+        return record
+
+def id_of(expense):
+    """Id of an Expense or of a plain expense dict (None if the dict has none)."""
+    if expense.__class__ is Expense:
+        return expense.id
+    return expense.get('id')
+
+def to_record(expense):
+    """A JSON-serializable dict for an Expense or an expense dict."""
+    return expense.to_dict() if isinstance(expense, Expense) else expense
@@ -1,46 +1,977 @@
+import functools
+import hashlib
 import json
 import os
 import csv
+import gzip
+import shutil
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from utils import binary_snapshot, metrics, rollup, sqlite_backend
+from utils.expense import bulk_allocation, cents_of, date_of, day_of, id_of, to_cents, to_expense, to_record
+from utils.filelock import FileLock
+from utils.recurring import RecurringRule
+from utils.rollup import Rollup
+from utils.search_index import matches, search_terms
 
 DATA_FILE = "expenses.json"
+SQLITE_FILE = "expenses.db"
 
-def load_expenses():
-    """Load expenses from the JSON file."""
-    if not os.path.exists(DATA_FILE):
+# "journal" (JSON snapshot + JSON Lines journal), "partitioned" (one
+# snapshot + journal per month under PARTITION_DIR) or "sqlite"
+STORAGE_BACKEND = os.environ.get("EXPENSE_TRACKER_BACKEND", "journal")
+
+# "json", or "binary" to keep a memory-mapped columnar copy next to every JSON
+# snapshot (expenses.bin), loaded instead of parsing the JSON while it is current
+SNAPSHOT_FORMAT = os.environ.get("EXPENSE_TRACKER_SNAPSHOT", "json")
+
+PARTITION_DIR = "expenses"
+MANIFEST_FILE = "manifest.json"
+UNDATED_PARTITION = "undated" # Expenses whose date has no YYYY-MM prefix
+
+# Once the journal grows past this many bytes, fold it into the snapshot
+COMPACT_THRESHOLD = 1024 * 1024
+
+# Records per chunk when streaming the ledger (exports)
+CHUNK_SIZE = 5000
+
+# Journal lines carrying this key edit or delete an earlier record by id
+CHANGE_KEY = "_change"
+
+_locks = {} # lock file path -> FileLock
+
+_local = threading.local() # the ledger chosen with use_ledger() on this thread
+
+class Ledger:
+    """
+    Where one ledger lives: its backend and the files it uses.
+
+    The module settings above describe the default ledger; use_ledger()
+    points every function below at another one, on the current thread only,
+    so several ledgers can be open (and written in the background) at once.
+    """
+
+    def __init__(self, backend, data_file, sqlite_file, partition_dir):
+        self.backend = backend
+        self.data_file = data_file
+        self.sqlite_file = sqlite_file
+        self.partition_dir = partition_dir
+
+    @classmethod
+    def configured(cls):
+        """The ledger described by the module settings."""
+        return cls(STORAGE_BACKEND, DATA_FILE, SQLITE_FILE, PARTITION_DIR)
+
+    @classmethod
+    def at(cls, path):
+        """
+        The ledger at a path: a .db file is SQLite, a .json file a snapshot
+        plus journal and anything else a directory of month partitions. As
+        with the default ledger, a new database or directory starts out as a
+        copy of the JSON ledger next to it, if there is one.
+        """
+        path = os.path.normpath(path)
+        base, ext = os.path.splitext(path)
+        if ext == ".db":
+            return cls("sqlite", base + ".json", path, base)
+        if ext == ".json":
+            return cls("journal", path, base + ".db", base)
+        return cls("partitioned", path + ".json", path + ".db", path)
+
+    @property
+    def path(self):
+        """The file or directory that addresses this ledger."""
+        if self.backend == "sqlite":
+            return self.sqlite_file
+        if self.backend == "partitioned":
+            return self.partition_dir
+        return self.data_file
+
+    @property
+    def name(self):
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    def _key(self):
+        return self.backend, os.path.abspath(self.path)
+
+    def __eq__(self, other):
+        return isinstance(other, Ledger) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"Ledger({self.backend!r}, {self.path!r})"
+
+def current_ledger():
+    """The ledger this thread is working on."""
+    return getattr(_local, "ledger", None) or Ledger.configured()
+
+@contextmanager
+def use_ledger(ledger):
+    """Work on `ledger` (None: the configured one) on this thread for the duration of the block."""
+    previous = getattr(_local, "ledger", None)
+    _local.ledger = ledger
+    try:
+        yield ledger
+    finally:
+        _local.ledger = previous
+
+def lock_path():
+    """The advisory lock file every process takes before touching the current ledger."""
+    ledger = current_ledger()
+    if ledger.backend == "sqlite":
+        return ledger.sqlite_file + ".lock"
+    if ledger.backend == "partitioned":
+        return os.path.join(ledger.partition_dir, "ledger.lock")
+    return os.path.splitext(ledger.data_file)[0] + ".lock"
+
+def ledger_lock():
+    """The (re-entrant) lock of the current ledger."""
+    path = lock_path()
+    lock = _locks.get(path)
+    if lock is None:
+        lock = _locks.setdefault(path, FileLock(path))
+    return lock
+
+def _exclusive(func):
+    """Run func holding the ledger lock, so no process ever sees (or races) half a write."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with ledger_lock():
+            return func(*args, **kwargs)
+    return wrapper
+
+def journal_path(data_file=None):
+    """Return the path of the append-only journal next to the snapshot."""
+    base, _ = os.path.splitext(data_file or current_ledger().data_file)
+    return base + ".jsonl"
+
+def _read_snapshot(data_file):
+    """Load the JSON snapshot (the original expenses.json format)."""
+    if not os.path.exists(data_file):
         return []
     try:
-        with open(DATA_FILE, "r") as f:
+        with open(data_file, "r") as f:
             return json.load(f)
-    except (json.JSONDecodeError, IOError):
+    except json.JSONDecodeError:
+        pass
+    except IOError:
         return []
+    # Keep a copy of the damaged file and recover the records before the damage,
+    # rather than loading nothing (the next save would then wipe the ledger)
+    backup = data_file + ".corrupt"
+    if not os.path.exists(backup):
+        try:
+            shutil.copyfile(data_file, backup)
+        except IOError:
+            pass
+    return list(_iter_snapshot(data_file))
 
-def save_expenses(expenses):
-    """Save the list of expenses to the JSON file."""
+def _iter_snapshot(data_file, read_size=1 << 16):
+    """Yield the records of the JSON snapshot one by one without loading the whole array."""
+    if not os.path.exists(data_file):
+        return
+    decoder = json.JSONDecoder()
+    try:
+        with open(data_file, "r") as f:
+            buf, pos, eof, started = "", 0, False, False
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buf):
+                    if not started:
+                        if buf[pos] != "[":
+                            return # Not a JSON array, nothing to stream
+                        started = True
+                        pos += 1
+                        continue
+                    if buf[pos] == "]":
+                        return
+                    try:
+                        record, pos = decoder.raw_decode(buf, pos)
+                        yield record
+                        continue
+                    except json.JSONDecodeError:
+                        if eof:
+                            return # Corrupt tail
+                elif eof:
+                    return
+                # Need more data for the next record
+                chunk = f.read(read_size)
+                eof = not chunk
+                buf, pos = buf[pos:] + chunk, 0
+    except IOError:
+        return
+
+def _iter_journal(path, offset=0):
+    """Yield journal records appended since the last compaction (from byte `offset` on)."""
+    if not os.path.exists(path):
+        return
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue # Torn write from a crash, skip it
+    except IOError:
+        return
+
+def _read_journal(path, offset=0):
+    """Replay journal records appended since the last compaction."""
+    return list(_iter_journal(path, offset))
+
+def _assign_legacy_ids(records):
+    """
+    Give records written before ids existed an id derived from their content
+    (and how many identical records came before), so every process agrees on
+    it until it is saved. Returns how many needed one.
+    """
+    seen = Counter()
+    for record in records:
+        if not id_of(record):
+            key = json.dumps(record, sort_keys=True)
+            record['id'] = hashlib.blake2b(f"{key}#{seen[key]}".encode(), digest_size=8).hexdigest()
+            seen[key] += 1
+    return sum(seen.values())
+
+def _replay(records, journal):
+    """Apply journal lines to snapshot records: plain records are appended, change records edit or delete by id."""
+    if not any(CHANGE_KEY in line for line in journal):
+        records.extend(journal)
+        return records, _assign_legacy_ids(records)
+    legacy = _assign_legacy_ids(records + [line for line in journal if CHANGE_KEY not in line])
+    positions = {id_of(record): i for i, record in enumerate(records)}
+    for line in journal:
+        change = line.get(CHANGE_KEY)
+        if change is None:
+            positions[line['id']] = len(records)
+            records.append(line)
+        elif change == "update":
+            i = positions.get(line.get('id'))
+            if i is not None:
+                records[i] = line['expense']
+        elif change == "delete":
+            i = positions.pop(line.get('id'), None)
+            if i is not None:
+                records[i] = None
+    return [record for record in records if record is not None], legacy
+
+def _has_changes(path):
+    """True if the journal at path holds any edit or delete."""
+    marker = json.dumps(CHANGE_KEY).encode()
+    try:
+        with open(path, "rb") as f:
+            return any(marker in line for line in f)
+    except IOError:
+        return False
+
+def _load_json_ledger(data_file=None, save_ids=False):
+    """
+    A JSON ledger: its snapshot with the journal replayed on top. With
+    `save_ids`, ids just derived for old records are written back in a new
+    snapshot, so they are stable from then on (and never derived again).
+    """
+    data_file = data_file or current_ledger().data_file
+    journal = journal_path(data_file)
+    snapshot = _open_binary(data_file)
+    if snapshot is not None:
+        # Only the journal lines written since the binary snapshot still need parsing
+        with snapshot:
+            expenses, offset = snapshot.expenses(), snapshot.source["journal"]
+        tail = _read_journal(journal, offset)
+        if any(CHANGE_KEY in line for line in tail):
+            records, _ = _replay(expenses, tail)
+            return [to_expense(record) for record in records]
+        expenses.extend(to_expense(record) for record in tail)
+        return expenses
+
+    offset = _file_size(journal)
+    with bulk_allocation():
+        records, legacy = _replay(_read_snapshot(data_file), _read_journal(journal))
+        expenses = [to_expense(record) for record in records]
+    if legacy and save_ids:
+        _write_snapshot(data_file, expenses)
+    elif SNAPSHOT_FORMAT == "binary" and _file_size(journal) == offset:
+        _write_binary(data_file, expenses, offset)
+    return expenses
+
+def binary_path(data_file=None):
+    """Path of the binary columnar copy of a JSON snapshot."""
+    base, _ = os.path.splitext(data_file or current_ledger().data_file)
+    return base + ".bin"
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime_ns]
+    except OSError:
+        return None
+
+def _open_binary(data_file):
+    """The binary snapshot of data_file while it matches the JSON snapshot and journal, else None."""
+    if SNAPSHOT_FORMAT != "binary":
+        return None
+    snapshot = binary_snapshot.open_snapshot(binary_path(data_file))
+    if snapshot is None:
+        return None
+    source = snapshot.source
+    if source.get("snapshot") != _file_stamp(data_file) or source.get("journal", 0) > _file_size(journal_path(data_file)):
+        snapshot.close()
+        return None
+    return snapshot
+
+def _write_binary(data_file, expenses, journal_offset=0):
+    """Record expenses (the snapshot plus journal_offset bytes of journal) as the binary snapshot; only a cache."""
+    source = {"snapshot": _file_stamp(data_file), "journal": journal_offset}
+    return binary_snapshot.write(binary_path(data_file), expenses, source)
+
+def _write_snapshot(data_file, expenses):
+    """Atomically replace a JSON snapshot and drop its journal."""
+    tmp_file = data_file + ".tmp"
+    try:
+        with open(tmp_file, "w") as f:
+            # One record per line: still diff/edit friendly, but unlike
+            # json.dump(indent=4) it goes through the C encoder
+            f.write("[\n")
+            f.write(",\n".join(json.dumps(to_record(e)) for e in expenses))
+            f.write("\n]\n" if expenses else "]\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, data_file)
+        _fsync_dir(data_file)
+        if os.path.exists(journal_path(data_file)):
+            os.remove(journal_path(data_file))
+    except IOError:
+        return False
+    if SNAPSHOT_FORMAT == "binary":
+        _write_binary(data_file, expenses)
+    return True
+
+def write_json(path, data, **options):
+    """Atomically replace path with data as JSON, synced to disk; raises IOError on failure."""
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(data, f, **options)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+    _fsync_dir(path)
+
+def _fsync_dir(path):
+    """Make a rename in path's directory durable (a no-op where directories cannot be opened)."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _journal_line(old, new):
+    """The journal line of an (old, new) change: the record itself for an add, else a change record."""
+    if old is None:
+        return to_record(new)
+    if new is None:
+        return {CHANGE_KEY: "delete", "id": id_of(old)}
+    return {CHANGE_KEY: "update", "id": id_of(old), "expense": to_record(new)}
+
+def _append_journal(data_file, changes):
+    """Append (old, new) changes to the journal of data_file, compacting it once it grows too big."""
+    lines = "".join(json.dumps(_journal_line(old, new)) + "\n" for old, new in changes)
+    if len(lines) > COMPACT_THRESHOLD and all(old is None for old, _ in changes):
+        # Only additions, and too many for the journal anyway: write one new snapshot instead
+        return _write_snapshot(data_file, _load_json_ledger(data_file) + [new for _, new in changes])
+
+    path = journal_path(data_file)
+    try:
+        with open(path, "ab+") as f:
+            # A crash mid-append can leave a line without its newline; start on a
+            # fresh line so the torn record doesn't swallow the first new one
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    lines = "\n" + lines
+            f.write(lines.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+    except IOError:
+        return False
+
+    if os.path.getsize(path) > COMPACT_THRESHOLD:
+        _write_snapshot(data_file, _load_json_ledger(data_file))
+    return True
+
+# --- Partitioned ledger: PARTITION_DIR/<YYYY-MM>.json (+ .jsonl) and a manifest ---
+
+def partition_key(expense):
+    """The month partition an expense belongs to."""
+    date = expense.get('date') or ""
+    if len(date) >= 7 and date[4] == "-" and date[:4].isdigit() and date[5:7].isdigit():
+        return date[:7]
+    return UNDATED_PARTITION
+
+def partition_path(key):
+    return os.path.join(current_ledger().partition_dir, key + ".json")
+
+def _manifest_path():
+    return os.path.join(current_ledger().partition_dir, MANIFEST_FILE)
+
+def read_manifest():
+    """Return {"partitions": {key: {"count", "first", "last"}}} (empty if there is none)."""
+    try:
+        with open(_manifest_path(), "r") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return {"partitions": {}}
+
+def _write_manifest(manifest):
+    write_json(_manifest_path(), manifest, indent=4, sort_keys=True)
+
+def _group_by_partition(expenses):
+    groups = {}
+    for expense in expenses:
+        groups.setdefault(partition_key(expense), []).append(expense)
+    return groups
+
+def _count_into(entry, expenses):
+    """Fold expenses into a manifest entry's count and the span of its valid dates."""
+    dates = [e['date'] for e in expenses if day_of(e) is not None]
+    entry["count"] = entry.get("count", 0) + len(expenses)
+    if dates:
+        entry["first"] = min([entry["first"]] + dates) if entry.get("first") else min(dates)
+        entry["last"] = max([entry["last"]] + dates) if entry.get("last") else max(dates)
+    return entry
+
+def _save_partitions(expenses):
+    """Rewrite every partition from scratch and remove the ones left empty."""
+    groups = _group_by_partition(expenses)
     try:
-        with open(DATA_FILE, "w") as f:
-            json.dump(expenses, f, indent=4)
+        os.makedirs(current_ledger().partition_dir, exist_ok=True)
+        for key, items in groups.items():
+            if not _write_snapshot(partition_path(key), items):
+                return False
+        for key in read_manifest()["partitions"]:
+            if key not in groups:
+                path = partition_path(key)
+                for path in (path, journal_path(path), binary_path(path)):
+                    if os.path.exists(path):
+                        os.remove(path)
+        _write_manifest({"partitions": {key: _count_into({}, items) for key, items in groups.items()}})
         return True
     except IOError:
         return False
 
+def _apply_to_partitions(changes):
+    """Journal (old, new) changes into the partitions of their months; an edit that changes month moves the record."""
+    groups = {}
+    for old, new in changes:
+        if old is not None and new is not None and partition_key(old) != partition_key(new):
+            groups.setdefault(partition_key(old), []).append((old, None))
+            groups.setdefault(partition_key(new), []).append((None, new))
+        else:
+            groups.setdefault(partition_key(new if old is None else old), []).append((old, new))
+    manifest = read_manifest()
+    for key, items in groups.items():
+        entry = manifest["partitions"].setdefault(key, {})
+        added = [new for old, new in items if old is None]
+        removed = sum(new is None for _, new in items)
+        if added:
+            _count_into(entry, added)
+        # Spans only ever widen here; compact_journal() tightens them again
+        entry["count"] = entry.get("count", 0) - removed
+    try:
+        # Manifest first: a partition listed but not yet written reads as empty,
+        # whereas one written but not listed would be invisible
+        os.makedirs(current_ledger().partition_dir, exist_ok=True)
+        _write_manifest(manifest)
+    except IOError:
+        return False
+    return all(_append_journal(partition_path(key), items) for key, items in groups.items())
+
+def partition_keys(start_date=None, end_date=None):
+    """Partitions that can hold dates in the inclusive range, oldest first."""
+    keys = []
+    for key in sorted(read_manifest()["partitions"]):
+        if key != UNDATED_PARTITION:
+            if start_date is not None and key < start_date[:7]:
+                continue
+            if end_date is not None and key > end_date[:7]:
+                continue
+        keys.append(key)
+    return keys
+
+def _load_partitions(keys, save_ids=False):
+    expenses = []
+    for key in keys:
+        expenses.extend(_load_json_ledger(partition_path(key), save_ids))
+    return expenses
+
+@_exclusive
+def split_into_partitions(data_file=None):
+    """Migrate a JSON ledger (snapshot + journal) into month partitions; returns {key: count}."""
+    expenses = _load_json_ledger(data_file)
+    if not _save_partitions(expenses):
+        raise IOError(f"Could not write partitions under {current_ledger().partition_dir}")
+    return {key: entry["count"] for key, entry in sorted(read_manifest()["partitions"].items())}
+
+def _use_partitions():
+    """True when the current ledger is partitioned; splits the JSON ledger on first use."""
+    if current_ledger().backend != "partitioned":
+        return False
+    if not os.path.exists(_manifest_path()):
+        try:
+            split_into_partitions()
+        except IOError:
+            pass
+    return True
+
+def _use_sqlite():
+    """True when the current ledger is SQLite; imports the JSON ledger on first use."""
+    ledger = current_ledger()
+    if ledger.backend != "sqlite":
+        return False
+    if not os.path.exists(ledger.sqlite_file):
+        import_json_to_sqlite()
+    return True
+
+@_exclusive
+def import_json_to_sqlite():
+    """Copy the JSON ledger (snapshot + journal) into an empty SQLite database."""
+    try:
+        if not sqlite_backend.is_empty(current_ledger().sqlite_file):
+            return False
+        sqlite_backend.import_expenses(current_ledger().sqlite_file, _load_json_ledger())
+        return True
+    except sqlite_backend.sqlite3.Error:
+        return False
+
+def ledger_files():
+    """Return the files that make up the current ledger."""
+    ledger = current_ledger()
+    if ledger.backend == "sqlite":
+        return [ledger.sqlite_file]
+    if ledger.backend == "partitioned":
+        paths = [partition_path(key) for key in partition_keys()]
+        return [_manifest_path()] + [p for path in paths for p in (path, journal_path(path))]
+    return [ledger.data_file, journal_path()]
+
+@metrics.timed("file.load")
+@_exclusive
+def load_expenses():
+    """Load all expenses of the current ledger."""
+    if _use_sqlite():
+        return sqlite_backend.load_expenses(current_ledger().sqlite_file)
+    if _use_partitions():
+        return _load_partitions(partition_keys(), save_ids=True)
+    return _load_json_ledger(save_ids=True)
+
+def ledger_signature():
+    """Path, size and mtime of every ledger file; the rollup sidecar is only trusted while this is unchanged."""
+    signature = []
+    for path in ledger_files():
+        try:
+            st = os.stat(path)
+            signature.append([path, st.st_size, st.st_mtime_ns])
+        except OSError:
+            signature.append([path, None, None])
+    return signature
+
+def _sidecar_path(name):
+    """Where the `name` file kept alongside the current ledger goes (e.g. expenses.rollup.json)."""
+    ledger = current_ledger()
+    if ledger.backend == "sqlite":
+        return f"{ledger.sqlite_file}.{name}.json"
+    if ledger.backend == "partitioned":
+        return os.path.join(ledger.partition_dir, name + ".json")
+    return f"{os.path.splitext(ledger.data_file)[0]}.{name}.json"
+
+def rollup_path():
+    """Where the month x category rollup of the current ledger is kept."""
+    return _sidecar_path("rollup")
+
+def recurring_path():
+    """Where the recurring expense rules of the current ledger are kept."""
+    return _sidecar_path("recurring")
+
+def budgets_path():
+    """Where the monthly category budgets of the current ledger are kept."""
+    return _sidecar_path("budgets")
+
+def _read_settings(path, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return default
+
+def _write_settings(path, data):
+    """Atomically replace a small settings file; returns False if it could not be written."""
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        write_json(path, data, indent=4)
+        return True
+    except IOError:
+        return False
+
+@_exclusive
+def load_recurring():
+    """The recurring expense rules of the current ledger (unreadable ones are skipped)."""
+    rules = []
+    for record in _read_settings(recurring_path(), []):
+        try:
+            rules.append(RecurringRule.from_dict(record))
+        except (KeyError, TypeError, ValueError):
+            pass
+    return rules
+
+@_exclusive
+def save_recurring(rules):
+    return _write_settings(recurring_path(), [rule.to_dict() for rule in rules])
+
+@_exclusive
+def load_budgets():
+    """{category: monthly limit in cents} for the current ledger."""
+    return {category: to_cents(amount) for category, amount in _read_settings(budgets_path(), {}).items()}
+
+@_exclusive
+def save_budgets(limits):
+    """Save {category: monthly limit in cents}."""
+    return _write_settings(budgets_path(), {category: cents / 100 for category, cents in limits.items()})
+
+@metrics.timed("file.load_rollup")
+@_exclusive
+def load_rollup():
+    """The month x category rollup, rebuilt from the ledger (and re-saved) when it is stale."""
+    cube = rollup.read(rollup_path(), ledger_signature())
+    if cube is None:
+        if _use_sqlite():
+            cube = Rollup.from_cells(sqlite_backend.rollup_cells(current_ledger().sqlite_file))
+        else:
+            files = [partition_path(key) for key in partition_keys()] if _use_partitions() else [current_ledger().data_file]
+            cube = _binary_rollup(files) or Rollup.build(load_expenses())
+        rollup.write(rollup_path(), cube, ledger_signature())
+    return cube
+
+def _binary_rollup(data_files):
+    """
+    Roll up JSON ledgers from the numeric columns of their binary snapshots
+    (plus any journal lines added since), without decoding a single row.
+    None unless every snapshot is current and NumPy is available.
+    """
+    cells = []
+    for data_file in data_files:
+        snapshot = _open_binary(data_file)
+        if snapshot is None:
+            return None
+        with snapshot:
+            tail = _read_journal(journal_path(data_file), snapshot.source["journal"])
+            if any(CHANGE_KEY in line for line in tail):
+                return None # Edits need the rows they replace
+            try:
+                part = Rollup.from_cells(snapshot.columns().rollup_cells())
+            except ImportError:
+                return None
+        for record in tail:
+            part.add(to_expense(record))
+        # Partitions hold disjoint months, so their cells never overlap
+        cells.extend((month, category, cents, count) for (month, category), (cents, count) in part.cells.items())
+    return Rollup.from_cells(cells)
+
+def _carry_rollup(signature_before, changes=()):
+    """Bring the sidecar across one of our own writes of (old, new) changes, provided it was current before it."""
+    cube = rollup.read(rollup_path(), signature_before)
+    if cube is None:
+        return # Already stale: load_rollup() rebuilds it when next needed
+    try:
+        for old, new in changes:
+            if old is not None:
+                cube.remove(old)
+            if new is not None:
+                cube.add(new)
+    except KeyError:
+        return # `old` was not in the ledger the sidecar describes; leave it stale
+    rollup.write(rollup_path(), cube, ledger_signature())
+
+@metrics.timed("file.save")
+@_exclusive
+def save_expenses(expenses):
+    """Save the full list of expenses, replacing what is stored."""
+    if not _save(expenses):
+        return False
+    try:
+        rollup.write(rollup_path(), Rollup.build(expenses), ledger_signature())
+    except (KeyError, TypeError, ValueError):
+        pass # A malformed record; the stale rollup is rebuilt (and fails loudly) when next read
+    return True
+
+def _save(expenses):
+    if _use_sqlite():
+        try:
+            sqlite_backend.save_expenses(current_ledger().sqlite_file, expenses)
+            return True
+        except sqlite_backend.sqlite3.Error:
+            return False
+    if _use_partitions():
+        return _save_partitions(expenses)
+
+    # JSON: write a new snapshot and reset the journal
+    return _write_snapshot(current_ledger().data_file, expenses)
+
+@metrics.timed("file.compact")
+@_exclusive
+def compact_journal():
+    """Fold the journal into the snapshot (every partition's, when partitioned)."""
+    if current_ledger().backend == "sqlite":
+        return True
+    before = ledger_signature()
+    if _use_partitions():
+        # Rewriting every partition also makes the manifest's counts and spans exact again
+        ok = _save_partitions(_load_partitions(partition_keys()))
+    else:
+        ok = _write_snapshot(current_ledger().data_file, _load_json_ledger())
+    _carry_rollup(before)
+    return ok
+
 def add_expense(expense):
-    """Add a new expense dictionary to the list and save."""
-    expenses = load_expenses()
-    expenses.append(expense)
-    return save_expenses(expenses)
+    """Append a new expense without rewriting the ledger."""
+    return add_expenses([expense])
+
+@metrics.timed("file.add")
+def add_expenses(expenses):
+    """Add several expenses in a single write (one transaction on SQLite)."""
+    return apply_changes([(None, expense) for expense in expenses])
+
+def update_expense(old, new):
+    """Replace the stored expense `old` (matched by id) with `new`, as a small change record."""
+    return apply_changes([(old, new)])
+
+def delete_expense(old):
+    """Delete the stored expense `old` (matched by id), as a tombstone folded in by the next compaction."""
+    return apply_changes([(old, None)])
+
+@metrics.timed("file.apply")
+@_exclusive
+def apply_changes(changes):
+    """
+    Write a batch of (old, new) changes in one go: (None, new) adds, (old, new)
+    edits and (old, None) deletes. Nothing existing is rewritten; the
+    rollup sidecar is adjusted by the difference.
+    """
+    if not changes:
+        return True
+    before = ledger_signature()
+    if not _apply(changes):
+        return False
+    _carry_rollup(before, changes)
+    return True
+
+def _apply(changes):
+    if _use_sqlite():
+        try:
+            sqlite_backend.apply_changes(current_ledger().sqlite_file, changes)
+            return True
+        except sqlite_backend.sqlite3.Error:
+            return False
+    if _use_partitions():
+        # Only the partitions of the changed expenses' months are touched
+        return _apply_to_partitions(changes)
+    return _append_journal(current_ledger().data_file, changes)
+
+@_exclusive
+def get_expense(expense_id):
+    """
+    The stored expense with this id, or None. An indexed lookup on SQLite,
+    but JSON ledgers are loaded and scanned, O(n): ExpenseStore.get answers
+    from its id -> position map instead.
+    """
+    if _use_sqlite():
+        return sqlite_backend.get_expense(current_ledger().sqlite_file, expense_id)
+    for expense in load_expenses():
+        if expense.id == expense_id:
+            return expense
+    return None
 
-def export_to_csv(filename="expenses.csv"):
-    """Export all expenses to a CSV file."""
-    expenses = load_expenses()
-    if not expenses:
+@metrics.timed("file.query")
+@_exclusive
+def query_expenses(category=None, start_date=None, end_date=None, text=None):
+    """
+    Return expenses matching the filters (dates as YYYY-MM-DD), newest first.
+    `text` keeps expenses whose description or category contains every word of it.
+    """
+    if _use_sqlite():
+        return sqlite_backend.query_expenses(current_ledger().sqlite_file, category, start_date, end_date, text)
+    if _use_partitions():
+        expenses = _load_partitions(partition_keys(start_date, end_date), save_ids=True)
+        return filter_expenses(expenses, category, start_date, end_date, text)
+
+    return filter_expenses(_load_json_ledger(save_ids=True), category, start_date, end_date, text)
+
+def filter_expenses(expenses, category=None, start_date=None, end_date=None, text=None):
+    """Filter an in-memory list of expenses the same way as query_expenses."""
+    terms = search_terms(text)
+    if terms:
+        expenses = [e for e in expenses if matches(e, terms)]
+    if category is not None:
+        expenses = [e for e in expenses if e['category'] == category]
+    if start_date is not None:
+        expenses = [e for e in expenses if e['date'] >= start_date]
+    if end_date is not None:
+        expenses = [e for e in expenses if e['date'] <= end_date]
+    return sorted(expenses, key=lambda x: x['date'], reverse=True)
+
+def get_summary():
+    """Return total, count, per-category and per-month spending for the dashboard (from the rollup)."""
+    return load_rollup().summary()
+
+@metrics.timed("file.date_range")
+@_exclusive
+def get_date_range():
+    """Return the (earliest, latest) valid expense date, or (None, None) when there is none."""
+    if _use_sqlite():
+        return tuple(sqlite_backend.date_range(current_ledger().sqlite_file))
+    if _use_partitions():
+        # The manifest already knows each month's span
+        spans = [entry for key, entry in read_manifest()["partitions"].items()
+                 if key != UNDATED_PARTITION and entry.get("count") and entry.get("first")]
+        if not spans:
+            return None, None
+        return min(e["first"] for e in spans), max(e["last"] for e in spans)
+    dates = [e['date'] for e in _load_json_ledger() if day_of(e) is not None]
+    if not dates:
+        return None, None
+    return min(dates), max(dates)
+
+@metrics.timed("file.daily_totals")
+@_exclusive
+def daily_totals():
+    """{date: cents} for every date in the ledger, for the trend chart."""
+    if _use_sqlite():
+        return sqlite_backend.daily_totals(current_ledger().sqlite_file)
+    totals = {}
+    for expense in load_expenses():
+        date = date_of(expense)
+        totals[date] = totals.get(date, 0) + cents_of(expense)
+    return totals
+
+def summarize_ledger(path):
+    """
+    Summary of the ledger at path, addressed as in Ledger.at: a .db file, a
+    .json snapshot plus its journal or a directory of month partitions.
+    Raises ValueError for anything else rather than reporting it as empty.
+    """
+    ledger = Ledger.at(path)
+    if ledger.backend == "partitioned" and not os.path.isfile(os.path.join(ledger.partition_dir, MANIFEST_FILE)):
+        raise ValueError(f"Not a ledger (.db, .json or partition directory): {path}")
+    with use_ledger(ledger):
+        return get_summary()
+
+def iter_expenses(chunk_size=CHUNK_SIZE):
+    """Yield the stored ledger as lists of up to chunk_size records, never all at once."""
+    if _use_sqlite():
+        yield from sqlite_backend.iter_expenses(current_ledger().sqlite_file, chunk_size)
+        return
+
+    if _use_partitions():
+        # Month by month, oldest first
+        files = [partition_path(key) for key in partition_keys()]
+    else:
+        files = [current_ledger().data_file]
+    sources = []
+    for path in files:
+        if _has_changes(journal_path(path)):
+            # Edits and deletes only make sense replayed over the snapshot
+            sources.append(_load_json_ledger(path))
+        else:
+            sources.extend((_iter_snapshot(path), _iter_journal(journal_path(path))))
+
+    chunk = []
+    for source in sources:
+        for record in source:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def _matches(expense, category, start_date, end_date):
+    if category is not None and expense['category'] != category:
         return False
-    
-    keys = expenses[0].keys()
+    if start_date is not None and expense['date'] < start_date:
+        return False
+    if end_date is not None and expense['date'] > end_date:
+        return False
+    return True
+
+@metrics.timed("file.export")
+def export_to_csv(filename="expenses.csv", expenses=None, fields=None, category=None,
+                  start_date=None, end_date=None, compress=None, progress=None):
+    """
+    Stream expenses to a CSV file, chunk by chunk.
+
+    Reads the stored ledger unless an already-loaded list is given. Columns
+    are `fields` if declared, otherwise the union of keys over all selected
+    records (found in a first pass); missing values are written empty.
+    The output is gzip-compressed when `compress` is true or, by default,
+    when the filename ends in ".gz". `progress(rows_written, total_rows)` is
+    called after each chunk; total_rows is None when fields are declared.
+    Returns False if nothing was exported.
+    """
+    def chunks():
+        if expenses is None:
+            yield from iter_expenses()
+        else:
+            for i in range(0, len(expenses), CHUNK_SIZE):
+                yield expenses[i:i + CHUNK_SIZE]
+
+    def selected(chunk):
+        return [e for e in chunk if _matches(e, category, start_date, end_date)]
+
+    total = None
+    if fields is None:
+        fields, total = {}, 0
+        for chunk in chunks():
+            for expense in selected(chunk):
+                total += 1
+                fields.update(dict.fromkeys(expense))
+        fields = list(fields)
+        if not total:
+            return False
+
+    if compress is None:
+        compress = filename.endswith(".gz")
+    opener = gzip.open if compress else open
+
+    written = 0
     try:
-        with open(filename, "w", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=keys)
+        with opener(filename, "wt", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields, restval="", extrasaction="ignore")
             writer.writeheader()
-            writer.writerows(expenses)
-        return True
+            for chunk in chunks():
+                rows = selected(chunk)
+                writer.writerows(rows)
+                written += len(rows)
+                if progress is not None:
+                    progress(written, total)
     except IOError:
         return False
+    return written > 0
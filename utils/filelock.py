@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+# Seconds to wait for another process to release the ledger before giving up
+LOCK_TIMEOUT = 10.0
+# Back-off between attempts while another process holds the lock
+MIN_POLL = 0.001
+MAX_POLL = 0.005
+
+class LockTimeout(TimeoutError):
+    """Another process kept the ledger locked for longer than the timeout."""
+
+def _try_lock(fd):
+    """Take the OS lock without blocking; raises OSError if another process has it."""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+class FileLock:
+    """
+    Advisory exclusive lock on a file, shared by every process using a ledger.
+
+    Re-entrant within a process: threads queue on an RLock and only the
+    outermost acquire takes the OS lock (flock on POSIX, msvcrt.locking on
+    Windows). Being advisory, it only keeps out code that takes it too.
+    """
+
+    def __init__(self, path, timeout=LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def _lock_file(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = time.monotonic() + self.timeout
+        delay = MIN_POLL
+        while True:
+            try:
+                _try_lock(fd)
+                return fd
+            except OSError:
+                if time.monotonic() >= deadline:
+                    os.close(fd)
+                    raise LockTimeout(f"{self.path} is locked by another process")
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_POLL)
+
+    def acquire(self):
+        if not self._thread_lock.acquire(timeout=self.timeout):
+            raise LockTimeout(f"{self.path} is locked by another thread")
+        if self._depth == 0:
+            try:
+                self._fd = self._lock_file()
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            fd, self._fd = self._fd, None
+            try:
+                _unlock(fd)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
@@ -0,0 +1,178 @@
+import csv
+from collections import Counter
+from datetime import datetime
+
+from utils.expense import cents_of
+
+CATEGORIES = ["Food", "Transport", "Bills", "Entertainment", "Shopping", "Health", "Misc"]
+DEFAULT_CATEGORY = "Misc"
+
+# Tried in order when no explicit date format is given
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d.%m.%Y", "%Y/%m/%d", "%d-%m-%Y"]
+
+# Header names recognised (case-insensitively) when no column mapping is given
+COLUMN_ALIASES = {
+    "amount": ["amount", "value", "debit", "sum", "betrag"],
+    "date": ["date", "transaction date", "posting date", "booking date", "datum"],
+    "description": ["description", "details", "memo", "payee", "narrative", "reference"],
+    "category": ["category", "type"],
+}
+
+# Rows validated per batch (and the granularity of progress reports)
+BATCH_SIZE = 10000
+
+class ImportResult:
+    """Outcome of a bulk import."""
+
+    def __init__(self):
+        self.accepted = []
+        self.rejected = [] # (line number, reason)
+        self.duplicates = 0
+        self.committed = False
+
+    def summary(self):
+        """One-line description for the user."""
+        return (f"{len(self.accepted)} imported, {self.duplicates} duplicates skipped, "
+                f"{len(self.rejected)} rejected")
+
+def guess_mapping(header):
+    """Map expense fields to CSV columns by their header names."""
+    lowered = {name.strip().lower(): name for name in header}
+    mapping = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in lowered:
+                mapping[field] = lowered[alias]
+                break
+    return mapping
+
+def parse_amount(value):
+    """Parse bank-style amounts ("$1,234.50", "(12.00)", "-3.5") into a positive float."""
+    try:
+        amount = float(value)
+    except ValueError:
+        text = value.strip().replace(",", "").replace("$", "").replace("€", "").replace("£", "")
+        if text.startswith("(") and text.endswith(")"):
+            text = text[1:-1]
+        amount = float(text)
+    amount = abs(amount) # Debits are often negative on statements
+    if amount == 0:
+        raise ValueError("zero amount")
+    return round(amount, 2)
+
+class _DateParser:
+    """Normalizes dates to YYYY-MM-DD, remembering the result per distinct string."""
+
+    def __init__(self, date_format=None):
+        self.formats = [date_format] if date_format else DATE_FORMATS
+        self.cache = {}
+
+    def __call__(self, value):
+        try:
+            result = self.cache[value]
+        except KeyError:
+            result = None
+            for fmt in self.formats:
+                try:
+                    result = datetime.strptime(value.strip(), fmt).strftime("%Y-%m-%d")
+                    break
+                except ValueError:
+                    continue
+            self.cache[value] = result
+        if result is None:
+            raise ValueError(f"unrecognised date {value!r}")
+        return result
+
+_CATEGORY_LOOKUP = {c.lower(): c for c in CATEGORIES}
+
+def normalize_category(value):
+    """Match a category name case-insensitively, falling back to DEFAULT_CATEGORY."""
+    return _CATEGORY_LOOKUP.get((value or "").strip().lower(), DEFAULT_CATEGORY)
+
+def expense_key(expense):
+    """Hashable identity used for duplicate detection."""
+    return (
+        expense['date'],
+        cents_of(expense),
+        expense['category'],
+        (expense.get('description') or "").strip().lower(),
+    )
+
+def _validate_batch(rows, mapping, parse_date, timestamp, result):
+    """Turn raw CSV rows into expense dicts, recording rejects in result."""
+    valid = []
+    for line, row in rows:
+        try:
+            expense = {
+                "amount": parse_amount(row[mapping["amount"]]),
+                "category": normalize_category(row.get(mapping.get("category"))),
+                "date": parse_date(row[mapping["date"]]),
+                "description": (row.get(mapping.get("description")) or "").strip(),
+                "timestamp": timestamp,
+            }
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            result.rejected.append((line, str(e) or "missing value"))
+            continue
+        valid.append(expense)
+    return valid
+
+def _accept(expenses, existing, seen, result):
+    """Queue validated expenses for commit, skipping ones already in the ledger."""
+    for expense in expenses:
+        key = expense_key(expense)
+        seen[key] += 1
+        if seen[key] <= existing[key]:
+            result.duplicates += 1
+        else:
+            result.accepted.append(expense)
+
+def import_csv(path, store, mapping=None, date_format=None, skip_duplicates=True,
+               encoding="utf-8-sig", progress=None):
+    """
+    Import a bank statement CSV into the ledger held by `store`.
+
+    Rows are streamed and validated in batches of BATCH_SIZE; everything
+    accepted is committed with a single store.add_many() call. `mapping`
+    maps the fields amount/date/description/category to CSV column names
+    (guessed from the header if omitted). A row is a duplicate when the
+    ledger already holds as many rows with the same date, amount, category
+    and description as the file has seen so far, so re-importing a
+    statement adds nothing while genuine repeats within it are kept.
+    `progress(rows_read, None)` is called after each batch.
+    """
+    result = ImportResult()
+    parse_date = _DateParser(date_format)
+    timestamp = datetime.now().isoformat()
+
+    existing = Counter(expense_key(e) for e in store.expenses()) if skip_duplicates else Counter()
+    seen = Counter()
+
+    with open(path, newline="", encoding=encoding) as f:
+        reader = csv.DictReader(f)
+        if mapping is None:
+            mapping = guess_mapping(reader.fieldnames or [])
+        missing = [field for field in ("amount", "date") if field not in mapping]
+        if missing:
+            raise ValueError(f"No column mapped for: {', '.join(missing)}")
+
+        batch = []
+        read = 0
+        for line, row in enumerate(reader, start=2):
+            batch.append((line, row))
+            if len(batch) >= BATCH_SIZE:
+                read += len(batch)
+                _accept(_validate_batch(batch, mapping, parse_date, timestamp, result), existing, seen, result)
+                batch = []
+                if progress is not None:
+                    progress(read, None)
+        if batch:
+            read += len(batch)
+            _accept(_validate_batch(batch, mapping, parse_date, timestamp, result), existing, seen, result)
+            if progress is not None:
+                progress(read, None)
+
+    try:
+        result.committed = store.add_many(result.accepted).result() # Runs on a worker thread, so wait
+    except IOError:
+        result.committed = False
+    return result
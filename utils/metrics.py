@@ -0,0 +1,174 @@
+"""
+Performance instrumentation.
+
+Set EXPENSE_TRACKER_METRICS=1 to time file I/O, aggregation, chart drawing
+and view rendering. Every finished span is written as one JSON object per
+line to metrics.jsonl (or to the value itself if it ends in .jsonl). The
+log rotates at LOG_MAX_BYTES and keeps LOG_BACKUPS old files. The sidebar
+then also offers an overlay with the breakdown of the last render.
+
+When the variable is unset, timed() hands functions back unwrapped and
+span() returns a shared no-op, so instrumented code costs next to nothing.
+"""
+import atexit
+import functools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueListener, RotatingFileHandler
+
+SETTING = os.environ.get("EXPENSE_TRACKER_METRICS", "")
+ENABLED = SETTING not in ("", "0")
+LOG_FILE = SETTING if SETTING.endswith(".jsonl") else "metrics.jsonl"
+LOG_MAX_BYTES = 1 << 20
+LOG_BACKUPS = 3
+
+_local = threading.local() # per-thread stack of open span names
+_entries = None
+_render = None # breakdown being collected for the view that is rendering
+last_render = None # the most recently finished breakdown
+
+class _NullSpan:
+    """What span() returns while metrics are off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **fields):
+        pass
+
+_NULL = _NullSpan()
+
+class _Span:
+    __slots__ = ("name", "fields", "start", "wall")
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+    def set(self, **fields):
+        """Attach extra fields (row counts and the like) to the log entry."""
+        self.fields.update(fields)
+
+    def __enter__(self):
+        stack = _stack()
+        stack.append(self.name)
+        self.wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ms = (time.perf_counter() - self.start) * 1000
+        stack = _stack()
+        stack.pop()
+        entry = {
+            "ts": round(self.wall, 3),
+            "span": self.name,
+            "ms": round(ms, 3),
+            "parent": stack[-1] if stack else None,
+            "thread": threading.current_thread().name,
+        }
+        if exc[0] is not None:
+            entry["error"] = exc[0].__name__
+        entry.update(self.fields)
+        _record(entry, self.start, len(stack))
+        return False
+
+def _stack():
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+class _JsonLinesListener(QueueListener):
+    """Turns queued span dicts into log lines on the listener's own thread."""
+
+    def prepare(self, entry):
+        return logging.makeLogRecord({"msg": json.dumps(entry), "levelno": logging.INFO})
+
+def _queue():
+    """Queue feeding the rotating JSON-lines log; the file is written on a background thread."""
+    global _entries
+    if _entries is None:
+        handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        entries = queue.SimpleQueue()
+        listener = _JsonLinesListener(entries, handler)
+        listener.start()
+        atexit.register(listener.stop)
+        _entries = entries
+    return _entries
+
+def _record(entry, start, depth):
+    render = _render
+    if render is not None:
+        render["spans"].append((start, entry["span"], entry["ms"], depth))
+    _queue().put(entry)
+
+def span(name, **fields):
+    """Context manager timing the enclosed block; a no-op unless metrics are on."""
+    if not ENABLED:
+        return _NULL
+    return _Span(name, fields)
+
+def timed(name=None):
+    """Decorator timing every call; returns the function itself unless metrics are on."""
+    def decorate(func):
+        if not ENABLED:
+            return func
+        label = name or f"{func.__module__}.{func.__qualname__}"
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Span(label, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def start_render(view):
+    """Start collecting the spans of a view render, replacing any unfinished one; returns it."""
+    global _render
+    if not ENABLED:
+        return None
+    _render = {"view": view, "start": time.perf_counter(), "spans": []}
+    return _render
+
+def rendering():
+    """True while a render is being collected."""
+    return _render is not None
+
+def finish_render(current):
+    """Close `current` (unless a newer render replaced it), log its total and keep it as last_render."""
+    global _render, last_render
+    if current is None or current is not _render:
+        return False
+    _render = None
+    current["ms"] = round((time.perf_counter() - current["start"]) * 1000, 3)
+    _queue().put({
+        "ts": round(time.time(), 3),
+        "span": "render",
+        "view": current["view"],
+        "ms": current["ms"],
+    })
+    last_render = current
+    return True
+
+def breakdown_text(breakdown=None, max_lines=16):
+    """Multi-line text describing a render (default: the last one) for the overlay."""
+    breakdown = breakdown or last_render
+    if breakdown is None:
+        return "No render recorded yet."
+    lines = [f"{breakdown['view']}: {breakdown['ms']:.1f} ms"]
+    # Spans are recorded as they finish; list them in the order they started
+    for _, name, ms, depth in sorted(breakdown["spans"])[:max_lines]:
+        lines.append(f"{'  ' * (depth + 1)}{name:<{max(24 - 2 * depth, 8)}}{ms:>8.1f}")
+    hidden = len(breakdown["spans"]) - max_lines
+    if hidden > 0:
+        lines.append(f"  … {hidden} more")
+    return "\n".join(lines)
@@ -0,0 +1,111 @@
+"""
+Recurring expenses (rent, subscriptions, bills) kept as rules, not rows.
+
+A rule is expanded by a generator, and only over the dates actually being
+shown or totalled, so years of a weekly bill are never stored one by one.
+The expenses it yields carry the rule's id under RULE_KEY and an id of
+their own derived from the rule and date, so they are stable across
+expansions.
+"""
+import calendar
+import heapq
+from datetime import date
+
+from utils.expense import Expense, new_id, parse_date, to_cents
+
+FREQUENCIES = ("weekly", "monthly")
+
+# Extra field naming the rule an expanded expense came from
+RULE_KEY = "recurring"
+
+def rule_of(expense):
+    """Id of the rule an expense was expanded from, or None for a stored expense."""
+    return expense.get(RULE_KEY)
+
+def month_range(month):
+    """First and last date (YYYY-MM-DD) of a YYYY-MM month."""
+    year, number = int(month[:4]), int(month[5:7])
+    return f"{month}-01", f"{month}-{calendar.monthrange(year, number)[1]:02d}"
+
+def _month_day(year, month, day):
+    """Ordinal of `day` in the month, moved back to its last day when the month is shorter."""
+    return date(year, month, min(day, calendar.monthrange(year, month)[1])).toordinal()
+
+class RecurringRule:
+    """
+    An expense repeated every week or every month from `start` (YYYY-MM-DD)
+    until `end` (inclusive; None for no end). Monthly rules keep the day of
+    month of `start`, falling back to the last day of shorter months.
+    """
+
+    __slots__ = ("id", "cents", "category", "description", "frequency", "start", "end")
+
+    def __init__(self, cents, category, start, frequency="monthly", end=None, description=None, id=None):
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency: {frequency}")
+        if parse_date(start)[1] is None or end is not None and parse_date(end)[1] is None:
+            raise ValueError("Dates must be YYYY-MM-DD")
+        if end is not None and end < start:
+            raise ValueError("A rule cannot end before it starts")
+        self.id = id or new_id()
+        self.cents = cents
+        self.category = category
+        self.description = description
+        self.frequency = frequency
+        self.start = start
+        self.end = end
+
+    @classmethod
+    def from_dict(cls, record):
+        """Build from a stored record; raises KeyError/ValueError/TypeError on a bad one."""
+        return cls(to_cents(record["amount"]), record["category"], record["start"], record["frequency"],
+                   record.get("end"), record.get("description"), record.get("id"))
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "amount": self.cents / 100,
+            "category": self.category,
+            "description": self.description,
+            "frequency": self.frequency,
+            "start": self.start,
+            "end": self.end,
+        }
+
+    def _days(self, first):
+        """Ordinal days of the rule from the first one on or after `first`, without end."""
+        start = parse_date(self.start)[1]
+        first = max(first, start)
+        if self.frequency == "weekly":
+            day = first + (start - first) % 7
+            while True:
+                yield day
+                day += 7
+        else:
+            begin, since = date.fromordinal(start), date.fromordinal(first)
+            year, month = since.year, since.month
+            if _month_day(year, month, begin.day) < first:
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+            while True:
+                yield _month_day(year, month, begin.day)
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    def occurrences(self, first=None, last=None):
+        """
+        Yield the rule's expenses dated within [first, last] (YYYY-MM-DD,
+        inclusive; None for no bound), oldest first. With neither `last` nor
+        an end date this never stops, so take only what is needed.
+        """
+        first = parse_date(first)[1] if first else 0
+        bounds = [parse_date(value)[1] for value in (last, self.end) if value]
+        last = min(bounds) if bounds else None
+        for day in self._days(first):
+            if last is not None and day > last:
+                return
+            when = date.fromordinal(day).isoformat()
+            yield Expense(self.cents, self.category, when, self.description,
+                          extra={RULE_KEY: self.id}, id=f"{self.id}@{when}")
+
+def expand(rules, first=None, last=None):
+    """The expenses of every rule within [first, last], merged into one stream, oldest first."""
+    return heapq.merge(*(rule.occurrences(first, last) for rule in rules), key=lambda e: e.day)
@@ -0,0 +1,117 @@
+"""
+Headless reports: summary statistics and charts for ledger files.
+
+Only matplotlib's Agg canvas is used, so nothing here needs a display or
+imports tkinter/customtkinter.
+"""
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from utils.chart_utils import ChartRenderer
+from utils.file_handler import summarize_ledger
+from utils.stats import get_top_category
+
+SUMMARY_FORMATS = ["json", "csv"]
+CHART_FORMATS = ["png", "svg"]
+
+# One renderer per worker process, reused for every ledger it handles
+_renderer = None
+
+def build_report(path):
+    """Summary figures for one ledger, ready to serialize."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No such ledger: {path}")
+    summary = summarize_ledger(path)
+    categories = sorted(summary["categories"].items(), key=lambda item: -item[1])
+    return {
+        "ledger": path,
+        "total": round(summary["total"], 2),
+        "count": summary["count"],
+        "top_category": get_top_category(summary["categories"]),
+        "categories": {name: round(amount, 2) for name, amount in categories},
+        "monthly": {month: round(amount, 2) for month, amount in sorted(summary["monthly"].items())},
+    }
+
+def write_summary(report, filename, summary_format):
+    """Write the summary as JSON, or as CSV rows of (section, name, amount)."""
+    if summary_format == "json":
+        with open(filename, "w") as f:
+            json.dump(report, f, indent=4)
+        return
+
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["section", "name", "amount"])
+        writer.writerow(["total", "", report["total"]])
+        writer.writerow(["count", "", report["count"]])
+        writer.writerow(["top_category", report["top_category"], report["categories"].get(report["top_category"], "")])
+        for category, amount in report["categories"].items():
+            writer.writerow(["category", category, amount])
+        for month, amount in report["monthly"].items():
+            writer.writerow(["month", month, amount])
+
+def write_charts(report, prefix, chart_format):
+    """Render the category pie and monthly trend; returns the files written."""
+    global _renderer
+    if _renderer is None:
+        _renderer = ChartRenderer()
+
+    written = []
+    if report["categories"]:
+        filename = f"{prefix}_categories.{chart_format}"
+        FigureCanvasAgg(_renderer.update_pie(report["categories"])).print_figure(filename, format=chart_format)
+        written.append(filename)
+    if report["monthly"]:
+        filename = f"{prefix}_monthly.{chart_format}"
+        FigureCanvasAgg(_renderer.update_trend(report["monthly"])).print_figure(filename, format=chart_format)
+        written.append(filename)
+    return written
+
+def _report_name(path):
+    """The name a ledger's report files start with (a partition directory's own name)."""
+    return os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+
+def report_ledger(path, out_dir, summary_format="json", chart_format="png"):
+    """Write the summary and charts for one ledger into out_dir; returns the files written."""
+    report = build_report(path)
+    prefix = os.path.join(out_dir, _report_name(path))
+    summary_file = f"{prefix}_summary.{summary_format}"
+    write_summary(report, summary_file, summary_format)
+    files = [summary_file]
+    if chart_format:
+        files.extend(write_charts(report, prefix, chart_format))
+    return files
+
+def report_ledgers(paths, out_dir, summary_format="json", chart_format="png", workers=None):
+    """
+    Report on many ledgers, spread across a process pool.
+
+    Yields (path, files, error) as each ledger finishes. workers=1 runs
+    everything in this process.
+    """
+    names = [_report_name(path) for path in paths]
+    clashes = sorted({name for name in names if names.count(name) > 1})
+    if clashes:
+        raise ValueError(f"Ledgers would overwrite each other's reports: {', '.join(clashes)}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    if workers == 1:
+        for path in paths:
+            try:
+                yield path, report_ledger(path, out_dir, summary_format, chart_format), None
+            except Exception as e:
+                yield path, [], e
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(report_ledger, path, out_dir, summary_format, chart_format): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            error = future.exception()
+            yield futures[future], (future.result() if error is None else []), error
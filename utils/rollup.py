@@ -0,0 +1,107 @@
+import json
+
+from utils import metrics
+from utils.aggregates import Aggregates
+from utils.expense import category_of, cents_of, month_of
+
+# Bump when the sidecar layout changes; older sidecars are then rebuilt
+ROLLUP_VERSION = 2 # 2: cells hold integer cents
+
+# Ledgers at least this large are rolled up with the NumPy columnar engine
+VECTORIZE_THRESHOLD = 50000
+
+def _columnar():
+    """The NumPy engine, imported only once a ledger is big enough to need it."""
+    try:
+        from utils.columnar import ColumnarLedger
+    except ImportError: # numpy not available
+        return None
+    return ColumnarLedger
+
+class Rollup(Aggregates):
+    """
+    Month x category table of (cents, count), from which every dashboard
+    figure follows.
+
+    It is small (months x categories cells), saved as a sidecar next to the
+    ledger and kept current with add(), so opening the dashboard costs
+    O(cells) instead of a pass over every row.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.cells = {} # (month, category) -> [cents, count]; month is "" for invalid dates
+
+    @classmethod
+    @metrics.timed("rollup.build")
+    def build(cls, expenses):
+        """Roll up a full ledger, vectorized when it is large."""
+        ColumnarLedger = _columnar() if len(expenses) >= VECTORIZE_THRESHOLD else None
+        if ColumnarLedger is None:
+            return cls.from_expenses(expenses)
+        return cls.from_cells(ColumnarLedger.from_expenses(expenses).rollup_cells())
+
+    @classmethod
+    def from_cells(cls, cells):
+        """Rebuild from (month, category, cents, count) rows."""
+        rollup = cls()
+        for month, category, cents, count in cells:
+            rollup.cells[(month, category)] = [cents, count]
+            rollup.cents += cents
+            rollup.count += count
+            rollup.category_cents[category] += cents
+            if month:
+                rollup.monthly_cents[month] += cents
+        return rollup
+
+    def add(self, expense):
+        """Fold one expense into the totals and its cell in O(1)."""
+        super().add(expense)
+        cell = self.cells.setdefault((month_of(expense) or "", category_of(expense)), [0, 0])
+        cell[0] += cents_of(expense)
+        cell[1] += 1
+
+    def remove(self, expense):
+        """Take one expense back out (after an edit or delete); O(1) unless its cell empties."""
+        month, category, cents = month_of(expense), category_of(expense), cents_of(expense)
+        key = (month or "", category)
+        cell = self.cells[key]
+        cell[0] -= cents
+        cell[1] -= 1
+        self.cents -= cents
+        self.count -= 1
+        self.category_cents[category] -= cents
+        if month is not None:
+            self.monthly_cents[month] -= cents
+        if cell[1] == 0:
+            # Forget categories and months with no expenses left, as a rebuild would
+            del self.cells[key]
+            if not any(c == category for _, c in self.cells):
+                del self.category_cents[category]
+            if month is not None and not any(m == key[0] for m, _ in self.cells):
+                del self.monthly_cents[month]
+
+def read(path, signature):
+    """Load the sidecar at path, or None unless it was written for exactly this ledger signature."""
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return None
+    if data.get("version") != ROLLUP_VERSION or data.get("ledger") != signature:
+        return None
+    return Rollup.from_cells(data["cells"])
+
+def write(path, rollup, signature):
+    """Save the rollup atomically; it is only a cache, so failures are not fatal."""
+    data = {
+        "version": ROLLUP_VERSION,
+        "ledger": signature,
+        "cells": [[month, category, cents, count] for (month, category), (cents, count) in rollup.cells.items()],
+    }
+    from utils.file_handler import write_json # file_handler imports this module
+    try:
+        write_json(path, data)
+        return True
+    except IOError:
+        return False
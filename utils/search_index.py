@@ -0,0 +1,128 @@
+def search_terms(text):
+    """Split a search string into lower-case terms (all of which must match)."""
+    return (text or "").lower().split()
+
+def document(expense):
+    """The searchable text of an expense: its description and category."""
+    return f"{expense.get('description') or ''} {expense.get('category') or ''}".lower()
+
+def matches(expense, terms):
+    """True if every term is a substring of the expense's searchable text."""
+    text = document(expense)
+    return all(term in text for term in terms)
+
+def _trigrams(term):
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+class SearchIndex:
+    """
+    Trigram index over expense descriptions and categories.
+
+    Distinct texts are indexed once (ledgers repeat descriptions a lot), each
+    trigram pointing at the texts containing it. A query intersects the
+    posting sets of its terms' trigrams, smallest first, and confirms the
+    few surviving texts with a substring check. Terms shorter than three
+    characters are checked against the candidates (or all distinct texts)
+    directly. Insertions, edits and removals update the index in place, in
+    constant time however many rows share a text.
+    """
+
+    def __init__(self, expenses=()):
+        self._texts = []     # text id -> text
+        self._text_ids = {}  # text -> text id
+        self._rows = []      # text id -> set of the positions of the expenses with that text
+        self._grams = {}     # trigram -> set of text ids
+        self._count = 0
+        self.add_many(expenses)
+
+    def __len__(self):
+        return self._count
+
+    def _text_id(self, text):
+        """Id of a distinct text, indexing it on first sight."""
+        text_id = self._text_ids.get(text)
+        if text_id is None:
+            text_id = len(self._texts)
+            self._text_ids[text] = text_id
+            self._texts.append(text)
+            self._rows.append(set())
+            for gram in _trigrams(text):
+                self._grams.setdefault(gram, set()).add(text_id)
+        return text_id
+
+    def _rows_of(self, expense):
+        return self._rows[self._text_ids[document(expense)]]
+
+    def add_many(self, expenses):
+        """Index new expenses; their positions continue from the last one added."""
+        for expense in expenses:
+            self._rows[self._text_id(document(expense))].add(self._count)
+            self._count += 1
+
+    def replace(self, position, old, new):
+        """The expense at position was edited from old to new."""
+        self._rows_of(old).remove(position)
+        self._rows[self._text_id(document(new))].add(position)
+
+    def remove(self, position, expense):
+        """Forget the expense at position (its text stays indexed, with one row less)."""
+        self._rows_of(expense).remove(position)
+        self._count -= 1
+
+    def move(self, old_position, new_position, expense):
+        """The expense at old_position now sits at new_position."""
+        rows = self._rows_of(expense)
+        rows.remove(old_position)
+        rows.add(new_position)
+
+    def estimate(self, text):
+        """Cheap upper bound on how many distinct texts could match."""
+        sizes = [len(self._grams.get(gram, ())) for term in search_terms(text) for gram in _trigrams(term)]
+        return min(sizes) if sizes else len(self._texts)
+
+    def matching(self, text):
+        """Ids of the distinct texts matching a search string (for count() and positions())."""
+        terms = search_terms(text)
+        texts = self._texts
+        if not terms:
+            return range(len(texts))
+
+        postings = []
+        for term in terms:
+            for gram in _trigrams(term):
+                posting = self._grams.get(gram)
+                if posting is None:
+                    return []
+                postings.append(posting)
+
+        if postings:
+            postings.sort(key=len)
+            candidates = postings[0].intersection(*postings[1:])
+        else:
+            candidates = range(len(texts)) # Only short terms: check every distinct text
+
+        # A three-letter term is exactly its trigram, so the postings already
+        # proved it; everything else needs a substring check
+        for term in terms:
+            if len(term) != 3:
+                candidates = [i for i in candidates if term in texts[i]]
+        return candidates
+
+    def count(self, text_ids):
+        """How many expenses have one of these texts."""
+        rows = self._rows
+        return sum(len(rows[text_id]) for text_id in text_ids)
+
+    def positions(self, text_ids):
+        """The positions (numbered in insertion order, unsorted) of the expenses with these texts."""
+        rows = self._rows
+        positions = []
+        for text_id in text_ids:
+            positions.extend(rows[text_id])
+        return positions
+
+    def search(self, text):
+        """Return the positions (numbered in insertion order, unsorted) of the matching expenses."""
+        if not search_terms(text):
+            return list(range(self._count))
+        return self.positions(self.matching(text))
@@ -0,0 +1,191 @@
+import json
+import sqlite3
+from contextlib import contextmanager
+
+from utils.expense import id_of, new_id, parse_date, to_expense
+from utils.rollup import Rollup
+from utils.search_index import search_terms
+
+# Columns stored natively; any other keys go into the `extra` JSON column
+FIELDS = ("id", "amount", "category", "date", "description", "timestamp")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY,
+    uid TEXT,
+    amount REAL NOT NULL,
+    category TEXT NOT NULL,
+    date TEXT NOT NULL,
+    month TEXT,
+    description TEXT,
+    timestamp TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date);
+CREATE INDEX IF NOT EXISTS idx_expenses_category_date ON expenses(category, date);
+CREATE INDEX IF NOT EXISTS idx_expenses_month ON expenses(month);
+"""
+
+def _migrate(conn):
+    """Give databases created before expense ids a uid column, filled with fresh ids."""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(expenses)")]
+    if "uid" not in columns:
+        with conn:
+            conn.execute("ALTER TABLE expenses ADD COLUMN uid TEXT")
+            conn.execute("UPDATE expenses SET uid = lower(hex(randomblob(8)))")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_uid ON expenses(uid)")
+
+@contextmanager
+def connect(db_file):
+    """Open the database in a transaction, making sure the schema exists."""
+    conn = sqlite3.connect(db_file)
+    try:
+        conn.executescript(SCHEMA)
+        _migrate(conn)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def _month_key(date_str):
+    """Same month bucketing as stats.get_monthly_spending; None for bad dates."""
+    return parse_date(date_str)[2]
+
+def _to_row(expense):
+    extra = {k: v for k, v in expense.items() if k not in FIELDS}
+    return (
+        expense.get("id") or new_id(),
+        float(expense["amount"]),
+        expense["category"],
+        expense["date"],
+        _month_key(expense["date"]),
+        expense.get("description"),
+        expense.get("timestamp"),
+        json.dumps(extra) if extra else None,
+    )
+
+def _to_dict(row):
+    uid, amount, category, date, description, timestamp, extra = row
+    expense = {
+        "id": uid,
+        "amount": amount,
+        "category": category,
+        "date": date,
+        "description": description,
+        "timestamp": timestamp,
+    }
+    if extra:
+        expense.update(json.loads(extra))
+    return expense
+
+INSERT_SQL = (
+    "INSERT INTO expenses (uid, amount, category, date, month, description, timestamp, extra) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+UPDATE_SQL = (
+    "UPDATE expenses SET uid = ?, amount = ?, category = ?, date = ?, month = ?, "
+    "description = ?, timestamp = ?, extra = ? WHERE uid = ?"
+)
+SELECT_SQL = "SELECT uid, amount, category, date, description, timestamp, extra FROM expenses"
+
+def load_expenses(db_file):
+    """Return every expense in insertion order."""
+    with connect(db_file) as conn:
+        return [to_expense(_to_dict(r)) for r in conn.execute(SELECT_SQL + " ORDER BY id")]
+
+def iter_expenses(db_file, chunk_size):
+    """Yield all expenses in insertion order as lists of up to chunk_size."""
+    with connect(db_file) as conn:
+        cursor = conn.execute(SELECT_SQL + " ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield [_to_dict(r) for r in rows]
+
+def add_expense(db_file, expense):
+    """Insert a single expense."""
+    with connect(db_file) as conn:
+        conn.execute(INSERT_SQL, _to_row(expense))
+
+def save_expenses(db_file, expenses):
+    """Replace the whole table with the given expenses."""
+    with connect(db_file) as conn:
+        conn.execute("DELETE FROM expenses")
+        conn.executemany(INSERT_SQL, (_to_row(e) for e in expenses))
+
+def import_expenses(db_file, expenses):
+    """Bulk insert expenses into the database (used by the JSON importer)."""
+    with connect(db_file) as conn:
+        conn.executemany(INSERT_SQL, (_to_row(e) for e in expenses))
+
+def apply_changes(db_file, changes):
+    """Apply (old, new) changes in one transaction: additions, then edits and deletes by id, in order."""
+    with connect(db_file) as conn:
+        conn.executemany(INSERT_SQL, (_to_row(new) for old, new in changes if old is None))
+        for old, new in changes:
+            if old is None:
+                continue
+            if new is None:
+                conn.execute("DELETE FROM expenses WHERE uid = ?", (id_of(old),))
+            else:
+                conn.execute(UPDATE_SQL, _to_row(new) + (id_of(old),))
+
+def get_expense(db_file, uid):
+    """The expense with this id, or None (an indexed lookup)."""
+    with connect(db_file) as conn:
+        row = conn.execute(SELECT_SQL + " WHERE uid = ?", (uid,)).fetchone()
+    return None if row is None else to_expense(_to_dict(row))
+
+def is_empty(db_file):
+    """Return True if the database holds no expenses yet."""
+    with connect(db_file) as conn:
+        return conn.execute("SELECT 1 FROM expenses LIMIT 1").fetchone() is None
+
+def query_expenses(db_file, category=None, start_date=None, end_date=None, text=None):
+    """Return expenses matching the filters, newest first, using the indexes."""
+    clauses, params = [], []
+    for term in search_terms(text):
+        clauses.append("LOWER(COALESCE(description, '') || ' ' || category) LIKE ? ESCAPE '\\'")
+        params.append("%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    if category is not None:
+        clauses.append("category = ?")
+        params.append(category)
+    if start_date is not None:
+        clauses.append("date >= ?")
+        params.append(start_date)
+    if end_date is not None:
+        clauses.append("date <= ?")
+        params.append(end_date)
+    sql = SELECT_SQL
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY date DESC, id"
+    with connect(db_file) as conn:
+        return [to_expense(_to_dict(r)) for r in conn.execute(sql, params)]
+
+def date_range(db_file):
+    """Earliest and latest valid expense date (both None when there is none)."""
+    with connect(db_file) as conn:
+        # month is only set for dates that parse
+        return conn.execute("SELECT MIN(date), MAX(date) FROM expenses WHERE month IS NOT NULL").fetchone()
+
+def rollup_cells(db_file):
+    """(month, category, cents, count) per month x category, in order of first insertion."""
+    with connect(db_file) as conn:
+        return conn.execute(
+            "SELECT COALESCE(month, ''), category, SUM(CAST(ROUND(amount * 100) AS INTEGER)), COUNT(*) "
+            "FROM expenses "
+            "GROUP BY month, category ORDER BY MIN(id)"
+        ).fetchall()
+
+def daily_totals(db_file):
+    """{date: cents} per distinct date string, grouped in SQL."""
+    with connect(db_file) as conn:
+        return dict(conn.execute(
+            "SELECT date, SUM(CAST(ROUND(amount * 100) AS INTEGER)) FROM expenses GROUP BY date"
+        ))
+
+def get_summary(db_file):
+    """Dashboard figures from the grouped month x category cells, summed in integer cents like every other path."""
+    return Rollup.from_cells(rollup_cells(db_file)).summary()
@@ -0,0 +1,92 @@
+"""
+Startup timing report.
+
+Set EXPENSE_TRACKER_STARTUP_REPORT=1 to print, once the dashboard has
+finished loading, how long each top-level module took to import and when
+the first frame and the dashboard data appeared. Set it to a path ending
+in .json to write the report there instead (handy for comparing builds).
+When the variable is unset nothing is hooked and the cost is nil.
+"""
+import importlib.abc
+import json
+import os
+import sys
+import time
+
+_START = time.perf_counter()
+
+SETTING = os.environ.get("EXPENSE_TRACKER_STARTUP_REPORT", "")
+ENABLED = bool(SETTING)
+
+imports = {} # top-level module -> seconds (inclusive of what it imports)
+marks = []   # (label, seconds since startup)
+_reported = False
+
+class _TimedLoader(importlib.abc.Loader):
+    """Wraps a module's loader just for the duration of exec_module."""
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Hand the real loader back to the module before its code runs
+        module.__loader__ = self._loader
+        module.__spec__.loader = self._loader
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            imports[module.__name__] = time.perf_counter() - start
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """Times the first import of every top-level module."""
+
+    def find_spec(self, name, path=None, target=None):
+        if "." in name or name in imports:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader)
+                return spec
+        return None
+
+def mark(label):
+    """Record a startup milestone (only the first occurrence of each label counts)."""
+    if ENABLED and label not in dict(marks):
+        marks.append((label, time.perf_counter() - _START))
+
+def report():
+    """Print or save the report; only the first call does anything."""
+    global _reported
+    if not ENABLED or _reported:
+        return
+    _reported = True
+
+    data = {
+        "imports": dict(sorted(imports.items(), key=lambda item: -item[1])),
+        "marks": dict(marks),
+    }
+    if SETTING.endswith(".json"):
+        with open(SETTING, "w") as f:
+            json.dump(data, f, indent=4)
+        return
+
+    print("Startup report (ms since launch)")
+    for label, seconds in marks:
+        print(f"  {label:<28}{seconds * 1000:>9.1f}")
+    print("Top-level imports (ms, inclusive)")
+    for name, seconds in list(data["imports"].items())[:15]:
+        print(f"  {name:<28}{seconds * 1000:>9.1f}")
+
+if ENABLED:
+    sys.meta_path.insert(0, _ImportTimer())
@@ -1,39 +1,69 @@
 from collections import defaultdict
-from datetime import datetime
 
+from utils import metrics
+from utils.aggregates import Aggregates
+from utils.expense import category_of, cents_of, month_of
+
+# Amounts are summed as integer cents so totals never drift on large ledgers
+
+def _columns(expenses):
+    """
+    The NumPy columns of a binary snapshot (utils.binary_snapshot) passed in
+    place of a list, so it is summed without decoding any rows; else None.
+    """
+    columns = getattr(expenses, "columns", None)
+    return None if columns is None else columns()
+
+@metrics.timed("stats.total")
 def get_total_spending(expenses):
     """Calculate total spending from a list of expenses."""
-    return sum(float(item['amount']) for item in expenses)
+    columns = _columns(expenses)
+    if columns is not None:
+        return columns.get_total_spending()
+    return sum(cents_of(item) for item in expenses) / 100
 
 def get_expense_count(expenses):
     """Return the total number of expenses."""
     return len(expenses)
 
+@metrics.timed("stats.categories")
 def get_category_breakdown(expenses):
     """Return a dictionary of total spending per category."""
-    breakdown = defaultdict(float)
+    columns = _columns(expenses)
+    if columns is not None:
+        return columns.get_category_breakdown()
+    breakdown = defaultdict(int)
     for item in expenses:
-        breakdown[item['category']] += float(item['amount'])
-    return dict(breakdown)
+        breakdown[category_of(item)] += cents_of(item)
+    return {category: cents / 100 for category, cents in breakdown.items()}
 
 def get_highest_spending_category(expenses):
     """Return the category with the highest spending."""
-    breakdown = get_category_breakdown(expenses)
-    if not breakdown:
-        return "N/A"
-    return max(breakdown, key=breakdown.get)
+    return get_top_category(get_category_breakdown(expenses))
 
+@metrics.timed("stats.monthly")
 def get_monthly_spending(expenses):
     """Return a dictionary of spending per month (YYYY-MM)."""
-    monthly = defaultdict(float)
+    columns = _columns(expenses)
+    if columns is not None:
+        return columns.get_monthly_spending()
+    monthly = defaultdict(int)
     for item in expenses:
-        # Assuming date format is YYYY-MM-DD or similar that can be parsed
-        # If date is stored as string, we might need to parse it.
-        # Let's assume standard ISO format or similar for now.
-        try:
-            date_obj = datetime.strptime(item['date'], "%Y-%m-%d")
-            month_key = date_obj.strftime("%Y-%m")
-            monthly[month_key] += float(item['amount'])
-        except ValueError:
-            continue # Skip invalid dates
-    return dict(monthly)
+        month_key = month_of(item) # Dates are parsed once per distinct string
+        if month_key is not None: # Skip invalid dates
+            monthly[month_key] += cents_of(item)
+    return {month: cents / 100 for month, cents in monthly.items()}
+
+def get_top_category(breakdown):
+    """Return the category with the highest total from a precomputed breakdown."""
+    if not breakdown:
+        return "N/A"
+    return max(breakdown, key=breakdown.get)
+
+@metrics.timed("stats.summarize")
+def summarize(expenses):
+    """Return all dashboard figures for a list of expenses in a single pass."""
+    columns = _columns(expenses)
+    if columns is not None:
+        return columns.summary()
+    return Aggregates.from_expenses(expenses).summary()
@@ -0,0 +1,686 @@
+import functools
+import hashlib
+import heapq
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Sequence
+from datetime import date
+
+from utils import file_handler, metrics, recurring
+from utils.aggregates import Aggregates
+from utils.date_index import DateIndex
+from utils.expense import Expense, category_of, id_of, month_of, to_expense
+from utils.search_index import SearchIndex, matches, search_terms
+from utils.trend import DailySeries
+from utils.write_behind import WriteBehindQueue
+
+# Minimum seconds between stat() checks for changes made outside the app
+CHECK_INTERVAL = 1.0
+
+# Rough bytes of memory per loaded row (the record, its strings and its slots
+# in the list and id map) and per row of the date and search indexes (with
+# repetitive descriptions), measured with tracemalloc
+ROW_BYTES = 350
+INDEX_ROW_BYTES = 40
+SEARCH_ROW_BYTES = 80
+
+# Unfiltered searches with more hits than this are put in date order lazily, as the list is scrolled
+LAZY_HITS = 10000
+
+def _today():
+    return date.today().isoformat()
+
+def _locked(method):
+    """Serialize access so background loaders and the UI can share a store, and work on its ledger."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock, file_handler.use_ledger(self.ledger):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class _Hits(Sequence):
+    """
+    The `count` expenses of `rows` (newest first) that `match`, found only as
+    far as they are read: showing the top of a broad search walks a few
+    hundred rows instead of sorting every hit.
+    """
+
+    def __init__(self, rows, match, count):
+        self._rows = iter(rows)
+        self._match = match
+        self._count = count
+        self._found = []
+        self._lock = threading.Lock() # The UI and a worker may read the same cached result
+
+    def __len__(self):
+        return self._count
+
+    def _find(self, n):
+        """Walk on until the first n hits are known."""
+        found, match = self._found, self._match
+        with self._lock:
+            if len(found) >= n:
+                return
+            for expense in self._rows:
+                if match(expense):
+                    found.append(expense)
+                    if len(found) >= n:
+                        return
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("hit index out of range")
+        self._find(i + 1)
+        return self._found[i]
+
+class ExpenseStore:
+    """
+    In-memory view of the ledger shared by all screens.
+
+    The parsed expenses and any derived results (filters, dashboard summary)
+    are kept until the ledger files change on disk. Writes made through the
+    store update the cache directly, so they never force a reload, and are
+    saved in the background by a WriteBehindQueue; anything read from disk
+    waits for the pending writes first. Edits and deletes find their row
+    through an id -> position map, so neither costs a pass over the ledger.
+
+    Recurring expense rules are expanded on the fly into whatever range is
+    queried or totalled (up to today), never stored as rows. Monthly
+    category budgets are checked against the running month x category
+    totals of the rollup.
+
+    `ledger` is a file_handler.Ledger; by default, the configured one.
+    """
+
+    def __init__(self, ledger=None):
+        self.ledger = ledger
+        self._lock = threading.RLock()
+        # One per index, so a slow build of one never holds up the other
+        self._build_locks = {"_index": threading.Lock(), "_search_index": threading.Lock()}
+        self._generation = 0 # bumped whenever loaded rows are edited, moved or dropped (not appended)
+        self._expenses = None
+        self._positions = None # expense id -> position in self._expenses
+        self._results = {}
+        self._aggregates = None
+        self._daily = None
+        self._index = None
+        self._search_index = None
+        self._rules = None
+        self._budgets = None
+        self._signature = None
+        self._content_hash = None
+        self._last_check = 0.0
+        # Set by the writer thread, acted on by _check() under the store lock:
+        # the (before, after) stat signature of each of our commits, oldest first
+        self._commits = deque()
+        self._write_failed = False
+        self._writer = WriteBehindQueue(commit=self._commit, on_commit=self._on_commit,
+                                        on_error=self._on_write_error)
+
+    def _stat_signature(self):
+        signature = []
+        for path in file_handler.ledger_files():
+            try:
+                st = os.stat(path)
+                signature.append((path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def _hash_files(self):
+        digest = hashlib.blake2b(digest_size=16)
+        for path in file_handler.ledger_files():
+            try:
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+            except OSError:
+                pass
+            digest.update(b"\0")
+        return digest.digest()
+
+    def _commit(self, changes):
+        """
+        Runs on the writer thread. Returns the ledger's stat signature from
+        just before and just after the write, both read under the ledger
+        lock, or None if the write failed.
+        """
+        with file_handler.use_ledger(self.ledger), file_handler.ledger_lock():
+            before = self._stat_signature()
+            if not file_handler.apply_changes(changes):
+                return None
+            return before, self._stat_signature()
+
+    def _on_commit(self, changes, signatures):
+        self._commits.append(signatures)
+
+    def _on_write_error(self, changes, error):
+        self._write_failed = True
+
+    def _check(self, force=False):
+        """Drop cached data if the ledger changed on disk since it was read."""
+        if self._write_failed:
+            # The cache holds expenses that never reached the disk
+            self._write_failed = False
+            self._commits.clear()
+            self.invalidate()
+        elif self._commits:
+            self._mark_written()
+            return
+        if not self._writer.idle():
+            # Our own write is under way and is accounted for once committed;
+            # anything else that changed is noticed by the next check
+            return
+        now = time.monotonic()
+        if not force and now - self._last_check < CHECK_INTERVAL:
+            return
+        self._last_check = now
+
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return
+        self._signature = signature
+
+        # mtime/size moved; skip the reparse if the bytes are unchanged (e.g. a touch)
+        if self._content_hash is not None and self._hash_files() == self._content_hash:
+            return
+        self.invalidate()
+
+    def _mark_written(self):
+        """
+        Record our own writes so they are not mistaken for external changes.
+        A write only accounts for the files it changed if they were still as
+        we last saw them when it started; otherwise another process wrote in
+        between and the cache is dropped.
+        """
+        while self._commits:
+            before, after = self._commits.popleft()
+            if before != self._signature:
+                self.invalidate()
+            self._signature = after
+        self._content_hash = None
+        self._last_check = time.monotonic()
+
+    @_locked
+    def invalidate(self):
+        """Forget everything cached; the next read goes back to disk."""
+        self._generation += 1
+        self._expenses = None
+        self._positions = None
+        self._content_hash = None
+        self._aggregates = None
+        self._daily = None
+        self._index = None
+        self._search_index = None
+        self._rules = None
+        self._budgets = None
+        self._results.clear()
+
+    @_locked
+    def expenses(self):
+        """Return the full ledger (do not mutate the returned list)."""
+        self._check()
+        if self._expenses is None:
+            self._writer.flush()
+            with file_handler.ledger_lock():
+                self._expenses = file_handler.load_expenses()
+                # Loading may rewrite the ledger (ids saved for old records): that is no outside change
+                self._signature = self._stat_signature()
+                self._content_hash = self._hash_files()
+        return self._expenses
+
+    @metrics.timed("store.query")
+    def query(self, category=None, start_date=None, end_date=None, text=None):
+        """Filtered (and optionally text-searched) expenses, newest first, cached per filter combination."""
+        text = " ".join(search_terms(text)) or None
+        self._build("_index", DateIndex)
+        if text is not None:
+            self._build("_search_index", SearchIndex)
+        return self._query(category, start_date, end_date, text)
+
+    @_locked
+    def _query(self, category, start_date, end_date, text):
+        self._check()
+        key = ("query", category, start_date, end_date, text)
+        if key not in self._results:
+            if self._reads_from_disk():
+                self._writer.flush()
+                result = file_handler.query_expenses(category, start_date, end_date, text)
+            elif text is None:
+                result = self.index().query(category, start_date, end_date)
+            else:
+                result = self._search(text, category, start_date, end_date)
+            if self._recurring_rules():
+                result = self._with_recurring(result, category, start_date, end_date, text)
+            if text is not None:
+                # Only keep the latest search; typing would otherwise pile up results
+                for old in [k for k in self._results if k[0] == "query" and k[4] is not None]:
+                    del self._results[old]
+            self._results[key] = result
+        return self._results[key]
+
+    def _with_recurring(self, expenses, category, start_date, end_date, text):
+        """Merge the recurring expenses matching a query into its (newest first) result."""
+        expanded = recurring.expand(self._recurring_rules(), start_date, min(end_date or _today(), _today()))
+        matching = file_handler.filter_expenses(list(expanded), category, start_date, end_date, text)
+        return list(heapq.merge(expenses, matching, key=lambda e: e['date'], reverse=True))
+
+    def _reads_from_disk(self):
+        """
+        True when queries should go to the backend instead of the cached ledger:
+        always for SQLite, and for partitions until the whole ledger is loaded
+        anyway (then only the overlapping months are read).
+        """
+        backend = file_handler.current_ledger().backend
+        return backend == "sqlite" or (backend == "partitioned" and self._expenses is None)
+
+    def _search(self, text, category, start_date, end_date):
+        """Text search combined with the index filters, starting from whichever side is smaller."""
+        index = self.index()
+        search_index = self.search_index()
+        rows = index.count(category, start_date, end_date)
+        if rows <= search_index.estimate(text):
+            # The filters already narrow things down: check those rows directly
+            terms = search_terms(text)
+            return [e for e in index.query(category, start_date, end_date) if matches(e, terms)]
+
+        texts = search_index.matching(text)
+        if category is None and start_date is None and end_date is None:
+            count = search_index.count(texts)
+            if count > LAZY_HITS:
+                # Plenty of hits among all rows: the top of the list turns up long before a sort would end
+                terms = search_terms(text)
+                return _Hits(index.query(), lambda expense: matches(expense, terms), count)
+
+        expenses = self.expenses()
+        positions = search_index.positions(texts)
+        if len(positions) * 4 < rows:
+            # Far fewer hits than filtered rows: filter and order just the hits
+            positions.sort()
+            return file_handler.filter_expenses([expenses[i] for i in positions], category, start_date, end_date)
+        # Otherwise walk the (already ordered) filtered rows and keep the hits
+        hit_ids = {id(expenses[i]) for i in positions}
+        return [e for e in index.query(category, start_date, end_date) if id(e) in hit_ids]
+
+    def _build(self, name, build):
+        """
+        Build the index kept in attribute `name` from the loaded ledger
+        without holding the store lock, so other threads (the UI) can keep
+        reading meanwhile. Rows added during the build are then added to it;
+        if rows were edited or deleted instead, it is built again. Never call
+        this while holding the store lock.
+        """
+        with self._build_locks[name]:
+            while True:
+                with self._lock, file_handler.use_ledger(self.ledger):
+                    self._check()
+                    if getattr(self, name) is not None or self._reads_from_disk():
+                        return
+                    # A copy, since writes change the loaded list in place
+                    expenses, generation = list(self.expenses()), self._generation
+                with metrics.span("store." + name.lstrip("_")):
+                    index = build(expenses)
+                with self._lock:
+                    if self._generation == generation:
+                        if getattr(self, name) is None:
+                            index.add_many(self._expenses[len(expenses):])
+                            setattr(self, name, index)
+                        return
+
+    @metrics.timed("store.search_index")
+    @_locked
+    def search_index(self):
+        """The trigram index over descriptions, built once and kept current on every write."""
+        self._check()
+        if self._search_index is None:
+            self._search_index = SearchIndex(self.expenses())
+        return self._search_index
+
+    @metrics.timed("store.index")
+    @_locked
+    def index(self):
+        """The date/category index over the ledger, built once and kept current on every write."""
+        self._check()
+        if self._index is None:
+            self._index = DateIndex(self.expenses())
+        return self._index
+
+    def date_range(self):
+        """Return the (earliest, latest) expense date, or (None, None) for an empty ledger."""
+        self._build("_index", DateIndex)
+        return self._date_range()
+
+    @_locked
+    def _date_range(self):
+        self._check()
+        if self._reads_from_disk():
+            key = ("date_range",)
+            if key not in self._results:
+                self._writer.flush()
+                self._results[key] = file_handler.get_date_range()
+            first, last = self._results[key]
+        else:
+            first, last = self.index().date_range()
+        # Recurring expenses from their start up to today
+        started = [rule.start for rule in self._recurring_rules() if rule.start <= _today()]
+        if started:
+            ends = [min(rule.end or _today(), _today()) for rule in self._recurring_rules() if rule.start <= _today()]
+            first = min([first] + started) if first else min(started)
+            last = max([last] + ends) if last else max(ends)
+        return first, last
+
+    def prepare_search(self):
+        """Build the search index ahead of the first query, unless queries go to the backend."""
+        self._build("_index", DateIndex)
+        self._build("_search_index", SearchIndex)
+
+    @_locked
+    def aggregates(self):
+        """Running totals for the dashboard, read from the persisted rollup and kept current on every write."""
+        self._check()
+        if self._aggregates is None:
+            self._writer.flush()
+            self._aggregates = file_handler.load_rollup()
+        return self._aggregates
+
+    def _daily_series(self):
+        """Spending per day (a trend.DailySeries), built once and kept current on every write."""
+        self._check()
+        if self._daily is None:
+            if self._reads_from_disk():
+                self._writer.flush()
+                self._daily = DailySeries.from_date_totals(file_handler.daily_totals())
+            else:
+                self._daily = DailySeries.from_expenses(self.expenses())
+        return self._daily
+
+    @metrics.timed("store.trend")
+    @_locked
+    def trend_points(self, granularity="day"):
+        """
+        (bucket days, cents) of spending per day, week or month over the whole
+        history. Do not mutate the returned lists.
+        """
+        if not self._recurring_rules():
+            return self._daily_series().points(granularity)
+        key = ("trend", granularity, _today())
+        if key not in self._results:
+            self._results[key] = DailySeries(self.daily_totals()).points(granularity)
+        return self._results[key]
+
+    @_locked
+    def daily_totals(self):
+        """A copy of the {day ordinal: cents} totals behind the trend, recurring expenses included."""
+        totals = dict(self._daily_series().totals)
+        for day, cents in self._recurring_totals()[1].totals.items():
+            totals[day] = totals.get(day, 0) + cents
+        return totals
+
+    @metrics.timed("store.summary")
+    @_locked
+    def summary(self):
+        """Dashboard figures in the shape of stats.summarize, recurring expenses up to today included."""
+        if not self._recurring_rules():
+            return self.aggregates().summary()
+        return Aggregates.merged([self.aggregates(), self._recurring_totals()[0]]).summary()
+
+    # --- Recurring expenses and budgets ---
+
+    def _recurring_rules(self):
+        if self._rules is None:
+            self._rules = file_handler.load_recurring()
+        return self._rules
+
+    def _recurring_totals(self):
+        """(Aggregates, DailySeries) of every recurring expense up to today, expanded once a day or per change."""
+        key = ("recurring", _today())
+        if key not in self._results:
+            expanded = list(recurring.expand(self._recurring_rules(), None, _today()))
+            self._results[key] = (Aggregates.from_expenses(expanded), DailySeries.from_expenses(expanded))
+        return self._results[key]
+
+    @_locked
+    def recurring_rules(self):
+        """The recurring expense rules, oldest start first."""
+        self._check()
+        return sorted(self._recurring_rules(), key=lambda rule: rule.start)
+
+    def _save_rules(self, rules):
+        if not file_handler.save_recurring(rules):
+            raise IOError("Could not save recurring expenses")
+        self._rules = rules
+        self._results.clear()
+
+    @_locked
+    def add_recurring(self, rule):
+        """Save a new recurring.RecurringRule; raises IOError if it could not be written."""
+        self._save_rules(self._recurring_rules() + [rule])
+
+    @_locked
+    def end_recurring(self, rule_id, end):
+        """Stop a rule after `end` (YYYY-MM-DD), keeping its earlier expenses; a rule ending before it starts goes."""
+        rules = []
+        for rule in self._recurring_rules():
+            if rule.id == rule_id:
+                if end < rule.start:
+                    continue
+                rule = recurring.RecurringRule(rule.cents, rule.category, rule.start, rule.frequency,
+                                               min(end, rule.end or end), rule.description, rule.id)
+            rules.append(rule)
+        self._save_rules(rules)
+
+    @_locked
+    def remove_recurring(self, rule_id):
+        """Delete a rule together with every expense it ever produced."""
+        self._save_rules([rule for rule in self._recurring_rules() if rule.id != rule_id])
+
+    @_locked
+    def budgets(self):
+        """{category: monthly limit in cents}."""
+        self._check()
+        if self._budgets is None:
+            self._budgets = file_handler.load_budgets()
+        return dict(self._budgets)
+
+    @_locked
+    def set_budgets(self, limits):
+        """Replace the monthly budgets ({category: cents}); raises IOError if they could not be written."""
+        if not file_handler.save_budgets(limits):
+            raise IOError("Could not save budgets")
+        self._budgets = dict(limits)
+
+    def _spent(self, month, category):
+        """Cents spent in a category and month: its rollup cell plus the recurring expenses due by today."""
+        cell = self.aggregates().cells.get((month, category))
+        spent = cell[0] if cell else 0
+        rules = [rule for rule in self._recurring_rules() if rule.category == category]
+        if rules:
+            first, last = recurring.month_range(month)
+            spent += sum(e.cents for e in recurring.expand(rules, first, min(last, _today())))
+        return spent
+
+    @_locked
+    def budget_status(self, month=None):
+        """{category: (spent, limit)} in cents for every budgeted category in a YYYY-MM month (default: this one)."""
+        month = month or _today()[:7]
+        return {category: (self._spent(month, category), limit) for category, limit in self.budgets().items()}
+
+    @_locked
+    def over_budget(self, month=None):
+        """The categories spending more than their budget in a month (default: this one), as {category: (spent, limit)}."""
+        return {category: status for category, status in self.budget_status(month).items() if status[0] > status[1]}
+
+    @metrics.timed("store.budget_alerts")
+    @_locked
+    def budget_alerts(self, expenses):
+        """
+        (category, month, spent, limit) for every budget the months of these
+        (just added) expenses now exceed. Each check is a lookup in the
+        running totals, never a pass over the ledger.
+        """
+        limits = self.budgets()
+        keys = {(month_of(e), category_of(e)) for e in expenses}
+        alerts = []
+        for month, category in sorted(keys, key=lambda key: (key[0] or "", key[1] or "")):
+            if month is not None and category in limits:
+                spent = self._spent(month, category)
+                if spent > limits[category]:
+                    alerts.append((category, month, spent, limits[category]))
+        return alerts
+
+    @_locked
+    def add(self, expense):
+        """Queue a new expense for saving and update the cache in place; returns a Future."""
+        return self.add_many([expense])
+
+    @metrics.timed("store.add")
+    @_locked
+    def add_many(self, expenses):
+        """
+        Queue several expenses to be saved in one commit and update the cache in place.
+
+        Returns a Future that resolves to True once they are on disk or raises
+        IOError if the write failed (the cache is then reloaded from disk).
+        """
+        expenses = [to_expense(e) for e in expenses]
+        future = self._writer.submit(expenses)
+        if self._expenses is not None:
+            if self._positions is not None:
+                for i, expense in enumerate(expenses, len(self._expenses)):
+                    self._positions[id_of(expense)] = i
+            self._expenses.extend(expenses)
+        if self._aggregates is not None:
+            for expense in expenses:
+                self._aggregates.add(expense)
+        if self._daily is not None:
+            for expense in expenses:
+                self._daily.add(expense)
+        if self._index is not None:
+            self._index.add_many(expenses)
+        if self._search_index is not None:
+            self._search_index.add_many(expenses)
+        self._results.clear()
+        return future
+
+    def _position_map(self):
+        """The id -> position map over the loaded ledger, built on first use."""
+        if self._positions is None:
+            self._positions = {id_of(e): i for i, e in enumerate(self.expenses())}
+        return self._positions
+
+    @_locked
+    def get(self, expense_id):
+        """The expense with this id, or None; a lookup on SQLite when the ledger is not loaded."""
+        self._check()
+        if self._expenses is None and file_handler.current_ledger().backend == "sqlite":
+            self._writer.flush()
+            return file_handler.get_expense(expense_id)
+        i = self._position_map().get(expense_id)
+        return None if i is None else self._expenses[i]
+
+    @metrics.timed("store.update")
+    @_locked
+    def update(self, expense_id, changes):
+        """
+        Edit fields of an expense, e.g. update(id, {"amount": 12.5}); returns a
+        Future like add(), or None if there is no such expense. The loaded
+        ledger, indexes and totals are adjusted by the difference alone.
+        """
+        old = self.get(expense_id)
+        if old is None:
+            return None
+        new = Expense.from_dict({**old, **changes, "id": expense_id})
+        future = self._writer.submit_changes([(old, new)])
+        self._generation += 1
+        if self._expenses is not None:
+            i = self._position_map()[expense_id]
+            self._expenses[i] = new
+            if self._search_index is not None:
+                self._search_index.replace(i, old, new)
+        if self._index is not None:
+            self._index.replace(old, new)
+        for totals in (self._aggregates, self._daily):
+            if totals is not None:
+                totals.remove(old)
+                totals.add(new)
+        self._results.clear()
+        return future
+
+    @metrics.timed("store.delete")
+    @_locked
+    def delete(self, expense_id):
+        """
+        Delete an expense; returns a Future like add(), or None if there is no
+        such expense. The last loaded row moves into the freed position, so
+        the cache shrinks in O(1) (ties between equal dates may then list in
+        a different order than after a reload).
+        """
+        old = self.get(expense_id)
+        if old is None:
+            return None
+        future = self._writer.submit_changes([(old, None)])
+        self._generation += 1
+        if self._expenses is not None:
+            positions = self._position_map()
+            i = positions.pop(expense_id)
+            last = self._expenses.pop()
+            if self._search_index is not None:
+                self._search_index.remove(i, old)
+            if last is not old:
+                self._expenses[i] = last
+                positions[id_of(last)] = i
+                if self._search_index is not None:
+                    self._search_index.move(len(self._expenses), i, last)
+        if self._index is not None:
+            self._index.remove(old)
+        for totals in (self._aggregates, self._daily):
+            if totals is not None:
+                totals.remove(old)
+        self._results.clear()
+        return future
+
+    @_locked
+    def footprint(self):
+        """Rough bytes held by the cached ledger, its indexes and cached results."""
+        rows = len(self._expenses) if self._expenses is not None else 0
+        size = rows * ROW_BYTES
+        if self._index is not None:
+            size += rows * INDEX_ROW_BYTES
+        if self._search_index is not None:
+            size += rows * SEARCH_ROW_BYTES
+        for result in self._results.values():
+            if isinstance(result, (list, _Hits)):
+                # Rows fetched from SQLite are records of their own; otherwise references into the ledger
+                size += len(result) * (8 if self._expenses is not None else ROW_BYTES)
+        if self._daily is not None:
+            size += len(self._daily.days) * INDEX_ROW_BYTES
+        return size
+
+    def flush(self):
+        """Wait until every queued write is on disk."""
+        self._writer.flush()
+
+    def close(self):
+        """Save pending writes and stop the writer thread."""
+        self._writer.close()
+
+    def export_csv(self, filename, progress=None, **options):
+        """
+        Export to CSV (see file_handler.export_to_csv for options).
+
+        Uses the cached ledger when it is loaded, otherwise streams from disk.
+        Safe to call from a worker thread.
+        """
+        with self._lock, file_handler.use_ledger(self.ledger):
+            self._check()
+            if self._expenses is None:
+                self._writer.flush()
+            expenses = list(self._expenses) if self._expenses is not None else None
+        with file_handler.use_ledger(self.ledger):
+            return file_handler.export_to_csv(filename, expenses, progress=progress, **options)
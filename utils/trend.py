@@ -0,0 +1,142 @@
+"""
+Spending over time for the trend chart: daily totals, weekly and monthly
+buckets, and LTTB downsampling to the number of pixels available.
+
+Days are date ordinals (datetime.date.toordinal()) throughout; a bucket is
+identified by its first day (the Monday of a week, the 1st of a month).
+"""
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+
+from utils.expense import cents_of, day_of, parse_date
+
+GRANULARITIES = ("day", "week", "month")
+
+def bucket_of(day, granularity):
+    """First day of the bucket holding `day`."""
+    if granularity == "week":
+        return day - (day - 1) % 7 # Ordinal 1 (0001-01-01) was a Monday
+    if granularity == "month":
+        return day - date.fromordinal(day).day + 1
+    return day
+
+def monthly_points(monthly):
+    """(days, cents) of a {"YYYY-MM": amount} mapping such as summary["monthly"], oldest first."""
+    points = sorted((date(int(key[:4]), int(key[5:7]), 1).toordinal(), round(amount * 100))
+                    for key, amount in monthly.items())
+    return [day for day, _ in points], [cents for _, cents in points]
+
+class DailySeries:
+    """
+    Spending per calendar day, sorted by day, kept current as expenses are
+    added, edited or deleted. Weekly and monthly totals are derived from it
+    on request (and cached until the next change); range lookups bisect.
+    """
+
+    def __init__(self, totals=None):
+        self.totals = dict(totals or {}) # day -> cents
+        self.days = sorted(self.totals)
+        self._points = {}
+
+    @classmethod
+    def from_expenses(cls, expenses):
+        totals = {}
+        for expense in expenses:
+            day = day_of(expense)
+            if day is not None:
+                totals[day] = totals.get(day, 0) + cents_of(expense)
+        return cls(totals)
+
+    @classmethod
+    def merged(cls, parts):
+        """Spending per day across several {day: cents} mappings (e.g. of different ledgers)."""
+        totals = {}
+        for part in parts:
+            for day, cents in part.items():
+                totals[day] = totals.get(day, 0) + cents
+        return cls(totals)
+
+    @classmethod
+    def from_date_totals(cls, date_totals):
+        """From {date string: cents}, e.g. grouped in SQL; invalid dates are skipped."""
+        totals = {}
+        for value, cents in date_totals.items():
+            day = parse_date(value)[1]
+            if day is not None:
+                totals[day] = totals.get(day, 0) + cents
+        return cls(totals)
+
+    def add(self, expense, sign=1):
+        day = day_of(expense)
+        if day is None:
+            return
+        if day not in self.totals:
+            insort(self.days, day)
+            self.totals[day] = 0
+        self.totals[day] += sign * cents_of(expense)
+        if sign < 0 and self.totals[day] == 0:
+            del self.totals[day]
+            del self.days[bisect_left(self.days, day)]
+        self._points.clear()
+
+    def remove(self, expense):
+        self.add(expense, -1)
+
+    def points(self, granularity="day"):
+        """(bucket days, cents) over the whole history, oldest first."""
+        if granularity not in self._points:
+            if granularity == "day":
+                points = (list(self.days), [self.totals[day] for day in self.days])
+            else:
+                buckets = {}
+                for day in self.days:
+                    bucket = bucket_of(day, granularity)
+                    buckets[bucket] = buckets.get(bucket, 0) + self.totals[day]
+                points = (list(buckets), list(buckets.values())) # days are sorted, so buckets are too
+            self._points[granularity] = points
+        return self._points[granularity]
+
+def between(days, values, first, last, margin=1):
+    """
+    The points with first <= day <= last, plus `margin` points on either side
+    so a line drawn from them still reaches the edges of the range.
+    """
+    lo = max(bisect_left(days, first) - margin, 0)
+    hi = min(bisect_right(days, last) + margin, len(days))
+    return days[lo:hi], values[lo:hi]
+
+def lttb(xs, ys, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling to at most `threshold` points.
+
+    Keeps the first and last point and, from each of the buckets in
+    between, the point forming the largest triangle with the point kept
+    before it and the average of the next bucket, which preserves the
+    peaks and troughs a plain stride would drop.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(xs), list(ys)
+    every = (n - 2) / (threshold - 2)
+    out_x, out_y = [xs[0]], [ys[0]]
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        if next_start >= next_end: # Last bucket: the final point stands in for the next one
+            next_start, next_end = n - 1, n
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        out_x.append(xs[best])
+        out_y.append(ys[best])
+        a = best
+    out_x.append(xs[-1])
+    out_y.append(ys[-1])
+    return out_x, out_y
@@ -0,0 +1,117 @@
+import math
+import tkinter
+
+import customtkinter as ctk
+
+class VirtualList(ctk.CTkFrame):
+    """
+    Scrollable list that only creates widgets for the rows on screen.
+
+    A small pool of rows is built with `create_row(parent)` and re-bound to
+    different items with `bind_row(row, item)` while scrolling, so memory
+    and render time stay flat however many items the list holds. Every row
+    occupies `row_height` pixels (including the gap between rows).
+    """
+
+    def __init__(self, master, create_row, bind_row, row_height=80, buffer=2, **kwargs):
+        kwargs.setdefault("fg_color", "transparent")
+        super().__init__(master, **kwargs)
+        self._create_row = create_row
+        self._bind_row = bind_row
+        self.row_height = row_height
+        self.buffer = buffer
+
+        self.items = []
+        self.offset = 0  # pixels scrolled from the top
+        self._rows = []
+        self._bound = [] # item index currently shown by each pooled row
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self.viewport = ctk.CTkFrame(self, fg_color="transparent")
+        self.viewport.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.viewport.bind("<Configure>", lambda event: self._render())
+        self._bind_wheel(self.viewport)
+
+    def set_items(self, items, keep_offset=False):
+        """Show a new list of items, scrolled back to the top unless keep_offset is set."""
+        self.items = items
+        if not keep_offset:
+            self.offset = 0
+        self._bound = [None] * len(self._rows)
+        self._render()
+
+    def _bind_wheel(self, widget):
+        # Bind on every underlying Tk widget, since wheel events do not bubble up
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            tkinter.Misc.bind(widget, sequence, self._on_wheel, add="+")
+        for child in widget.winfo_children():
+            self._bind_wheel(child)
+
+    def _content_height(self):
+        return len(self.items) * self.row_height
+
+    def _scroll_to(self, offset):
+        max_offset = max(0, self._content_height() - self.viewport.winfo_height())
+        offset = int(min(max(offset, 0), max_offset))
+        if offset != self.offset:
+            self.offset = offset
+            self._render()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self._scroll_to(float(value) * self._content_height())
+        elif action == "scroll":
+            step = self.row_height if unit == "units" else self.viewport.winfo_height()
+            self._scroll_to(self.offset + int(value) * step)
+
+    def _on_wheel(self, event):
+        if event.num == 4:
+            delta = -1
+        elif event.num == 5:
+            delta = 1
+        else:
+            delta = -event.delta / (120 if abs(event.delta) >= 120 else 1)
+        self._scroll_to(self.offset + delta * self.row_height)
+        return "break"
+
+    def _render(self):
+        height = self.viewport.winfo_height()
+        needed = min(len(self.items), math.ceil(height / self.row_height) + self.buffer)
+
+        # Grow the pool up to the number of rows that fit; it never shrinks
+        while len(self._rows) < needed:
+            row = self._create_row(self.viewport)
+            self._bind_wheel(row)
+            self._rows.append(row)
+            self._bound.append(None)
+
+        self.offset = min(self.offset, max(0, self._content_height() - height))
+        first = self.offset // self.row_height
+        last = min(first + needed, len(self.items))
+
+        # Item i always lands in slot i % needed, so scrolling by one row
+        # only re-binds the single row that wrapped around
+        shown = set()
+        for index in range(first, last):
+            slot = index % needed
+            row = self._rows[slot]
+            if self._bound[slot] != index:
+                self._bind_row(row, self.items[index])
+                self._bound[slot] = index
+            row.place(x=0, y=index * self.row_height - self.offset, relwidth=1)
+            shown.add(slot)
+        for slot, row in enumerate(self._rows):
+            if slot not in shown:
+                row.place_forget()
+                self._bound[slot] = None
+
+        total = self._content_height()
+        if total > height:
+            self.scrollbar.set(self.offset / total, (self.offset + height) / total)
+        else:
+            self.scrollbar.set(0, 1)
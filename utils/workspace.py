@@ -0,0 +1,182 @@
+"""
+Several ledgers in one app: the ledgers known to the workspace (addressed
+by path), which one is shown, and a shared cache of open ledgers.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from utils import metrics
+from utils.aggregates import Aggregates
+from utils.file_handler import Ledger, write_json
+from utils.store import ExpenseStore
+from utils.trend import DailySeries
+
+WORKSPACE_FILE = "workspace.json"
+
+# Memory the open ledgers may take together before the least recently used are unloaded
+CACHE_BYTES = int(os.environ.get("EXPENSE_TRACKER_CACHE_MB", "512")) * 1024 * 1024
+
+class LedgerCache:
+    """
+    One ExpenseStore per ledger, least recently used first.
+
+    Each store keeps its ledger parsed, indexed and aggregated, so going
+    back to a cached ledger costs nothing. trim() keeps the stores' combined
+    footprint within `budget` bytes by unloading the least recently used
+    ones; an unloaded store stays registered (pending writes included) and
+    simply reads its ledger again the next time it is used.
+    """
+
+    def __init__(self, budget=CACHE_BYTES):
+        self.budget = budget
+        self._stores = OrderedDict() # Ledger -> ExpenseStore, most recently used last
+        self._lock = threading.Lock()
+
+    def get(self, ledger):
+        """The store of `ledger`, now the most recently used one."""
+        with self._lock:
+            store = self._stores.get(ledger)
+            if store is None:
+                store = self._stores[ledger] = ExpenseStore(ledger)
+            self._stores.move_to_end(ledger)
+            return store
+
+    @metrics.timed("workspace.trim")
+    def trim(self):
+        """
+        Unload least recently used ledgers until the cache fits its budget
+        (the most recent one always stays); returns the bytes still held.
+        Unloading waits for a store that is busy, so call it off the Tk thread.
+        """
+        with self._lock:
+            stores = list(self._stores.values())
+        sizes = [store.footprint() for store in stores]
+        total = sum(sizes)
+        for store, size in zip(stores[:-1], sizes):
+            if total <= self.budget:
+                break
+            if size:
+                store.invalidate()
+                total -= size
+        return total
+
+    def close(self):
+        """Save every store's pending writes and stop their writer threads."""
+        with self._lock:
+            stores = list(self._stores.values())
+        for store in stores:
+            store.close()
+
+class Workspace:
+    """
+    The ledgers the app works with and the one it shows.
+
+    The configured ledger (see file_handler) always comes first; ledgers
+    opened by path are remembered in WORKSPACE_FILE. In combined mode the
+    dashboard adds up every ledger's totals instead of showing one, without
+    ever putting their rows together.
+    """
+
+    def __init__(self, ledgers=(), active=None, combined=False, path=WORKSPACE_FILE, cache=None):
+        self.path = path
+        self.ledgers = [Ledger.configured()]
+        for ledger in ledgers:
+            if ledger not in self.ledgers:
+                self.ledgers.append(ledger)
+        self.active = active if active in self.ledgers else self.ledgers[0]
+        self.combined = combined and len(self.ledgers) > 1
+        self.cache = cache or LedgerCache()
+
+    @classmethod
+    def load(cls, path=WORKSPACE_FILE):
+        """The workspace saved at path, or one holding just the configured ledger."""
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return cls(path=path)
+        ledgers = [Ledger.at(p) for p in data.get("ledgers", [])]
+        active = Ledger.at(data["active"]) if data.get("active") else None
+        return cls(ledgers, active, data.get("combined", False), path)
+
+    def save(self):
+        """Remember the opened ledgers and the selection; only a convenience, so failures are not fatal."""
+        data = {
+            "ledgers": [ledger.path for ledger in self.ledgers[1:]],
+            "active": None if self.active == self.ledgers[0] else self.active.path,
+            "combined": self.combined,
+        }
+        try:
+            write_json(self.path, data, indent=4)
+            return True
+        except IOError:
+            return False
+
+    def labels(self):
+        """A display name per ledger, with its directory added where names clash."""
+        names = [ledger.name for ledger in self.ledgers]
+        return [
+            f"{name} ({os.path.basename(os.path.dirname(os.path.abspath(ledger.path))) or '/'})"
+            if names.count(name) > 1 else name
+            for name, ledger in zip(names, self.ledgers)
+        ]
+
+    def open(self, path):
+        """Add the ledger at path (if new) and show it; returns the Ledger."""
+        ledger = Ledger.at(path)
+        if ledger not in self.ledgers:
+            self.ledgers.append(ledger)
+        self.select(ledger)
+        return ledger
+
+    def select(self, ledger):
+        """Show one ledger."""
+        self.active = ledger
+        self.combined = False
+        self.save()
+
+    def select_combined(self):
+        """Show every ledger added up."""
+        self.combined = True
+        self.save()
+
+    def store(self, ledger=None):
+        """The store of a ledger (by default the active one)."""
+        return self.cache.get(ledger or self.active)
+
+    def _stores(self):
+        """Every ledger's store, the active one last so it is the one the cache keeps longest."""
+        others = [self.store(ledger) for ledger in self.ledgers if ledger != self.active]
+        return others + [self.store()]
+
+    @metrics.timed("workspace.summary")
+    def summary(self):
+        """Dashboard figures (as stats.summarize) of the active ledger, or of all of them when combined."""
+        if not self.combined:
+            return self.store().summary()
+        parts = [Aggregates.from_summary(store.summary()) for store in self._stores()]
+        return Aggregates.merged(parts).summary()
+
+    def trend_points(self, granularity="day"):
+        """(bucket days, cents) for the trend chart, combined like summary()."""
+        if not self.combined:
+            return self.store().trend_points(granularity)
+        return DailySeries.merged(store.daily_totals() for store in self._stores()).points(granularity)
+
+    def over_budget(self):
+        """
+        Categories over budget this month in the active ledger, as
+        {category: (spent, limit)}; None when combined, since budgets belong
+        to a single ledger.
+        """
+        if self.combined:
+            return None
+        return self.store().over_budget()
+
+    def trim(self):
+        return self.cache.trim()
+
+    def close(self):
+        self.cache.close()
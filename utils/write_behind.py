@@ -0,0 +1,124 @@
+import atexit
+import queue
+import threading
+from concurrent.futures import Future
+
+from utils import file_handler, metrics
+
+# Most expenses committed together; the rest of a burst goes in the next commit
+MAX_BATCH = 5000
+
+_STOP = object()
+
+class WriteBehindQueue:
+    """
+    Saves expenses on a background thread, batching bursts into one commit.
+
+    submit() (new expenses) and submit_changes() (edits and deletes too)
+    return a Future at once. The writer thread takes everything queued so
+    far and saves it with a single file_handler.apply_changes call:
+    one ledger lock, one append and one fsync for the whole batch. While
+    that commit runs, new submissions pile up and become the next batch, so
+    rapid inserts share commits without any added delay. Pending writes are
+    flushed on close() and at interpreter exit.
+
+    `commit(changes)` returns something true once they are saved;
+    `on_commit(changes, result)` is then called with that result, on the
+    writer thread.
+    """
+
+    def __init__(self, commit=None, on_commit=None, on_error=None):
+        self._commit = commit or file_handler.apply_changes
+        self._on_commit = on_commit
+        self._on_error = on_error
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="expense-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def submit(self, expenses):
+        """Queue new expenses for saving; the Future resolves to True once they are on disk (or raises IOError)."""
+        return self.submit_changes([(None, expense) for expense in expenses])
+
+    def submit_changes(self, changes):
+        """Queue (old, new) changes, as taken by file_handler.apply_changes; returns a Future like submit()."""
+        if self._closed:
+            raise RuntimeError("write queue is closed")
+        future = Future()
+        future.set_running_or_notify_cancel() # A queued write can no longer be taken back
+        self._start()
+        self._queue.put((list(changes), future))
+        return future
+
+    def flush(self):
+        """Block until everything submitted so far is committed (or has failed)."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def idle(self):
+        """True when everything submitted so far is committed (or has failed)."""
+        return self._queue.unfinished_tasks == 0
+
+    def close(self):
+        """Flush pending writes and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _take_batch(self):
+        """Block for the next submission, then add whatever else is already queued."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], 1, True
+        batch, taken, stop = [first], 1, False
+        rows = len(first[0])
+        while rows < MAX_BATCH:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            taken += 1
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch, taken, stop
+
+    def _run(self):
+        while True:
+            batch, taken, stop = self._take_batch()
+            if batch:
+                self._write(batch)
+            for _ in range(taken):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        changes = [change for items, _ in batch for change in items]
+        with metrics.span("write_behind.commit", rows=len(changes), submissions=len(batch)):
+            try:
+                ok = self._commit(changes)
+                error = None if ok else IOError(f"Could not save {len(changes)} changes")
+            except Exception as e:
+                error = e
+        if error is None and self._on_commit is not None:
+            self._on_commit(changes, ok)
+        if error is not None and self._on_error is not None:
+            self._on_error(changes, error)
+        for _, future in batch:
+            if error is None:
+                future.set_result(True)
+            else:
+                future.set_exception(error)